@@ -11,6 +11,18 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finotif.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# imported after the apps are loaded by get_asgi_application
+from finotif.notifications.live import live_events  # noqa: E402
+
+LIVE_EVENTS_PATH = '/api/live/'
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == LIVE_EVENTS_PATH:
+        await live_events(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 import os
 from pathlib import Path
 from celery.schedules import crontab
+from finotif.notifications.schedules import market_hours
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -56,6 +57,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'finotif.notifications.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -93,6 +95,11 @@ DATABASES = {
         'ATOMIC_REQUESTS': True,
     }
 }
+# Streaming replica of the default database for the read-only queries, see finotif.notifications.db_routers
+REPLICA_DATABASE = None
+# The reads of a user stay on the primary for this many seconds after the user's write
+REPLICA_STICKY_SECONDS = 5
+DATABASE_ROUTERS = ['finotif.notifications.db_routers.ReplicaRouter']
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 DEFAULT_FROM_EMAIL = os.environ.get('EMAIL_USER')
@@ -154,21 +161,134 @@ BROKER_PORT = os.environ.get("BROKER_PORT")
 # Required for health-check
 REDIS_URL = f'redis://{BROKER_HOST}:{BROKER_PORT}'
 
+# The ticker provider classes by name, imported by the first request of a quote
+TICKER_PROVIDERS = {
+    'yahoo': 'finotif.notifications.services.YahooTickerProvider',
+    'synthetic': 'finotif.notifications.providers.SyntheticTickerProvider',
+    'replay': 'finotif.notifications.providers.ReplayTickerProvider',
+}
+# A name of TICKER_PROVIDERS or the dotted path of another provider class
+TICKER_PROVIDER = 'yahoo'
+SYNTHETIC_PROVIDER_SEED = 0
+# Seconds between the steps of the random walk
+SYNTHETIC_PROVIDER_TICK_INTERVAL = 1
+# Standard deviation of the log return of a step
+SYNTHETIC_PROVIDER_VOLATILITY = 0.0005
+# CSV (with a header) or NDJSON file of the recorded quotes, one quote per line
+REPLAY_PROVIDER_FILE = ''
+REPLAY_PROVIDER_LOOP = True
+# Provider responses cached in Redis, the concurrent misses of a symbol share one upstream request
+PROVIDER_CACHE = False
+PROVIDER_STATE_CACHE_TTL = 30
+PROVIDER_INFO_CACHE_TTL = 60 * 60 * 24
+# A symbol the upstream did not return, possibly after a transient failure, is requested again sooner
+PROVIDER_MISSING_CACHE_TTL = 30
+PROVIDER_COALESCE_TIMEOUT = 10
+# Seconds of a connect or a read of an upstream request, a slow ticker gives up its turn in the poll cycle
+PROVIDER_REQUEST_TIMEOUT = 5
+# Token bucket of the upstream requests shared by all the processes - PROVIDER_RATE requests
+# per second with bursts of up to PROVIDER_BURST, a request waits up to PROVIDER_RATE_LIMIT_WAIT seconds
+PROVIDER_RATE_LIMIT = False
+PROVIDER_RATE = 2
+PROVIDER_BURST = 5
+PROVIDER_RATE_LIMIT_WAIT = 5
+
+# 'stream' - ticks are published to the stream read by the evaluate_ticks workers
+# 'inline' - ticks are evaluated in the post_save signal of the Tick
+TICK_EVALUATION_MODE = 'inline'
+# 'vectorized' - notifications are evaluated as NumPy arrays per (ticker, property)
+# 'model' - StepNotification.should_send is called for every notification
+TICK_EVALUATOR = 'vectorized'
+TICK_STREAM_NAME = 'ticks'
+TICK_STREAM_GROUP = 'evaluators'
+TICK_STREAM_MAXLEN = 100000
+TICK_STREAM_BATCH_SIZE = 500
+# Milliseconds after which a tick not acknowledged by an evaluator is claimed by another one
+TICK_STREAM_CLAIM_IDLE_TIME = 60000
+# Upper bound of the window of a rolling notification, in minutes or periods
+ROLLING_MAX_WINDOW = 60 * 24
+# Rolling states of the (ticker, property) pairs kept by an evaluator, the least recently used are dropped
+ROLLING_MAX_STATES = 10000
+
+# Ticks fetched per round trip of the backtest's server-side cursor
+BACKTEST_CHUNK_SIZE = 10000
+# Fire timestamps returned per change, the count is always exact
+BACKTEST_TIMESTAMPS_LIMIT = 1000
+# Days of ticks a request of the API backtests at most, the command is not limited
+BACKTEST_MAX_DAYS = 92
+
+# Publish the ticks and fired notifications to the Redis channels of the /api/live/ endpoint
+LIVE_EVENTS = False
+LIVE_EVENTS_QUEUE_SIZE = 100
+# Seconds between the keepalive comments sent to an idle client
+LIVE_EVENTS_KEEPALIVE = 15
+# Seconds a ticket of POST /api/liveTicket/ opens the stream for, it is logged with the url
+LIVE_EVENTS_TICKET_MAX_AGE = 30
+
+# cProfile of the requests of the staff users or with a signed X-Profile header
+# and of a sample of the celery tasks, nothing is installed when disabled
+PROFILING_ENABLED = False
+PROFILING_DIR = os.environ.get('PROFILING_DIR', '/tmp/finotif/profiles')
+PROFILING_TASK_SAMPLE_RATE = float(os.environ.get('PROFILING_TASK_SAMPLE_RATE', '0.01'))
+# Seconds the X-Profile header signature is valid for
+PROFILING_SIGNATURE_MAX_AGE = 3600
+PROFILING_STATS_LIMIT = 50
+
 CELERY_BROKER_URL = REDIS_URL
+# The task arguments are ids and short strings only, see finotif.notifications.tasks
+CELERY_TASK_SERIALIZER = 'msgpack'
+CELERY_RESULT_SERIALIZER = 'msgpack'
+CELERY_ACCEPT_CONTENT = ['msgpack', 'json']
+# Skip the notifications fired again by the same tick, marked by Redis keys
+DELIVERY_DEDUP = False
+DELIVERY_DEDUP_TTL = 60 * 60 * 24
+# Notifications fired by one evaluated batch of ticks are sent by tasks of up to this many ids
+NOTIFICATION_TASK_BATCH_SIZE = 100
+# A poll cycle stops after the budget in seconds, the rest of the tickers go first in the next one
+POLL_CYCLE_BUDGET = 50
+# Skip a cycle started while the previous one holds the Redis lock, which expires after the timeout
+POLL_CYCLE_LOCK = False
+POLL_CYCLE_LOCK_TIMEOUT = 120
+POLL_MARKET_HOURS_ONLY = True
+MARKET_HOURS_REFRESH = 300
+TICK_ARCHIVE = False
+TICK_ARCHIVE_DIR = '/tmp/finotif/ticks'
+TICK_ARCHIVE_AFTER_DAYS = 90
+TICK_ARCHIVE_COMPRESS = False
 CELERY_BEAT_SCHEDULE = {
     'request_yahoo_api': {
         'task': 'finotif.notifications.tasks.request_yahoo_api',
-        'schedule': crontab(minute='*/1')
-    }
+        'schedule': market_hours(run_every=60) if POLL_MARKET_HOURS_ONLY else crontab(minute='*/1')
+    },
+    'archive_ticks': {
+        'task': 'finotif.notifications.tasks.archive_ticks',
+        'schedule': crontab(minute=0, hour=3)
+    },
 }
 
+# The users of the JWT tokens are cached in Redis, dropped when a user is saved or deleted
+JWT_USER_CACHE = False
+JWT_USER_CACHE_TTL = 60
+
+# Detail representations of the tickers and notifications cached in Redis, see finotif.notifications.representations
+DETAIL_CACHE = False
+DETAIL_CACHE_TTL = 60 * 5
+
 REST_FRAMEWORK = {
     'COERCE_DECIMAL_TO_STRING': False,
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'finotif.notifications.authentication.CachedJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'finotif.notifications.renderers.ORJSONRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'finotif.notifications.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     )
 }
 
@@ -23,15 +23,21 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView
 )
 from rest_framework.documentation import include_docs_urls
-from finotif.notifications.urls import router
+from finotif.notifications.urls import (
+    router,
+    async_urlpatterns,
+)
+from finotif.notifications.metrics import metrics_view
 from health_check.views import MainView
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/', include(async_urlpatterns)),
     path('api/', include(router.urls)),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/ht/', MainView.as_view(), name='health_check'),
+    path('api/metrics', metrics_view, name='metrics'),
     path('api/docs/', include_docs_urls(title='Finotif API', schema_url='/'))
 ]
@@ -7,3 +7,5 @@ class NotificationsConfig(AppConfig):
 
     def ready(self):
         from . import signals
+        from .profiling import connect_task_profiling
+        connect_task_profiling()
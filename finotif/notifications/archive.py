@@ -0,0 +1,258 @@
+"""Archive of the old ticks in columnar files, read together with the ticks still in the database
+
+The ticks created before the month of TICK_ARCHIVE_AFTER_DAYS ago are moved to one file per
+ticker and month, TICK_ARCHIVE_DIR/<ticker id>/<YYYY-MM>.npz, with a .npy member per column.
+The members are stored uncompressed and memory-mapped by the reader, TICK_ARCHIVE_COMPRESS
+deflates them at the cost of reading a whole month into memory. The ticks anchoring step
+notifications (last_tick) stay in the database until the notifications move on.
+
+One run at a time holds a Postgres advisory lock - two overlapping runs would each replace
+a file with their own merge and delete their rows, losing the rows of the other one.
+"""
+import heapq
+import logging
+import os
+import struct
+import zipfile
+from contextlib import contextmanager
+from datetime import (
+    datetime,
+    timedelta,
+    timezone as TimeZone,
+)
+from operator import itemgetter
+from pathlib import Path
+from typing import (
+    Dict,
+    Iterator,
+    Tuple,
+)
+import numpy as np
+from django.conf import settings
+from django.db import (
+    connection,
+    transaction,
+)
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from .models import (
+    Tick,
+    StepNotification,
+)
+
+
+_logger = logging.getLogger(__name__)
+
+# The columns of an archive file in the order of the values_list() of the ticks
+COLUMNS = {
+    'id': np.int64,
+    'created_at': 'datetime64[us]',
+    'property': np.int8,
+    'value': np.float64,
+    'currency': 'U3',
+}
+DELETE_BATCH_SIZE = 1000
+# The key of the advisory lock held by the archiving run
+ARCHIVE_LOCK_ID = 0x66696e6f
+_LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+
+
+class ArchiveLocked(Exception):
+    """Another run is archiving the ticks"""
+
+    def __init__(self):
+        super().__init__('The ticks are being archived by another run')
+
+
+def month_path(ticker_id: int, month: datetime) -> Path:
+    return Path(settings.TICK_ARCHIVE_DIR) / str(ticker_id) / f'{month:%Y-%m}.npz'
+
+
+def next_month(month: datetime) -> datetime:
+    return (month.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def archive_cutoff(now: datetime = None) -> datetime:
+    """The start of the month of TICK_ARCHIVE_AFTER_DAYS ago, only whole months are archived"""
+    day = (now or timezone.now()) - timedelta(days=settings.TICK_ARCHIVE_AFTER_DAYS)
+    return day.astimezone(TimeZone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _datetime64(value: datetime) -> np.datetime64:
+    return np.datetime64(value.astimezone(TimeZone.utc).replace(tzinfo=None), 'us')
+
+
+def _memmap(path: Path, info: zipfile.ZipInfo) -> np.ndarray:
+    """The .npy member stored in the zip file, mapped from its offset"""
+    with open(path, 'rb') as file:
+        file.seek(info.header_offset)
+        header = _LOCAL_HEADER.unpack(file.read(_LOCAL_HEADER.size))
+        # the name and the extra field of the local header may differ from the central directory
+        file.seek(info.header_offset + _LOCAL_HEADER.size + header[-2] + header[-1])
+        version = np.lib.format.read_magic(file)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+        offset = file.tell()
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape, order='F' if fortran_order else 'C')
+
+
+def read_month(path: Path) -> Dict[str, np.ndarray]:
+    """The columns of an archive file, memory-mapped unless compressed"""
+    columns = {}
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            name = info.filename[:-len('.npy')]
+            if info.compress_type == zipfile.ZIP_STORED:
+                columns[name] = _memmap(path, info)
+            else:
+                with archive.open(info) as member:
+                    columns[name] = np.lib.format.read_array(member)
+    return columns
+
+
+def write_month(path: Path, columns: Dict[str, np.ndarray]):
+    """Replaces the archive file at once, a reader sees either the old or the new one"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    save = np.savez_compressed if settings.TICK_ARCHIVE_COMPRESS else np.savez
+    with open(temporary, 'wb') as file:
+        save(file, **columns)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+    # the rename is durable before the archived rows are deleted
+    directory = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+def _columns(rows) -> Dict[str, np.ndarray]:
+    ids, created_at, properties, values, currencies = zip(*rows)
+    return {
+        'id': np.array(ids, dtype=COLUMNS['id']),
+        'created_at': np.array([_datetime64(value) for value in created_at], dtype=COLUMNS['created_at']),
+        'property': np.array(properties, dtype=COLUMNS['property']),
+        'value': np.array(values, dtype=COLUMNS['value']),
+        'currency': np.array(currencies, dtype=COLUMNS['currency']),
+    }
+
+
+def _merge(archived: Dict[str, np.ndarray], columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Both in the order of the ids, a tick in both is kept once"""
+    merged = {name: np.concatenate([archived[name], columns[name]]) for name in COLUMNS}
+    _, index = np.unique(merged['id'], return_index=True)
+    return {name: column[index] for name, column in merged.items()}
+
+
+def _anchors():
+    return StepNotification.objects.filter(last_tick__isnull=False).values('last_tick_id')
+
+
+def archive_month(ticker_id: int, month: datetime, cutoff: datetime) -> int:
+    """Moves the ticks of the ticker created in the month before the cutoff to the archive file"""
+    rows = list(Tick.objects
+                .filter(ticker_id=ticker_id, created_at__gte=month, created_at__lt=min(next_month(month), cutoff))
+                .exclude(pk__in=_anchors())
+                .order_by('pk')
+                .values_list('pk', 'created_at', 'property', 'value', 'currency_id'))
+    if not rows:
+        return 0
+    columns = _columns(rows)
+    path = month_path(ticker_id, month)
+    if path.exists():
+        # the ticks released by the notifications or left by an interrupted run
+        columns = _merge(read_month(path), columns)
+    write_month(path, columns)
+    ids = [row[0] for row in rows]
+    with transaction.atomic():
+        for start in range(0, len(ids), DELETE_BATCH_SIZE):
+            # a tick anchoring a notification since it was read stays in both, the reader skips the copy
+            (Tick.objects
+             .filter(pk__in=ids[start:start + DELETE_BATCH_SIZE])
+             .exclude(pk__in=_anchors())
+             .delete())
+    _logger.debug(f'Archived {len(rows)} ticks of the ticker {ticker_id} to {path}')
+    return len(rows)
+
+
+@contextmanager
+def archive_lock():
+    """Held by one run at a time for the session, raises ArchiveLocked otherwise"""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_try_advisory_lock(%s)', [ARCHIVE_LOCK_ID])
+        if not cursor.fetchone()[0]:
+            raise ArchiveLocked()
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_unlock(%s)', [ARCHIVE_LOCK_ID])
+
+
+def archive_ticks(cutoff: datetime = None) -> int:
+    """Moves the ticks created before the cutoff to the archive, returns the number of the ticks moved
+
+    Raises ArchiveLocked while another run is archiving.
+    """
+    cutoff = cutoff or archive_cutoff()
+    with archive_lock():
+        months = list(Tick.objects
+                      .filter(created_at__lt=cutoff)
+                      .annotate(month=TruncMonth('created_at', tzinfo=TimeZone.utc))
+                      .order_by('ticker_id', 'month')
+                      .values_list('ticker_id', 'month')
+                      .distinct())
+        return sum(archive_month(ticker_id, month, cutoff) for ticker_id, month in months)
+
+
+def archived_ticks(
+        ticker_id: int,
+        property: int,
+        since: datetime = None,
+        until: datetime = None
+) -> Iterator[Tuple[int, float, datetime]]:
+    """(pk, value, created_at) of the archived ticks, month by month"""
+    directory = Path(settings.TICK_ARCHIVE_DIR) / str(ticker_id)
+    # the names of the months sort chronologically
+    for path in sorted(directory.glob('*.npz')):
+        month = datetime.strptime(path.stem, '%Y-%m').replace(tzinfo=TimeZone.utc)
+        if until is not None and month >= until:
+            break
+        if since is not None and next_month(month) <= since:
+            continue
+        columns = read_month(path)
+        mask = columns['property'] == property
+        if since is not None:
+            mask &= columns['created_at'] >= _datetime64(since)
+        if until is not None:
+            mask &= columns['created_at'] < _datetime64(until)
+        created_at = [value.replace(tzinfo=TimeZone.utc) for value in columns['created_at'][mask].tolist()]
+        yield from zip(columns['id'][mask].tolist(), columns['value'][mask].tolist(), created_at)
+
+
+def tick_history(
+        ticker_id: int,
+        property: int,
+        since: datetime = None,
+        until: datetime = None,
+        chunk_size: int = 2000
+) -> Iterator[Tuple[int, float, datetime]]:
+    """(pk, value, created_at) of the archived and the stored ticks in the order they were saved"""
+    ticks = Tick.objects.filter(ticker_id=ticker_id, property=property)
+    if since is not None:
+        ticks = ticks.filter(created_at__gte=since)
+    if until is not None:
+        ticks = ticks.filter(created_at__lt=until)
+    rows = (ticks
+            .order_by('pk')
+            .values_list('pk', 'value', 'created_at')
+            .iterator(chunk_size=chunk_size))
+    last = None
+    for row in heapq.merge(archived_ticks(ticker_id, property, since, until), rows, key=itemgetter(0)):
+        if row[0] != last:
+            last = row[0]
+            yield row
@@ -0,0 +1,145 @@
+"""Async view of the latest quote under ASGI
+
+The quote is read by a coroutine - the cached provider state by the asyncio Redis client,
+the authentication and the fallback to the saved ticks through sync_to_async. The other
+endpoints are the DRF viewsets: Django 3.2 has no async ORM, so a database-bound view would
+run one request at a time per process through sync_to_async and gain nothing.
+"""
+import asyncio
+import logging
+from functools import update_wrapper
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import (
+    Http404,
+    HttpResponse,
+)
+from django.shortcuts import get_object_or_404
+from django.views import View
+from redis.exceptions import RedisError
+from rest_framework.request import Request
+from rest_framework.exceptions import APIException
+from rest_framework.settings import api_settings
+from .models import (
+    Tick,
+    Ticker,
+    TickerProperty,
+)
+from .services import (
+    CachedTickerProvider,
+    cache_key,
+    provider_class,
+)
+from . import connections
+
+
+_logger = logging.getLogger(__name__)
+
+QUOTE_FIELDS = [TickerProperty(value).label.lower() for value in TickerProperty.values]
+
+
+class Unauthenticated(Exception):
+
+    def __init__(self, detail):
+        super().__init__(detail)
+        self.detail = detail if isinstance(detail, dict) else {'detail': detail}
+
+
+def _json_response(data, status=200, **headers) -> HttpResponse:
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    response = HttpResponse(renderer.render(data), status=status, content_type='application/json')
+    for name, value in headers.items():
+        response[name.replace('_', '-')] = value
+    return response
+
+
+def _authenticate(request) -> Request:
+    """DRF request of the user authenticated by the DEFAULT_AUTHENTICATION_CLASSES"""
+    drf_request = Request(
+        request,
+        authenticators=[authentication() for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    )
+    try:
+        user = drf_request.user
+    except APIException as er:
+        raise Unauthenticated(er.detail)
+    if not user or not user.is_authenticated:
+        raise Unauthenticated('Authentication credentials were not provided.')
+    return drf_request
+
+
+class AsyncReadView(View):
+    """GET by a coroutine"""
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+
+        # Django 3.2 runs a view asynchronously only if the view function is a coroutine function
+        async def async_view(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+            return response
+
+        update_wrapper(async_view, view)
+        # JWT authenticated like the DRF views, which are exempt as well
+        async_view.csrf_exempt = True
+        # async views cannot run in the ATOMIC_REQUESTS transaction
+        return transaction.non_atomic_requests(async_view)
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            request = await sync_to_async(_authenticate)(request)
+        except Unauthenticated as er:
+            return _json_response(er.detail, status=401, WWW_Authenticate='Bearer realm="api"')
+        try:
+            return _json_response(await self.read(request, request.user, *args, **kwargs))
+        except Http404:
+            return _json_response({'detail': 'Not found.'}, status=404)
+
+    async def read(self, request: Request, user, *args, **kwargs):
+        raise NotImplementedError()
+
+
+class TickerQuoteView(AsyncReadView):
+    """Latest quote of a ticker of the user - the provider's cached state or the last saved ticks"""
+
+    async def read(self, request: Request, user, pk=None):
+        ticker = await sync_to_async(get_object_or_404)(Ticker.of_user(user), pk=pk)
+        quote = await self.cached_quote(ticker)
+        if quote is None:
+            quote = await sync_to_async(self.saved_quote)(ticker)
+        return dict(ticker=ticker.pk, symbol=ticker.symbol, **quote)
+
+    @staticmethod
+    async def cached_quote(ticker: Ticker):
+        provider_name = provider_class(settings.TICKER_PROVIDER).__name__
+        key = cache_key(provider_name, 'state', ticker.symbol)
+        try:
+            data = await connections.async_redis_connection().get(key)
+        except RedisError as er:
+            _logger.error(f'Cannot read the cached quote of {ticker.symbol}: {er}')
+            return None
+        state = CachedTickerProvider.load('state', data) if data else None
+        if state is None:
+            return None
+        return dict(
+            currency=state.currency,
+            **{field: getattr(state, field) for field in QUOTE_FIELDS},
+            source='provider'
+        )
+
+    @staticmethod
+    def saved_quote(ticker: Ticker) -> dict:
+        ticks = (Tick.objects
+                 .filter(ticker=ticker)
+                 .order_by('property', '-id')
+                 .distinct('property')
+                 .values_list('property', 'value', 'currency_id'))
+        quote = dict(currency=None, **dict.fromkeys(QUOTE_FIELDS), source='ticks')
+        for property, value, currency in ticks:
+            quote['currency'] = currency
+            quote[TickerProperty(property).label.lower()] = value
+        return quote
@@ -0,0 +1,67 @@
+"""JWT authentication with the users of the tokens cached in Redis
+
+The users are cached for JWT_USER_CACHE_TTL seconds and dropped from the cache by the
+post_save and post_delete signals of the user, so an update, a password change or a
+deactivation takes effect on the next request of any process.
+"""
+import logging
+from typing import Optional
+import msgpack
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from redis.exceptions import RedisError
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from .models import User
+from . import connections
+
+
+_logger = logging.getLogger(__name__)
+
+# The fields the requests read, the others are deferred and loaded on access
+CACHED_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+
+
+def user_key(user_id) -> str:
+    return f'auth:user:{user_id}'
+
+
+def cached_user(user_id) -> Optional[User]:
+    try:
+        data = connections.redis_connection().get(user_key(user_id))
+    except RedisError as er:
+        _logger.error(f'Cannot read the cached user {user_id}: {er}')
+        return None
+    if data is None:
+        return None
+    return User.from_db(DEFAULT_DB_ALIAS, CACHED_FIELDS, msgpack.unpackb(data))
+
+
+def cache_user(user: User):
+    data = msgpack.packb([getattr(user, field) for field in CACHED_FIELDS])
+    try:
+        connections.redis_connection().set(user_key(user.pk), data, ex=settings.JWT_USER_CACHE_TTL)
+    except RedisError as er:
+        _logger.error(f'Cannot cache the user {user.pk}: {er}')
+
+
+def forget_user(user_id):
+    try:
+        connections.redis_connection().delete(user_key(user_id))
+    except RedisError as er:
+        _logger.error(f'Cannot drop the cached user {user_id}: {er}')
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication which loads the user from the database only on a cache miss"""
+
+    def get_user(self, validated_token):
+        if not settings.JWT_USER_CACHE or api_settings.USER_ID_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        user = cached_user(user_id)
+        if user is None:
+            # raises for the missing and inactive users, which are never cached
+            user = super().get_user(validated_token)
+            cache_user(user)
+        return user
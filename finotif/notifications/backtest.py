@@ -0,0 +1,90 @@
+"""Backtest of step notification rules over the stored ticks
+
+The archived ticks and the ticks read through a server-side cursor in chunks are evaluated
+in memory by the StepRules of the candidate changes, so all the changes are tested in one
+pass without saving the anchors or sending anything.
+"""
+import logging
+from dataclasses import (
+    dataclass,
+    field,
+)
+from datetime import datetime
+from typing import (
+    Iterable,
+    List,
+    Optional,
+)
+import numpy as np
+from django.conf import settings
+from .models import (
+    Ticker,
+    TickerProperty,
+)
+from .archive import tick_history
+from .evaluation import StepRules
+
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChangeResult:
+    change: float
+    fires: int = 0
+    timestamps: List[datetime] = field(default_factory=list)
+
+    @property
+    def truncated(self) -> bool:
+        return self.fires > len(self.timestamps)
+
+
+@dataclass
+class BacktestResult:
+    ticker: Ticker
+    property: TickerProperty
+    since: Optional[datetime]
+    until: Optional[datetime]
+    ticks: int = 0
+    changes: List[ChangeResult] = field(default_factory=list)
+
+
+def backtest(
+        ticker: Ticker,
+        property: TickerProperty,
+        changes: Iterable[float],
+        since: datetime = None,
+        until: datetime = None,
+        timestamps_limit: int = None
+) -> BacktestResult:
+    """Counts the fires of a step notification per change, the first tick in the range anchors the rules"""
+    changes = list(changes)
+    limit = settings.BACKTEST_TIMESTAMPS_LIMIT if timestamps_limit is None else timestamps_limit
+    result = BacktestResult(
+        ticker=ticker,
+        property=TickerProperty(property),
+        since=since,
+        until=until,
+        changes=[ChangeResult(change) for change in changes]
+    )
+    rules = StepRules(
+        ids=range(len(changes)),
+        changes=changes,
+        anchors=np.full(len(changes), np.nan),
+        anchor_ticks=np.zeros(len(changes))
+    )
+
+    rows = tick_history(ticker.pk, property, since, until, chunk_size=settings.BACKTEST_CHUNK_SIZE)
+
+    change_results = result.changes
+    for tick_id, value, created_at in rows:
+        result.ticks += 1
+        fired = rules.evaluate_value(tick_id, value)
+        if fired.size:
+            for index in fired.tolist():
+                change_result = change_results[index]
+                change_result.fires += 1
+                if len(change_result.timestamps) < limit:
+                    change_result.timestamps.append(created_at)
+    _logger.debug(f'Backtested {len(changes)} changes of {ticker} over {result.ticks} ticks')
+    return result
@@ -0,0 +1,155 @@
+"""Offline benchmark of the poll-and-notify pipeline
+
+The stages run against the configured database with providers.SteppingTickerProvider, eager
+celery tasks and the in-memory email backend, so nothing leaves the process.
+"""
+import logging
+import random
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import List
+from unittest import mock
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+)
+from .providers import SteppingTickerProvider
+from .models import (
+    User,
+    Exchange,
+    Ticker,
+    Tick,
+    StepNotification,
+    TickerProperty,
+    NotificationType,
+)
+from .evaluation import evaluate_ticks
+from .signals import ticker_value_changed
+from . import tasks
+
+
+_logger = logging.getLogger(__name__)
+
+SYMBOL_PREFIX = 'BENCH'
+
+
+@dataclass(frozen=True)
+class StageResult:
+    name: str
+    seconds: float
+    queries: int
+    items: int
+
+    def __str__(self):
+        return '{0:<20}{1:>12.2f} ms{2:>10} queries{3:>10} items'.format(
+            self.name, self.seconds * 1000, self.queries, self.items
+        )
+
+
+@contextmanager
+def measure(name: str, results: List[StageResult], items: int = 0):
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        yield
+        seconds = time.perf_counter() - start
+    results.append(StageResult(name, seconds, len(queries), items))
+
+
+def seed(tickers: int, notifications: int, users: int = 10):
+    """Creates the tickers and the step notifications spread evenly over them"""
+    SteppingTickerProvider.reset()
+    exchange = Exchange.objects.get(mic='XNAS')
+    created_users = [
+        User.objects.create_user(
+            username=f'{SYMBOL_PREFIX.lower()}_{i}',
+            email=f'{SYMBOL_PREFIX.lower()}_{i}@email.com',
+            password=None
+        )
+        for i in range(users)
+    ]
+    created_tickers = Ticker.objects.bulk_create([
+        Ticker(
+            symbol=f'{SYMBOL_PREFIX}{i:05}',
+            short_name=f'{SYMBOL_PREFIX}{i:05}',
+            name=f'{SYMBOL_PREFIX}{i:05} Inc.',
+            description='Benchmark ticker',
+            exchange=exchange
+        )
+        for i in range(tickers)
+    ])
+    changes = random.Random(notifications)
+    StepNotification.objects.bulk_create([
+        StepNotification(
+            title=f'Benchmark notification {i}',
+            content='Benchmark content',
+            type=NotificationType.EMAIL,
+            property=TickerProperty.PRICE,
+            change=round(changes.uniform(0.1, 3.0), 2),
+            ticker=created_tickers[i % tickers],
+            user=created_users[i % users]
+        )
+        for i in range(notifications)
+    ], batch_size=1000)
+    return created_tickers
+
+
+def _eager(task):
+    # task_always_eager still builds a producer, which needs a reachable broker url
+    def delay(*args, **kwargs):
+        return task.apply(args, kwargs)
+    return delay
+
+
+@contextmanager
+def offline_pipeline():
+    """Replaces the upstream provider, the broker and the smtp server"""
+    with override_settings(
+            TICK_EVALUATION_MODE='inline',
+            LIVE_EVENTS=False,
+            EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+            TICKER_PROVIDER='finotif.notifications.providers.SteppingTickerProvider',
+            # a step moves the price by about 1%, the notifications fire every round
+            SYNTHETIC_PROVIDER_VOLATILITY=0.01
+    ), mock.patch.object(
+        Exchange, 'is_open', return_value=True
+    ), mock.patch.object(
+        tasks.send_email, 'delay', _eager(tasks.send_email)
+    ), mock.patch.object(
+        tasks.send_push, 'delay', _eager(tasks.send_push)
+    ):
+        yield
+
+
+def run_stages() -> List[StageResult]:
+    """Runs the stages of a poll cycle one by one, then the whole cycle"""
+    results = []
+    with offline_pipeline():
+        tickers = list(Ticker.tracked().select_related('exchange'))
+
+        with measure('provider', results, len(tickers)):
+            states = [(SteppingTickerProvider(ticker.symbol).current_state(), ticker)
+                      for ticker in tickers]
+
+        post_save.disconnect(ticker_value_changed, sender=Tick)
+        try:
+            with measure('save_ticks', results, len(states)):
+                ticks = [tick for state, ticker in states
+                         for tick in Tick.save_ticks(state, ticker.pk)]
+        finally:
+            post_save.connect(ticker_value_changed, sender=Tick)
+
+        fired = []
+        with mock.patch.object(tasks, 'send', lambda *entry: fired.append(entry)):
+            with measure('evaluation', results, len(ticks)):
+                evaluate_ticks(ticks)
+
+        with measure('send', results, len(fired)), tasks.batched():
+            for notification, fired_from in fired:
+                tasks.send(notification, fired_from)
+
+        with measure('request_yahoo_api', results, len(tickers)):
+            tasks.request_yahoo_api()
+    return results
@@ -0,0 +1,25 @@
+import asyncio
+import weakref
+import redis
+import redis.asyncio
+from functools import lru_cache
+from django.conf import settings
+
+
+@lru_cache(maxsize=None)
+def redis_connection() -> redis.Redis:
+    """Redis client shared by the process, points at the instance the broker runs on"""
+    return redis.Redis.from_url(settings.REDIS_URL)
+
+
+# event loop -> its client
+_async_connections = weakref.WeakKeyDictionary()
+
+
+def async_redis_connection() -> redis.asyncio.Redis:
+    """Asyncio counterpart of redis_connection, one per event loop as its connections are bound to the loop"""
+    loop = asyncio.get_running_loop()
+    connection = _async_connections.get(loop)
+    if connection is None:
+        connection = _async_connections[loop] = redis.asyncio.Redis.from_url(settings.REDIS_URL)
+    return connection
@@ -0,0 +1,106 @@
+"""Routing of the read-only queries to the REPLICA_DATABASE
+
+Only the queries made within replica_reads() go to the replica - the list and retrieve
+actions of the viewsets and the poller's selection of the tickers. A user who has written
+in the last REPLICA_STICKY_SECONDS reads from the primary, so the replication lag never
+hides the user's own writes.
+"""
+import contextvars
+import logging
+from contextlib import contextmanager
+from django.conf import settings
+from redis.exceptions import RedisError
+from rest_framework.permissions import SAFE_METHODS
+from . import connections
+
+
+_logger = logging.getLogger(__name__)
+
+# a context variable, so the async views pass it to the threads of sync_to_async
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+
+
+def sticky_key(user_id: int) -> str:
+    return f'replica:sticky:{user_id}'
+
+
+def mark_write(user):
+    """Keeps the reads of the user on the primary until the replica has caught up"""
+    if not settings.REPLICA_DATABASE:
+        return
+    try:
+        connections.redis_connection().set(sticky_key(user.pk), 1, ex=settings.REPLICA_STICKY_SECONDS)
+    except RedisError as er:
+        _logger.error(f'Cannot mark the write of the user {user.pk}: {er}')
+
+
+def is_sticky(user) -> bool:
+    if user is None or not user.is_authenticated:
+        return False
+    try:
+        return bool(connections.redis_connection().exists(sticky_key(user.pk)))
+    except RedisError as er:
+        # the primary is always up to date
+        _logger.error(f'Cannot read the writes of the user {user.pk}: {er}')
+        return True
+
+
+@contextmanager
+def replica_reads(user=None):
+    """The reads within the block go to the replica, unless the user has just written"""
+    if not settings.REPLICA_DATABASE or is_sticky(user):
+        yield
+        return
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """The reads within the block go to the primary, also within replica_reads()"""
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and settings.REPLICA_DATABASE:
+            return settings.REPLICA_DATABASE
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replica has the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaReadsMixin:
+    """Runs the replica_actions of a viewset within replica_reads() and marks the writes of the users"""
+    replica_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in self.replica_actions:
+            self._replica_reads = replica_reads(request.user)
+            self._replica_reads.__enter__()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        replica = getattr(self, '_replica_reads', None)
+        if replica is not None:
+            self._replica_reads = None
+            replica.__exit__(None, None, None)
+        if request.method not in SAFE_METHODS and response.status_code < 400 and request.user.is_authenticated:
+            mark_write(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,200 @@
+import logging
+import time
+import numpy as np
+from collections import defaultdict
+from typing import (
+    Dict,
+    Iterable,
+    List,
+    Tuple,
+)
+from django.conf import settings
+from django.utils import timezone
+from .models import (
+    Tick,
+    StepNotification,
+    RollingNotification,
+)
+from .representations import invalidate
+from .rolling import statistics
+from . import (
+    metrics,
+    tasks,
+)
+
+
+_logger = logging.getLogger(__name__)
+
+
+class StepRules:
+    """Active step notifications of a (ticker, property) pair stored as contiguous arrays
+
+    Missing anchors (notifications without the last tick) are NaN, so they never fire
+    and are anchored by the first evaluated tick, as in StepNotification.should_send.
+    """
+    __slots__ = ('ids', 'changes', 'anchors', 'anchor_ticks', '_loaded_anchor_ticks')
+
+    def __init__(self, ids, changes, anchors, anchor_ticks):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.changes = np.asarray(changes, dtype=np.float64)
+        self.anchors = np.asarray(anchors, dtype=np.float64)
+        self.anchor_ticks = np.asarray(anchor_ticks, dtype=np.int64)
+        self._loaded_anchor_ticks = self.anchor_ticks.copy()
+
+    def evaluate(self, tick: Tick) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the ids of the fired notifications with the anchor ticks they fired from
+        and moves their anchors to the tick"""
+        fired = self._fired(tick.value)
+        fired_from = self.anchor_ticks[fired]
+        self._move(fired, tick.pk, tick.value)
+        return self.ids[fired], fired_from
+
+    def evaluate_value(self, tick_id: int, value: float) -> np.ndarray:
+        """Returns the ids of the fired notifications and moves their anchors to the tick"""
+        fired = self._fired(value)
+        self._move(fired, tick_id, value)
+        return self.ids[fired]
+
+    def _fired(self, value: float) -> np.ndarray:
+        anchors = self.anchors
+        return (value >= anchors + self.changes) | (value <= anchors - self.changes)
+
+    def _move(self, fired: np.ndarray, tick_id: int, value: float):
+        moved = fired | np.isnan(self.anchors)
+        self.anchors[moved] = value
+        self.anchor_ticks[moved] = tick_id
+
+    def moved_anchors(self) -> Dict[int, np.ndarray]:
+        """Maps the new anchor ticks to the notifications moved since the rules were loaded"""
+        moved = self.anchor_ticks != self._loaded_anchor_ticks
+        anchor_ticks = self.anchor_ticks[moved]
+        ids = self.ids[moved]
+        return {int(tick_id): ids[anchor_ticks == tick_id]
+                for tick_id in np.unique(anchor_ticks)}
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def load_step_rules(ticker_ids: Iterable[int]) -> Dict[Tuple[int, int], StepRules]:
+    """Loads the active step notifications of the tickers without building model instances"""
+    rows = defaultdict(list)
+    query = (StepNotification.objects
+             .filter(ticker_id__in=set(ticker_ids))
+             .filter(is_active=True)
+             .order_by('pk')
+             .values_list('ticker_id', 'property', 'pk', 'change',
+                          'last_tick__value', 'last_tick_id'))
+    for ticker_id, property, *row in query:
+        rows[(ticker_id, property)].append(row)
+
+    rules = {}
+    for key, values in rows.items():
+        ids, changes, anchors, anchor_ticks = zip(*values)
+        rules[key] = StepRules(
+            ids=ids,
+            changes=changes,
+            anchors=[np.nan if anchor is None else anchor for anchor in anchors],
+            anchor_ticks=[tick_id or 0 for tick_id in anchor_ticks]
+        )
+    return rules
+
+
+def _evaluate_vectorized(ticks: List[Tick]):
+    rules = load_step_rules(tick.ticker_id for tick in ticks)
+    fired = []
+    for tick in ticks:
+        tick_rules = rules.get((tick.ticker_id, tick.property))
+        if tick_rules is not None:
+            ids, fired_from = tick_rules.evaluate(tick)
+            fired.extend(zip(ids.tolist(), fired_from.tolist()))
+
+    now = timezone.now()
+    moved = []
+    for tick_rules in rules.values():
+        for tick_id, ids in tick_rules.moved_anchors().items():
+            StepNotification.objects.filter(
+                pk__in=ids.tolist()
+            ).update(
+                last_tick_id=tick_id,
+                modified_at=now
+            )
+            moved.extend(ids.tolist())
+    if moved:
+        # the bulk update sends no post_save
+        invalidate(StepNotification._meta.model_name, moved)
+
+    if fired:
+        notifications = StepNotification.objects.select_related('user').in_bulk(
+            [pk for pk, _ in fired]
+        )
+        for pk, fired_from in fired:
+            notification = notifications.get(pk)
+            # deleted after the rules were loaded
+            if notification is not None:
+                tasks.send(notification, fired_from)
+
+
+def _evaluate_models(ticks: List[Tick]):
+    notifications = defaultdict(list)
+    query = (StepNotification.objects
+             .select_related('last_tick', 'user')
+             .filter(ticker_id__in={tick.ticker_id for tick in ticks})
+             .filter(is_active=True)
+             .order_by('pk'))
+    for notification in query:
+        notifications[notification.ticker_id].append(notification)
+
+    for tick in ticks:
+        for notification in notifications[tick.ticker_id]:
+            fired_from = notification.last_tick_id
+            if notification.should_send(tick):
+                tasks.send(notification, fired_from)
+
+
+def _evaluate_rolling(ticks: List[Tick]):
+    notifications = defaultdict(list)
+    query = (RollingNotification.objects
+             .select_related('user')
+             .filter(ticker_id__in={tick.ticker_id for tick in ticks})
+             .filter(is_active=True))
+    for notification in query:
+        window_key = notification.window_key
+        if window_key is not None and window_key[1] > settings.ROLLING_MAX_WINDOW:
+            # saved before the window was bounded, the window would not fit in the memory
+            continue
+        notifications[(notification.ticker_id, notification.property)].append(notification)
+
+    states = {}
+    for tick in ticks:
+        key = (tick.ticker_id, tick.property)
+        if key not in notifications:
+            continue
+        if key not in states:
+            window_keys = {notification.window_key for notification in notifications[key]}
+            window_keys.discard(None)
+            states[key] = statistics.state(key, window_keys, before=tick)
+        state = states[key]
+        if state.push(tick.pk, tick.value, tick.created_at):
+            for notification in notifications[key]:
+                if notification.should_send(state):
+                    tasks.send(notification, state.previous_tick_id or tick.pk)
+
+
+def evaluate_ticks(ticks: Iterable[Tick]):
+    """Evaluates the active notifications of the ticks' tickers in the order the ticks were saved
+
+    The notifications are loaded once per batch, so consecutive ticks of the same ticker
+    are compared against the anchors moved by the preceding ticks.
+    """
+    ticks = sorted(ticks, key=lambda tick: tick.pk)
+    if not ticks:
+        return
+    start = time.perf_counter()
+    with tasks.batched():
+        if settings.TICK_EVALUATOR == 'vectorized':
+            _evaluate_vectorized(ticks)
+        else:
+            _evaluate_models(ticks)
+        _evaluate_rolling(ticks)
+    metrics.TICK_EVALUATION_SECONDS.observe((time.perf_counter() - start) / len(ticks))
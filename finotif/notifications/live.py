@@ -0,0 +1,255 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import (
+    Dict,
+    Iterable,
+    Set,
+)
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.db import close_old_connections
+from redis.exceptions import RedisError
+from rest_framework_simplejwt.exceptions import (
+    InvalidToken,
+    AuthenticationFailed,
+)
+from .models import (
+    Tick,
+    Ticker,
+    TickerProperty,
+    User,
+)
+from .authentication import CachedJWTAuthentication
+from . import connections
+
+
+_logger = logging.getLogger(__name__)
+
+TICKET_SALT = 'finotif.live'
+_SUBSCRIPTIONS_EVENT = b'event: subscriptions\n'
+
+
+def tick_channel(ticker_id: int) -> str:
+    return f'live:ticks:{ticker_id}'
+
+
+def notification_channel(user_id: int) -> str:
+    return f'live:notifications:{user_id}'
+
+
+def _publish(channel: str, event: str, data: dict):
+    # published as a ready Server-Sent Events frame, so the clients get the same bytes
+    frame = 'event: {0}\ndata: {1}\n\n'.format(event, json.dumps(data))
+    try:
+        connections.redis_connection().publish(channel, frame)
+    except RedisError as er:
+        # called after the commit, a lost event must not fail the poll cycle or the request
+        _logger.error(f'Cannot publish {event} to {channel}: {er}')
+
+
+def publish_tick(tick: Tick):
+    _publish(tick_channel(tick.ticker_id), 'tick', {
+        'id': tick.pk,
+        'ticker': tick.ticker_id,
+        'property': TickerProperty(tick.property).label,
+        'value': tick.value,
+        'currency': tick.currency_id,
+        'created_at': tick.created_at.isoformat(),
+    })
+
+
+def publish_subscriptions_changed(user_id: int):
+    """Makes the user's connected clients subscribe to the tickers of the user's notifications again"""
+    _publish(notification_channel(user_id), 'subscriptions', {'user': user_id})
+
+
+def publish_notification(notification):
+    _publish(notification_channel(notification.user_id), 'notification', {
+        'id': notification.pk,
+        'kind': notification._meta.model_name,
+        'ticker': notification.ticker_id,
+        'title': notification.title,
+        'property': TickerProperty(notification.property).label,
+    })
+
+
+class Broadcaster:
+    """Fans out the messages of one Redis pub/sub connection to the connected clients
+
+    The process subscribes to a channel once, no matter how many clients listen to it,
+    so an idle client costs only its queue.
+    """
+
+    def __init__(self):
+        self._queues: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._pubsub = None
+        self._listener = None
+
+    async def subscribe(self, channels: Iterable[str], queue: asyncio.Queue):
+        if self._pubsub is None:
+            self._pubsub = connections.async_redis_connection().pubsub()
+        new_channels = [channel for channel in channels if not self._queues[channel]]
+        for channel in channels:
+            self._queues[channel].add(queue)
+        if new_channels:
+            await self._pubsub.subscribe(*new_channels)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.ensure_future(self._listen())
+
+    async def unsubscribe(self, channels: Iterable[str], queue: asyncio.Queue):
+        unused_channels = []
+        for channel in channels:
+            self._queues[channel].discard(queue)
+            if not self._queues[channel]:
+                del self._queues[channel]
+                unused_channels.append(channel)
+        if unused_channels:
+            await self._pubsub.unsubscribe(*unused_channels)
+
+    async def _listen(self):
+        while self._queues:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=1.0
+                )
+            except Exception as er:
+                # the pub/sub connection resubscribes the channels on reconnect
+                _logger.exception(er)
+                await asyncio.sleep(1)
+                continue
+            if message is None:
+                continue
+            channel = message['channel'].decode()
+            for queue in self._queues.get(channel, ()):
+                try:
+                    queue.put_nowait(message['data'])
+                except asyncio.QueueFull:
+                    _logger.warning(f'Dropped a message of {channel}, the client is too slow')
+
+
+broadcaster = Broadcaster()
+
+
+@sync_to_async
+def _database_call(function, *args):
+    # the endpoint bypasses the request handler, which closes the connections otherwise
+    close_old_connections()
+    try:
+        return function(*args)
+    finally:
+        close_old_connections()
+
+
+def ticket(user) -> str:
+    """Short-lived signed user id, sent as the ticket query param by the EventSource clients"""
+    return signing.TimestampSigner(salt=TICKET_SALT).sign(str(user.pk))
+
+
+def _authenticate(raw_token: bytes, raw_ticket: str):
+    if raw_token:
+        authentication = CachedJWTAuthentication()
+        token = authentication.get_validated_token(raw_token)
+        return authentication.get_user(token)
+    try:
+        user_id = signing.TimestampSigner(salt=TICKET_SALT).unsign(
+            raw_ticket,
+            max_age=settings.LIVE_EVENTS_TICKET_MAX_AGE
+        )
+        return User.objects.get(pk=int(user_id), is_active=True)
+    except (signing.BadSignature, User.DoesNotExist):
+        raise AuthenticationFailed('Invalid or expired ticket')
+
+
+def _subscribed_channels(user, symbols=None):
+    tickers = Ticker.of_user(user)
+    if symbols:
+        tickers = tickers.filter(symbol__in=[symbol.strip().upper() for symbol in symbols])
+    channels = [tick_channel(pk) for pk in tickers.values_list('pk', flat=True)]
+    channels.append(notification_channel(user.pk))
+    return channels
+
+
+async def _resubscribe(user, symbols, channels, queue: asyncio.Queue):
+    subscribed = await _database_call(_subscribed_channels, user, symbols)
+    await broadcaster.subscribe([channel for channel in subscribed if channel not in channels], queue)
+    await broadcaster.unsubscribe([channel for channel in channels if channel not in subscribed], queue)
+    return subscribed
+
+
+def _raw_token(scope) -> bytes:
+    # never read from the query, the access logs keep the urls
+    for name, value in scope['headers']:
+        if name == b'authorization' and value.startswith(b'Bearer '):
+            return value[len(b'Bearer '):]
+    return b''
+
+
+async def _response(send, status, body=b''):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json')],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def live_events(scope, receive, send):
+    """Server-Sent Events of the ticks of the user's tickers and the user's fired notifications
+
+    Query params: ticket - from POST /api/liveTicket/ unless the JWT is sent in the Authorization
+    header, symbols - comma separated symbols to subscribe to, all the user's tickers by default.
+    The tickers are subscribed to again whenever a notification of the user is saved or deleted.
+    """
+    query = parse_qs(scope['query_string'].decode())
+    try:
+        user = await _database_call(_authenticate, _raw_token(scope), query.get('ticket', [''])[0])
+    except (InvalidToken, AuthenticationFailed):
+        return await _response(send, 401, b'{"detail": "Authentication credentials were not provided."}')
+
+    symbols = query.get('symbols', [''])[0].split(',') if 'symbols' in query else None
+    channels = await _database_call(_subscribed_channels, user, symbols)
+    queue = asyncio.Queue(maxsize=settings.LIVE_EVENTS_QUEUE_SIZE)
+    await broadcaster.subscribe(channels, queue)
+
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        while not disconnected.done():
+            message = asyncio.ensure_future(queue.get())
+            await asyncio.wait(
+                {message, disconnected},
+                timeout=settings.LIVE_EVENTS_KEEPALIVE,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if message.done():
+                body = message.result()
+                if body.startswith(_SUBSCRIPTIONS_EVENT):
+                    # the user's tickers changed, the event is not sent to the client
+                    channels = await _resubscribe(user, symbols, channels, queue)
+                    continue
+            else:
+                message.cancel()
+                body = b': keepalive\n\n'
+            if not disconnected.done():
+                await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    finally:
+        disconnected.cancel()
+        await broadcaster.unsubscribe(channels, queue)
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
@@ -0,0 +1,338 @@
+"""Load test of the JWT authenticated REST endpoints
+
+seed() creates the users, tickers, notifications and notes, run_load() replays a weighted
+request mix per virtual user against a running server and query_counts() replays one
+request per endpoint in-process to count its database queries.
+"""
+import logging
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+import requests
+from django.contrib.auth.hashers import make_password
+from django.db import (
+    connection,
+    transaction,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from .models import (
+    User,
+    Exchange,
+    Ticker,
+    StepNotification,
+    Note,
+    TickerProperty,
+    NotificationType,
+)
+
+
+_logger = logging.getLogger(__name__)
+
+USER_PREFIX = 'load_user_'
+SYMBOL_PREFIX = 'LOAD'
+DEFAULT_PASSWORD = 'load-test-password'
+
+
+class LoadTestFailed(Exception):
+    """Virtual users stopped by an error other than a failed request, the results would be partial"""
+
+    def __init__(self, failures: List[Exception], concurrency: int):
+        super().__init__(f'{len(failures)} of {concurrency} virtual users failed, the first: {failures[0]!r}')
+        self.failures = failures
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    name: str
+    weight: int
+
+
+# Mostly the list and detail reads of the dashboard, with the occasional new note
+MIX = (
+    Endpoint('ticker-list', 25),
+    Endpoint('ticker-detail', 10),
+    Endpoint('stepnotification-list', 25),
+    Endpoint('stepnotification-detail', 10),
+    Endpoint('note-list', 15),
+    Endpoint('note-detail', 10),
+    Endpoint('note-create', 5),
+)
+
+
+def seed(users: int, tickers: int, notifications: int, notes: int,
+         password: str = DEFAULT_PASSWORD) -> List[str]:
+    """Creates the users with the notifications and notes spread over the tickers, returns the usernames"""
+    generator = random.Random(0)
+    exchange = Exchange.objects.get(mic='XNAS')
+    password = make_password(password)
+    created_users = User.objects.bulk_create([
+        User(
+            username=f'{USER_PREFIX}{i}',
+            email=f'{USER_PREFIX}{i}@email.com',
+            password=password
+        )
+        for i in range(users)
+    ])
+    created_tickers = Ticker.objects.bulk_create([
+        Ticker(
+            symbol=f'{SYMBOL_PREFIX}{i:04}',
+            short_name=f'{SYMBOL_PREFIX}{i:04}',
+            name=f'{SYMBOL_PREFIX}{i:04} Inc.',
+            description='Load test ticker',
+            exchange=exchange
+        )
+        for i in range(tickers)
+    ])
+    properties = TickerProperty.values
+    StepNotification.objects.bulk_create([
+        StepNotification(
+            title=f'Load test notification {i}',
+            content='Load test content',
+            type=NotificationType.EMAIL,
+            property=generator.choice(properties),
+            change=round(generator.uniform(0.1, 5.0), 2),
+            ticker=generator.choice(created_tickers),
+            user=user
+        )
+        for user in created_users for i in range(notifications)
+    ], batch_size=1000)
+    Note.objects.bulk_create([
+        Note(
+            title=f'Load test note {i}',
+            content='Load test content',
+            ticker=generator.choice(created_tickers),
+            user=user
+        )
+        for user in created_users for i in range(notes)
+    ], batch_size=1000)
+    return [user.username for user in created_users]
+
+
+def clear():
+    """Deletes the seeded data, the notifications and notes are deleted by the cascade"""
+    User.objects.filter(username__startswith=USER_PREFIX).delete()
+    Ticker.objects.filter(symbol__startswith=SYMBOL_PREFIX).delete()
+
+
+def seeded_usernames() -> List[str]:
+    return list(User.objects
+                .filter(username__startswith=USER_PREFIX)
+                .order_by('pk')
+                .values_list('username', flat=True))
+
+
+class HttpTransport:
+    """Requests sent to a running server"""
+
+    def __init__(self, base_url: str):
+        self._base_url = base_url.rstrip('/')
+        self._session = requests.Session()
+
+    def authenticate(self, username: str, password: str):
+        status, body = self.request('POST', reverse('token_obtain_pair'),
+                                    {'username': username, 'password': password})
+        if status != 200:
+            raise ValueError(f'Cannot obtain the token of {username}, status={status}')
+        self._session.headers['Authorization'] = f'Bearer {body["access"]}'
+
+    def request(self, method: str, url: str, data: dict = None) -> Tuple[int, Optional[dict]]:
+        if not url.startswith('http'):
+            url = f'{self._base_url}{url}'
+        response = self._session.request(method, url, json=data, timeout=30)
+        body = response.json() if response.ok and response.content else None
+        return response.status_code, body
+
+
+class InProcessTransport:
+    """Requests handled by the test client in the current process and database connection"""
+
+    def __init__(self):
+        self._client = APIClient(HTTP_HOST='localhost')
+
+    def authenticate(self, username: str, password: str):
+        status, body = self.request('POST', reverse('token_obtain_pair'),
+                                    {'username': username, 'password': password})
+        if status != 200:
+            raise ValueError(f'Cannot obtain the token of {username}, status={status}')
+        self._client.credentials(HTTP_AUTHORIZATION=f'Bearer {body["access"]}')
+
+    def request(self, method: str, url: str, data: dict = None) -> Tuple[int, Optional[dict]]:
+        response = getattr(self._client, method.lower())(url, data, format='json')
+        body = response.json() if 200 <= response.status_code < 300 and response.content else None
+        return response.status_code, body
+
+
+class VirtualUser:
+    """Signs in and browses the lists first, the detail requests follow the returned urls"""
+
+    def __init__(self, transport, username: str, password: str, generator: random.Random):
+        self._transport = transport
+        self._username = username
+        self._password = password
+        self._random = generator
+        self._urls: Dict[str, List[str]] = {}
+
+    def start(self):
+        self._transport.authenticate(self._username, self._password)
+        for name in ('ticker', 'stepnotification', 'note'):
+            self.call(Endpoint(f'{name}-list', 0))
+
+    def call(self, endpoint: Endpoint) -> int:
+        name, action = endpoint.name.rsplit('-', 1)
+        if action == 'list':
+            status, body = self._transport.request('GET', reverse(endpoint.name))
+            if body is not None:
+                self._urls[name] = [result['url'] for result in body['results']] or self._urls.get(name, [])
+        elif action == 'detail':
+            urls = self._urls.get(name)
+            if not urls:
+                return self.call(Endpoint(f'{name}-list', 0))
+            status, body = self._transport.request('GET', self._random.choice(urls))
+        else:
+            tickers = self._urls.get('ticker')
+            status, body = self._transport.request('POST', reverse(f'{name}-list'), {
+                'title': f'Note of {self._username}',
+                'content': 'Created by the load test',
+                'ticker': self._random.choice(tickers) if tickers else None,
+            })
+        return status
+
+    def choose(self) -> Endpoint:
+        return self._random.choices(MIX, weights=[endpoint.weight for endpoint in MIX])[0]
+
+
+@dataclass(frozen=True)
+class EndpointResult:
+    name: str
+    requests: int
+    errors: int
+    throughput: float
+    p50: float
+    p95: float
+    p99: float
+    queries: Optional[int] = None
+
+    def __str__(self):
+        return '{0:<26}{1:>9}{2:>8}{3:>10.1f} rps{4:>9.1f}{5:>9.1f}{6:>9.1f} ms{7:>9}'.format(
+            self.name, self.requests, self.errors, self.throughput,
+            self.p50 * 1000, self.p95 * 1000, self.p99 * 1000,
+            '-' if self.queries is None else self.queries
+        )
+
+
+HEADER = '{0:<26}{1:>9}{2:>8}{3:>14}{4:>9}{5:>9}{6:>12}{7:>9}'.format(
+    'endpoint', 'requests', 'errors', 'throughput', 'p50', 'p95', 'p99', 'queries'
+)
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """Nearest-rank percentile of the sorted values"""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+def run_load(base_url: str, usernames: List[str], duration: float, concurrency: int,
+             password: str = DEFAULT_PASSWORD, seed: int = 0) -> List[EndpointResult]:
+    """Runs concurrency virtual users for duration seconds, each with its own session and random seed
+
+    The failed requests are counted as the endpoints' errors, any other exception of a virtual
+    user - a failed sign-in or an unexpected response - raises LoadTestFailed after the run.
+    """
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    failures = []
+    lock = threading.Lock()
+    deadline = []
+    # the sign-ins are not measured, the clock starts when all the users are signed in
+    started = threading.Barrier(
+        concurrency + 1,
+        action=lambda: deadline.append(time.monotonic() + duration)
+    )
+
+    def worker(index: int):
+        # an exception would end the thread silently, with its measurements
+        try:
+            measure(index)
+        except Exception as er:
+            _logger.error(f'Virtual user {index} failed: {er!r}')
+            with lock:
+                failures.append(er)
+
+    def measure(index: int):
+        user = VirtualUser(
+            HttpTransport(base_url),
+            usernames[index % len(usernames)],
+            password,
+            random.Random(seed + index)
+        )
+        try:
+            user.start()
+        finally:
+            started.wait()
+        own_latencies = defaultdict(list)
+        own_errors = defaultdict(int)
+        while time.monotonic() < deadline[0]:
+            endpoint = user.choose()
+            start = time.perf_counter()
+            try:
+                status = user.call(endpoint)
+            except requests.RequestException as er:
+                _logger.error(f'{endpoint.name}: {er}')
+                status = None
+            own_latencies[endpoint.name].append(time.perf_counter() - start)
+            if status is None or status >= 400:
+                own_errors[endpoint.name] += 1
+        with lock:
+            for name, values in own_latencies.items():
+                latencies[name].extend(values)
+                errors[name] += own_errors[name]
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    started.wait()
+    for thread in threads:
+        thread.join()
+    if failures:
+        raise LoadTestFailed(failures, concurrency)
+    elapsed = time.monotonic() - deadline[0] + duration
+
+    results = []
+    for endpoint in MIX:
+        values = sorted(latencies.get(endpoint.name, []))
+        results.append(EndpointResult(
+            name=endpoint.name,
+            requests=len(values),
+            errors=errors.get(endpoint.name, 0),
+            throughput=len(values) / elapsed,
+            p50=percentile(values, 50),
+            p95=percentile(values, 95),
+            p99=percentile(values, 99),
+        ))
+    return results
+
+
+def query_counts(username: str, password: str = DEFAULT_PASSWORD) -> Dict[str, int]:
+    """Database queries of one request per endpoint, the created rows are rolled back"""
+    counts = {}
+    with transaction.atomic():
+        user = VirtualUser(InProcessTransport(), username, password, random.Random(0))
+        user.start()
+        for endpoint in MIX:
+            with CaptureQueriesContext(connection) as queries:
+                user.call(endpoint)
+            counts[endpoint.name] = len(queries)
+        transaction.set_rollback(True)
+    return counts
@@ -0,0 +1,40 @@
+from argparse import ArgumentTypeError
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from ...archive import (
+    ArchiveLocked,
+    archive_cutoff,
+    archive_ticks,
+)
+
+
+def cutoff_datetime(value: str):
+    """The ISO 8601 datetime, in the current time zone when it has no offset"""
+    try:
+        cutoff = parse_datetime(value)
+    except ValueError:
+        cutoff = None
+    if cutoff is None:
+        raise ArgumentTypeError(f'{value!r} is not an ISO 8601 datetime')
+    return cutoff if timezone.is_aware(cutoff) else timezone.make_aware(cutoff)
+
+
+class Command(BaseCommand):
+    help = ('Moves the ticks created before the cutoff to the archive files of TICK_ARCHIVE_DIR, '
+            'by default the start of the month of TICK_ARCHIVE_AFTER_DAYS ago')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', type=cutoff_datetime,
+                            help='ISO 8601, the cutoff, in TIME_ZONE without an offset')
+
+    def handle(self, *args, **options):
+        cutoff = options['before'] or archive_cutoff()
+        try:
+            archived = archive_ticks(cutoff)
+        except ArchiveLocked as er:
+            raise CommandError(str(er))
+        self.stdout.write(f'Archived {archived} ticks created before {cutoff.isoformat()}')
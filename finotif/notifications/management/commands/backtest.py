@@ -0,0 +1,46 @@
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.utils.dateparse import parse_datetime
+from ...backtest import backtest
+from ...models import (
+    Ticker,
+    TickerProperty,
+)
+
+
+class Command(BaseCommand):
+    help = ('Counts how many times step notifications with the given changes would have been sent '
+            'over the stored ticks, nothing is saved or sent')
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbol')
+        parser.add_argument('--property', default=TickerProperty.PRICE.label,
+                            choices=[label for _, label in TickerProperty.choices])
+        parser.add_argument('--changes', type=float, nargs='+', required=True,
+                            help='Candidate changes, all tested in one pass')
+        parser.add_argument('--since', type=parse_datetime, help='ISO 8601, including')
+        parser.add_argument('--until', type=parse_datetime, help='ISO 8601, excluding')
+        parser.add_argument('--timestamps', action='store_true', help='Print the fire timestamps')
+
+    def handle(self, *args, **options):
+        ticker = Ticker.objects.filter(symbol=options['symbol'].strip().upper()).first()
+        if ticker is None:
+            raise CommandError(f'Ticker {options["symbol"]} is not tracked')
+        if any(change <= 0 for change in options['changes']):
+            raise CommandError('The changes must be greater than zero')
+
+        result = backtest(
+            ticker=ticker,
+            property=TickerProperty[options['property']],
+            changes=options['changes'],
+            since=options['since'],
+            until=options['until'],
+            timestamps_limit=None if options['timestamps'] else 0
+        )
+        self.stdout.write(f'{ticker.symbol} {result.property.label}: {result.ticks} ticks')
+        for change in result.changes:
+            self.stdout.write(f'  change={change.change:g} fires={change.fires}')
+            for timestamp in change.timestamps:
+                self.stdout.write(f'    {timestamp.isoformat()}')
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from ...benchmarks import (
+    seed,
+    run_stages,
+)
+
+
+class Command(BaseCommand):
+    help = ('Times the stages of the poll-and-notify pipeline against the stepping synthetic provider, '
+            'the seeded data is rolled back')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickers', type=int, default=100)
+        parser.add_argument('--notifications', type=int, default=10000)
+        parser.add_argument('--rounds', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            seed(options['tickers'], options['notifications'])
+            for round in range(1, options['rounds'] + 1):
+                self.stdout.write(f'Round {round}')
+                for result in run_stages():
+                    self.stdout.write(f'  {result}')
+            transaction.set_rollback(True)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from ...streams import (
+    TickStream,
+    TickEvaluator,
+)
+
+
+class Command(BaseCommand):
+    help = 'Consumes the tick stream and sends the notifications triggered by the ticks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--consumer', help='Unique name of the evaluator within the group')
+        parser.add_argument('--block', type=int, default=5000,
+                            help='Milliseconds to wait for new ticks per read')
+
+    def handle(self, *args, **options):
+        evaluator = TickEvaluator(TickStream(), consumer=options['consumer'])
+        evaluator.run(block=options['block'])
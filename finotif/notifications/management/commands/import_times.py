@@ -0,0 +1,54 @@
+import os
+import re
+import subprocess
+import sys
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+
+# import time: self [us] | cumulative | imported package
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+class Command(BaseCommand):
+    help = ('Imports the project in a new interpreter with -X importtime, '
+            'prints the total startup cost and the slowest modules')
+
+    def add_arguments(self, parser):
+        parser.add_argument('modules', nargs='*', default=['config.urls'],
+                            help='Imported after django.setup(), the url conf of a web worker by default')
+        parser.add_argument('--sort', choices=['self', 'cumulative'], default='cumulative')
+        parser.add_argument('--limit', type=int, default=25)
+        parser.add_argument('--top-level', action='store_true',
+                            help='Only the modules imported by the project, with their dependencies included')
+
+    def handle(self, *args, **options):
+        imports = '; '.join(f'import {module}' for module in options['modules'])
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import django; django.setup(); {imports}'],
+            env=os.environ.copy(),
+            capture_output=True,
+            text=True,
+        )
+        if process.returncode:
+            # the exception of the import, none if the interpreter was killed
+            lines = process.stderr.strip().splitlines()
+            error = f': {lines[-1]}' if lines else ''
+            raise CommandError(f'The import exited with code {process.returncode}{error}')
+
+        rows = []
+        for line in process.stderr.splitlines():
+            match = _LINE.match(line)
+            if match:
+                own, cumulative, indent, module = match.groups()
+                rows.append((int(own), int(cumulative), len(indent) // 2, module))
+        total = sum(own for own, *_ in rows)
+        if options['top_level']:
+            rows = [row for row in rows if row[2] == 0]
+        rows.sort(key=lambda row: row[0 if options['sort'] == 'self' else 1], reverse=True)
+
+        self.stdout.write(f'{len(rows)} modules, {total / 1000:.1f} ms in total')
+        self.stdout.write(f'{"self ms":>10} {"cumulative ms":>14}  module')
+        for own, cumulative, _, module in rows[:options['limit']]:
+            self.stdout.write(f'{own / 1000:>10.1f} {cumulative / 1000:>14.1f}  {module}')
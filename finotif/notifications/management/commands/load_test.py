@@ -0,0 +1,55 @@
+from dataclasses import replace
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from ...loadtest import (
+    DEFAULT_PASSWORD,
+    HEADER,
+    LoadTestFailed,
+    seeded_usernames,
+    run_load,
+    query_counts,
+)
+
+
+class Command(BaseCommand):
+    help = ('Sends the request mix of the seeded users (seed_load_test) to a running server, '
+            'reports the throughput, p50/p95/p99 latency and queries per endpoint')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds')
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--password', default=DEFAULT_PASSWORD)
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the request mix')
+        parser.add_argument('--no-queries', action='store_true',
+                            help='Skip counting the queries against the local database')
+
+    def handle(self, *args, **options):
+        usernames = seeded_usernames()
+        if not usernames:
+            raise CommandError('No seeded users, run seed_load_test first')
+
+        try:
+            results = run_load(
+                options['url'],
+                usernames,
+                duration=options['duration'],
+                concurrency=options['concurrency'],
+                password=options['password'],
+                seed=options['seed']
+            )
+        except LoadTestFailed as er:
+            raise CommandError(str(er))
+        if not options['no_queries']:
+            counts = query_counts(usernames[0], options['password'])
+            results = [replace(result, queries=counts.get(result.name)) for result in results]
+
+        self.stdout.write(HEADER)
+        for result in results:
+            self.stdout.write(str(result))
+        total = sum(result.requests for result in results)
+        throughput = sum(result.throughput for result in results)
+        self.stdout.write(f'{total} requests, {throughput:.1f} requests/s with '
+                          f'{options["concurrency"]} virtual users')
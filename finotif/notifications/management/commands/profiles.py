@@ -0,0 +1,41 @@
+import glob
+import io
+import os
+import pstats
+from django.conf import settings
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from ...profiling import signature
+
+
+class Command(BaseCommand):
+    help = ('Lists the stored profiles per request path and task name, '
+            'or prints the merged stats of one of them')
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', nargs='?',
+                            help='e.g. tasks/finotif.notifications.tasks.request_yahoo_api')
+        parser.add_argument('--sort', default='cumulative')
+        parser.add_argument('--limit', type=int, default=settings.PROFILING_STATS_LIMIT)
+        parser.add_argument('--token', action='store_true',
+                            help='Prints a value of the X-Profile header')
+
+    def handle(self, *args, **options):
+        if options['token']:
+            self.stdout.write(signature())
+            return
+        if not options['name']:
+            for directory in sorted(glob.glob(os.path.join(settings.PROFILING_DIR, '*', '*'))):
+                files = glob.glob(os.path.join(directory, '*.prof'))
+                self.stdout.write(f'{os.path.relpath(directory, settings.PROFILING_DIR)} ({len(files)})')
+            return
+
+        files = sorted(glob.glob(os.path.join(settings.PROFILING_DIR, options['name'], '*.prof')))
+        if not files:
+            raise CommandError(f'No profiles of {options["name"]}')
+        stream = io.StringIO()
+        stats = pstats.Stats(*files, stream=stream)
+        stats.sort_stats(options['sort']).print_stats(options['limit'])
+        self.stdout.write(stream.getvalue())
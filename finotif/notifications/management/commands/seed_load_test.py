@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from ...loadtest import (
+    DEFAULT_PASSWORD,
+    seed,
+    clear,
+)
+
+
+class Command(BaseCommand):
+    help = 'Creates the users, tickers, step notifications and notes used by the load_test command'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--tickers', type=int, default=200)
+        parser.add_argument('--notifications', type=int, default=50, help='Per user')
+        parser.add_argument('--notes', type=int, default=20, help='Per user')
+        parser.add_argument('--password', default=DEFAULT_PASSWORD)
+        parser.add_argument('--clear', action='store_true', help='Only delete the seeded data')
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        clear()
+        if options['clear']:
+            return
+        usernames = seed(
+            users=options['users'],
+            tickers=options['tickers'],
+            notifications=options['notifications'],
+            notes=options['notes'],
+            password=options['password']
+        )
+        self.stdout.write(f'Seeded {len(usernames)} users ({usernames[0]}..{usernames[-1]})'
+                          if usernames else 'Seeded no users')
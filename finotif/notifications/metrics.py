@@ -0,0 +1,160 @@
+"""Prometheus metrics of the poll, evaluation and delivery pipeline
+
+With the PROMETHEUS_MULTIPROC_DIR environment variable set, every process (web, celery
+workers, tick evaluators) writes its samples to the shared directory and the /api/metrics
+endpoint aggregates them, otherwise the endpoint exposes the samples of its own process.
+"""
+import logging
+import os
+import time
+from celery import current_app
+from celery.signals import (
+    before_task_publish,
+    task_postrun,
+    task_failure,
+)
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+from . import connections
+
+
+_logger = logging.getLogger(__name__)
+
+# Tasks whose latency from enqueueing to the end of the run is the delivery latency
+DELIVERY_TASKS = {
+    'finotif.notifications.tasks.send_email',
+    'finotif.notifications.tasks.send_push',
+}
+
+PROVIDER_REQUEST_SECONDS = Histogram(
+    'finotif_provider_request_seconds',
+    'Latency of a request to the ticker provider',
+    ['provider']
+)
+PROVIDER_THROTTLED = Counter(
+    'finotif_provider_throttled',
+    'Provider requests delayed or deferred by the rate limiter',
+    ['outcome']
+)
+POLL_CYCLE_SECONDS = Histogram(
+    'finotif_poll_cycle_seconds',
+    'Duration of a request_yahoo_api poll cycle',
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 45, 60, 90, 120, float('inf'))
+)
+POLL_CYCLES = Counter(
+    'finotif_poll_cycles',
+    'Poll cycles by outcome - completed, overrun (tickers deferred) or skipped (overlap)',
+    ['outcome']
+)
+DEFERRED_TICKERS = Counter(
+    'finotif_deferred_tickers',
+    'Tickers not polled before the deadline of their cycle'
+)
+TICK_EVALUATION_SECONDS = Histogram(
+    'finotif_tick_evaluation_seconds',
+    'Evaluation time per tick, averaged over the evaluated batch',
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, float('inf'))
+)
+DELIVERY_LATENCY_SECONDS = Histogram(
+    'finotif_delivery_latency_seconds',
+    'Time from enqueueing a notification to its delivery',
+    ['task'],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, float('inf'))
+)
+TICKS_SAVED = Counter(
+    'finotif_ticks_saved',
+    'Ticks saved by the poller'
+)
+NOTIFICATIONS_FIRED = Counter(
+    'finotif_notifications_fired',
+    'Notifications sent by the evaluators',
+    ['kind', 'type']
+)
+DUPLICATE_DELIVERIES = Counter(
+    'finotif_duplicate_deliveries',
+    'Notifications fired again by an already evaluated tick and not sent'
+)
+FAILURES = Counter(
+    'finotif_failures',
+    'Failed provider requests, evaluation batches and tasks',
+    ['stage']
+)
+
+
+class QueueCollector:
+    """Length of the celery queue, read from the broker when scraped"""
+
+    @staticmethod
+    def _gauge() -> GaugeMetricFamily:
+        return GaugeMetricFamily(
+            'finotif_queue_length',
+            'Messages waiting in the celery queue',
+            labels=['queue']
+        )
+
+    def describe(self):
+        # the registry collects the collectors without describe when they are registered
+        return [self._gauge()]
+
+    def collect(self):
+        queue = current_app.conf.task_default_queue
+        gauge = self._gauge()
+        try:
+            gauge.add_metric([queue], connections.redis_connection().llen(queue))
+        except Exception as er:
+            _logger.error(f'Cannot read the length of {queue}: {er}')
+            return
+        yield gauge
+
+
+def _task_name(name: str) -> str:
+    return name.rsplit('.', 1)[-1]
+
+
+@before_task_publish.connect
+def stamp_enqueued_at(headers=None, **kwargs):
+    # custom headers are available as the attributes of the task request in the worker
+    if headers is not None:
+        headers.setdefault('enqueued_at', time.time())
+
+
+@task_postrun.connect
+def observe_delivery(sender=None, state=None, **kwargs):
+    if sender is None or sender.name not in DELIVERY_TASKS or state != 'SUCCESS':
+        return
+    enqueued_at = getattr(sender.request, 'enqueued_at', None)
+    if enqueued_at is not None:
+        DELIVERY_LATENCY_SECONDS.labels(_task_name(sender.name)).observe(
+            max(0.0, time.time() - enqueued_at)
+        )
+
+
+@task_failure.connect
+def count_task_failure(sender=None, **kwargs):
+    if sender is not None:
+        FAILURES.labels(_task_name(sender.name)).inc()
+
+
+def registry() -> CollectorRegistry:
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        collector_registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(collector_registry)
+        collector_registry.register(QueueCollector())
+        return collector_registry
+    return REGISTRY
+
+
+REGISTRY.register(QueueCollector())
+
+
+def metrics_view(request):
+    return HttpResponse(generate_latest(registry()), content_type=CONTENT_TYPE_LATEST)
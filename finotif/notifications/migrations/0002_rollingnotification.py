@@ -0,0 +1,36 @@
+# Generated by Django 3.2.25 on 2026-10-19 14:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', 'populate_model_defaults'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollingNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('title', models.TextField()),
+                ('content', models.TextField()),
+                ('type', models.IntegerField(choices=[(0, 'EMAIL'), (1, 'PUSH')], default=0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('property', models.IntegerField(choices=[(0, 'PRICE'), (1, 'VOLUME'), (2, 'ASK'), (3, 'ASK_SIZE'), (4, 'BID'), (5, 'BID_SIZE')])),
+                ('rule', models.IntegerField(choices=[(0, 'PERCENT_CHANGE'), (1, 'LEVEL_CROSS'), (2, 'MOVING_AVERAGE_CROSS')])),
+                ('threshold', models.FloatField(blank=True, help_text='The percent of PERCENT_CHANGE or the level of LEVEL_CROSS', null=True)),
+                ('window', models.PositiveIntegerField(blank=True, help_text='Minutes of PERCENT_CHANGE or periods of MOVING_AVERAGE_CROSS', null=True)),
+                ('ticker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='notifications.ticker')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
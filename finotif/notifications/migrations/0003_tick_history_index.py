@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-19 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_rollingnotification'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tick',
+            index=models.Index(fields=['ticker', 'property', 'id'], name='tick_history_idx'),
+        ),
+    ]
@@ -1,13 +1,18 @@
 import logging
 import dataclasses
-from datetime import datetime
+from datetime import (
+    datetime,
+    timedelta,
+)
+from django.conf import settings
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import validate_email
 from django.utils.translation import gettext as _
 from django.core.exceptions import ValidationError
 from .services import (
-    YahooTickerProvider as TickerProvider,
+    ticker_provider,
     TickerStateDto
 )
 
@@ -92,12 +97,24 @@ class Exchange(TimestampedModel, DescriptiveModel):
     class Meta:
         ordering = 'mic',
 
-    def is_open(self):
-        now = datetime.utcnow()
+    def is_open(self, now: datetime = None):
+        now = now or datetime.utcnow()
         if now.weekday() in (5, 6):
             return False
-        time = datetime.utcnow().time()
-        return self.opens_at <= time <= self.closes_at
+        return self.opens_at <= now.time() <= self.closes_at
+
+    def next_open(self, now: datetime = None) -> datetime:
+        """The next opening after now, in the UTC as is_open"""
+        now = now or datetime.utcnow()
+        day = now.date() if now.time() < self.opens_at else now.date() + timedelta(days=1)
+        while day.weekday() in (5, 6):
+            day += timedelta(days=1)
+        return datetime.combine(day, self.opens_at)
+
+    def next_close(self, now: datetime = None) -> datetime:
+        """The first moment is_open is false after the session open at now"""
+        now = now or datetime.utcnow()
+        return datetime.combine(now.date(), self.closes_at) + timedelta(seconds=1)
 
 
 class Ticker(TimestampedModel, DescriptiveModel):
@@ -109,6 +126,22 @@ class Ticker(TimestampedModel, DescriptiveModel):
     class Meta:
         ordering = 'symbol',
 
+    @classmethod
+    def tracked(cls):
+        """Tickers with at least one active notification"""
+        query = Q()
+        for model in NOTIFICATION_MODELS:
+            query |= Q(pk__in=model.objects.filter(is_active=True).values('ticker_id'))
+        return cls.objects.filter(query)
+
+    @classmethod
+    def of_user(cls, user):
+        """Tickers the notifications of the user are associated with"""
+        query = Q()
+        for model in NOTIFICATION_MODELS:
+            query |= Q(pk__in=model.objects.filter(user=user).values('ticker_id'))
+        return cls.objects.filter(query)
+
     @classmethod
     def get_or_create(cls, symbol: str, mic: str):
         symbol = symbol.strip().upper()
@@ -119,7 +152,7 @@ class Ticker(TimestampedModel, DescriptiveModel):
                 f'Market Identifier Code (MIC) "{mic}" is not supported'
             )
         if ticker is None:
-            info = TickerProvider(symbol=symbol).info()
+            info = ticker_provider(symbol).info()
             if info:
                 ticker = Ticker(
                     symbol=symbol,
@@ -172,6 +205,12 @@ class NotificationType(models.IntegerChoices):
     PUSH = 1, _('PUSH')
 
 
+class RollingRule(models.IntegerChoices):
+    PERCENT_CHANGE = 0, _('PERCENT_CHANGE')
+    LEVEL_CROSS = 1, _('LEVEL_CROSS')
+    MOVING_AVERAGE_CROSS = 2, _('MOVING_AVERAGE_CROSS')
+
+
 class Tick(CreatedAtModel):
     """The smallest recognized value by which a property of a security may fluctuate"""
 
@@ -182,9 +221,16 @@ class Tick(CreatedAtModel):
     currency = models.ForeignKey(Currency, on_delete=models.CASCADE)
     property = models.IntegerField(choices=TickerProperty.choices)
 
+    class Meta:
+        indexes = [
+            # the history of a (ticker, property) pair in the order the ticks were saved
+            models.Index(fields=['ticker', 'property', 'id'], name='tick_history_idx'),
+        ]
+
     @classmethod
-    def save_ticks(cls, state: TickerStateDto, ticker: Ticker):
-        if not state or not ticker:
+    def save_ticks(cls, state: TickerStateDto, ticker_id: int):
+        """Saves a tick per positive property of the state, the ticker by its id - no instance is needed"""
+        if not state or ticker_id is None:
             return None
         properties = [prop.lower().replace(' ', '_')
                       for value, prop in TickerProperty.choices]
@@ -201,7 +247,7 @@ class Tick(CreatedAtModel):
                 if value > 0:
                     tick = cls.objects.create(
                         value=value,
-                        ticker=ticker,
+                        ticker_id=ticker_id,
                         currency=currency,
                         property=getattr(TickerProperty, name.upper())
                     )
@@ -230,26 +276,12 @@ class Notification(TimestampedModel, TitleContentModel):
     ticker = models.ForeignKey(Ticker, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    # fields which, together with the user and the ticker, identify a duplicate
+    identity_fields = ()
+
     class Meta:
         abstract = True
 
-    def __str__(self):
-        return 'pk={0},title={1},type={2},is_active={3}'.format(
-            self.pk,
-            self.title,
-            self.type,
-            self.is_active
-        )
-
-
-class StepNotification(Notification):
-    change = models.FloatField(
-        help_text='Send the notification when a property of the ticker '
-                  'increased/decreased by the value of this field',
-        validators=(validate_greater_than_zero,)
-    )
-    last_tick = models.ForeignKey(Tick, on_delete=models.CASCADE, null=True)
-
     @classmethod
     def save_notification(cls, notification_serializer):
         notification_serializer.is_valid(raise_exception=True)
@@ -260,7 +292,7 @@ class StepNotification(Notification):
         exists_query = cls.objects.filter(
             user=data['user']
         ).filter(
-            change=data['change']
+            **{field: data[field] for field in cls.identity_fields}
         ).filter(
             ticker=ticker
         ).exclude(
@@ -273,6 +305,25 @@ class StepNotification(Notification):
             obj, created = cls.objects.update_or_create(id=pk, defaults=defaults)
             return obj
 
+    def __str__(self):
+        return 'pk={0},title={1},type={2},is_active={3}'.format(
+            self.pk,
+            self.title,
+            self.type,
+            self.is_active
+        )
+
+
+class StepNotification(Notification):
+    change = models.FloatField(
+        help_text='Send the notification when a property of the ticker '
+                  'increased/decreased by the value of this field',
+        validators=(validate_greater_than_zero,)
+    )
+    last_tick = models.ForeignKey(Tick, on_delete=models.CASCADE, null=True)
+
+    identity_fields = ('change',)
+
     def should_send(self, tick: Tick) -> bool:
         should_send = False
         if self.property == tick.property:
@@ -285,3 +336,84 @@ class StepNotification(Notification):
                 self.last_tick = tick
                 self.save()
         return should_send
+
+
+class RollingNotification(Notification):
+    """Rule evaluated against the rolling statistics of the ticker's property
+
+    PERCENT_CHANGE - the value changed by the threshold percent within the window minutes
+    LEVEL_CROSS - the value crossed the threshold
+    MOVING_AVERAGE_CROSS - the value crossed its moving average of the window periods
+    """
+
+    rule = models.IntegerField(choices=RollingRule.choices)
+    threshold = models.FloatField(
+        null=True,
+        blank=True,
+        help_text='The percent of PERCENT_CHANGE or the level of LEVEL_CROSS'
+    )
+    window = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text='Minutes of PERCENT_CHANGE or periods of MOVING_AVERAGE_CROSS'
+    )
+
+    identity_fields = ('rule', 'property', 'threshold', 'window')
+
+    @classmethod
+    def save_notification(cls, notification_serializer):
+        notification_serializer.is_valid(raise_exception=True)
+        data = notification_serializer.validated_data
+        cls.validate_rule(data['rule'], data.get('threshold'), data.get('window'))
+        data.setdefault('threshold', None)
+        data.setdefault('window', None)
+        return super().save_notification(notification_serializer)
+
+    @staticmethod
+    def validate_rule(rule, threshold, window):
+        if window is not None and window > settings.ROLLING_MAX_WINDOW:
+            raise ValidationError(f'The window {window} is greater than {settings.ROLLING_MAX_WINDOW}.')
+        if rule == RollingRule.PERCENT_CHANGE:
+            validate_greater_than_zero(threshold or 0)
+            validate_greater_than_zero(window or 0)
+        elif rule == RollingRule.LEVEL_CROSS:
+            if threshold is None:
+                raise ValidationError('The level of LEVEL_CROSS is required.')
+        elif rule == RollingRule.MOVING_AVERAGE_CROSS:
+            validate_greater_than_zero(window or 0)
+
+    @property
+    def window_key(self):
+        """Identifies the rolling window the rule reads, None if the rule needs no window"""
+        if self.rule == RollingRule.PERCENT_CHANGE:
+            return 'minutes', self.window
+        elif self.rule == RollingRule.MOVING_AVERAGE_CROSS:
+            return 'periods', self.window
+        return None
+
+    def should_send(self, state) -> bool:
+        """Fires once when the condition starts to hold, state is rolling.RollingState"""
+        if self.rule == RollingRule.PERCENT_CHANGE:
+            window = state.windows[self.window_key]
+            if window.change is None:
+                return False
+            previous = window.previous_change
+            return (abs(window.change) >= self.threshold and
+                    (previous is None or abs(previous) < self.threshold))
+        elif self.rule == RollingRule.LEVEL_CROSS:
+            previous = state.previous_value
+            return previous is not None and (
+                previous < self.threshold <= state.value or
+                previous > self.threshold >= state.value
+            )
+        elif self.rule == RollingRule.MOVING_AVERAGE_CROSS:
+            window = state.windows[self.window_key]
+            if window.mean is None or window.previous_mean is None:
+                return False
+            previous = state.previous_value - window.previous_mean
+            current = state.value - window.mean
+            return previous < 0 <= current or previous > 0 >= current
+        return False
+
+
+NOTIFICATION_MODELS = (StepNotification, RollingNotification)
@@ -0,0 +1,158 @@
+"""On-demand cProfile of the requests and a sample of the celery tasks
+
+Nothing is installed unless PROFILING_ENABLED is set: the middleware removes itself
+from the chain and the task signal handlers are not connected.
+"""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import time
+from typing import Optional
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from celery.signals import (
+    task_prerun,
+    task_postrun,
+)
+from rest_framework_simplejwt.exceptions import (
+    InvalidToken,
+    AuthenticationFailed,
+)
+from .authentication import CachedJWTAuthentication
+
+
+_logger = logging.getLogger(__name__)
+
+HEADER = 'HTTP_X_PROFILE'
+SIGNATURE_SALT = 'finotif.profiling'
+
+
+def signature() -> str:
+    """Value of the X-Profile header which enables the profiling without a staff user"""
+    return signing.TimestampSigner(salt=SIGNATURE_SALT).sign('profile')
+
+
+def _valid_signature(value: str) -> bool:
+    try:
+        signing.TimestampSigner(salt=SIGNATURE_SALT).unsign(
+            value,
+            max_age=settings.PROFILING_SIGNATURE_MAX_AGE
+        )
+        return True
+    except signing.BadSignature:
+        return False
+
+
+def _slug(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('_') or 'root'
+
+
+def dump(profile: cProfile.Profile, kind: str, name: str, suffix: str = '') -> str:
+    """Writes the stats to PROFILING_DIR/<kind>/<name>/, the directory of the profiles of one name"""
+    directory = os.path.join(settings.PROFILING_DIR, kind, _slug(name))
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{time.time_ns()}{suffix}.prof')
+    profile.dump_stats(path)
+    return path
+
+
+def _enable(profile: cProfile.Profile) -> bool:
+    try:
+        profile.enable()
+        return True
+    except ValueError:
+        # another profiler is active in the thread, e.g. an eager task of a profiled request
+        return False
+
+
+class ProfilingMiddleware:
+    """Profiles the requests with ?profile of the staff users or with a valid X-Profile header
+
+    The stats are stored under PROFILING_DIR/requests/<path>/ and the file is returned
+    in the X-Profile-Stats header, ?profile=stats returns the stats instead of the response.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self._requested(request) or not self._allowed(request):
+            return self.get_response(request)
+
+        profile = cProfile.Profile()
+        if not _enable(profile):
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profile.disable()
+
+        path = dump(profile, 'requests', request.path)
+        if request.GET.get('profile') == 'stats':
+            stream = io.StringIO()
+            pstats.Stats(profile, stream=stream).sort_stats('cumulative').print_stats(
+                settings.PROFILING_STATS_LIMIT
+            )
+            response = HttpResponse(stream.getvalue(), content_type='text/plain')
+        response['X-Profile-Stats'] = os.path.relpath(path, settings.PROFILING_DIR)
+        return response
+
+    @staticmethod
+    def _requested(request) -> bool:
+        return 'profile' in request.GET or HEADER in request.META
+
+    @staticmethod
+    def _allowed(request) -> bool:
+        if HEADER in request.META:
+            return _valid_signature(request.META[HEADER])
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return user.is_staff
+        try:
+            authenticated = CachedJWTAuthentication().authenticate(request)
+        except (InvalidToken, AuthenticationFailed):
+            return False
+        return authenticated is not None and authenticated[0].is_staff
+
+
+_task_profiles = {}
+
+
+def _start_task_profile(task_id=None, **kwargs):
+    if random.random() >= settings.PROFILING_TASK_SAMPLE_RATE:
+        return
+    profile = cProfile.Profile()
+    if _enable(profile):
+        _task_profiles[task_id] = profile
+
+
+def _stop_task_profile(task_id=None, task=None, **kwargs):
+    profile: Optional[cProfile.Profile] = _task_profiles.pop(task_id, None)
+    if profile is None:
+        return
+    profile.disable()
+    try:
+        dump(profile, 'tasks', task.name, suffix=f'-{task_id}')
+    except OSError as er:
+        _logger.error(f'Cannot store the profile of {task.name}: {er}')
+
+
+def connect_task_profiling():
+    """Samples PROFILING_TASK_SAMPLE_RATE of the task runs, stored under PROFILING_DIR/tasks/<task name>/"""
+    if not settings.PROFILING_ENABLED:
+        return
+    task_prerun.connect(_start_task_profile, weak=False, dispatch_uid='profiling_start')
+    task_postrun.connect(_stop_task_profile, weak=False, dispatch_uid='profiling_stop')
+
+
+def disconnect_task_profiling():
+    task_prerun.disconnect(dispatch_uid='profiling_start')
+    task_postrun.disconnect(dispatch_uid='profiling_stop')
@@ -0,0 +1,250 @@
+"""Offline ticker providers, selected by the TICKER_PROVIDER setting
+
+They have the interface of services.YahooTickerProvider and need no network. They are not
+remote, so services.CachedTickerProvider neither caches nor rate limits them and the pipeline
+can be run at any volume.
+"""
+import json
+import logging
+import math
+import mmap
+import os
+import random
+import re
+import threading
+import zlib
+from array import array
+from collections import defaultdict
+from functools import lru_cache
+from typing import (
+    Dict,
+    Optional,
+    Tuple,
+)
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from .services import (
+    TickerDto,
+    TickerStateDto,
+)
+
+
+_logger = logging.getLogger(__name__)
+
+# Steps of the random walk generated at once, each block has its own seed
+BLOCK_SIZE = 1024
+
+
+class SyntheticTickerProvider:
+    """Random walk of the quotes of any symbol, deterministic in the seed, symbol and time
+
+    The walk starts every UTC day at the symbol's base price and makes a step every
+    SYNTHETIC_PROVIDER_TICK_INTERVAL seconds, so every process returns the same quote
+    at the same time. The process remembers the last step of a symbol and generates
+    only the steps since then.
+    """
+
+    remote = False
+    _walks: Dict[Tuple[int, str], Tuple[int, int, float]] = {}
+
+    def __init__(self, symbol: str):
+        self._symbol = symbol.strip().upper()
+        self._key = zlib.crc32(self._symbol.encode())
+
+    def info(self) -> TickerDto:
+        return TickerDto(
+            symbol=self._symbol,
+            name=f'{self._symbol} Synthetic Inc.',
+            short_name=self._symbol,
+            description=f'Random walk of {self._symbol}',
+            exchange='XNAS',
+            state=self.current_state()
+        )
+
+    def current_state(self) -> TickerStateDto:
+        now = timezone.now()
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        step = int((now - midnight).total_seconds() / settings.SYNTHETIC_PROVIDER_TICK_INTERVAL)
+        return self.state_at(now.date().toordinal(), step)
+
+    def state_at(self, day: int, step: int) -> TickerStateDto:
+        price = round(self.base_price * math.exp(
+            settings.SYNTHETIC_PROVIDER_VOLATILITY * self._walk(day, step)
+        ), 2)
+        generator = random.Random(f'{settings.SYNTHETIC_PROVIDER_SEED}:{self._symbol}:{day}:{step}')
+        spread = max(0.01, round(price * 0.0005, 2))
+        return TickerStateDto(
+            currency='USD',
+            price=price,
+            volume=100000 + step * (self._key % 1000 + 100),
+            ask=round(price + spread, 2),
+            bid=round(max(0.01, price - spread), 2),
+            ask_size=generator.randint(1, 50) * 100,
+            bid_size=generator.randint(1, 50) * 100
+        )
+
+    @property
+    def base_price(self) -> float:
+        return float(10 + self._key % 490)
+
+    def _block(self, day: int, block: int) -> np.ndarray:
+        generator = np.random.default_rng([settings.SYNTHETIC_PROVIDER_SEED, self._key, day, block])
+        return generator.standard_normal(BLOCK_SIZE)
+
+    def _walk(self, day: int, step: int) -> float:
+        """Sum of the first step increments of the day"""
+        key = (settings.SYNTHETIC_PROVIDER_SEED, self._symbol)
+        position, total = 0, 0.0
+        cached = self._walks.get(key)
+        if cached is not None and cached[0] == day and cached[1] <= step:
+            _, position, total = cached
+        while position < step:
+            block, offset = divmod(position, BLOCK_SIZE)
+            end = min(step, (block + 1) * BLOCK_SIZE)
+            total += float(self._block(day, block)[offset:offset + end - position].sum())
+            position = end
+        self._walks[key] = (day, step, total)
+        return total
+
+    def __repr__(self):
+        return f'providers.{self.__class__.__name__}({self._symbol})'
+
+
+class SteppingTickerProvider(SyntheticTickerProvider):
+    """The synthetic walk moved a step by every current_state call, for the benchmarks
+
+    The quotes change from one poll to the next however fast the polls follow each other.
+    The steps of a symbol are counted by the process from the start of the walk.
+    """
+
+    _steps: Dict[str, int] = {}
+
+    def current_state(self) -> TickerStateDto:
+        step = self._steps.get(self._symbol, 0) + 1
+        self._steps[self._symbol] = step
+        return self.state_at(day=0, step=step)
+
+    @classmethod
+    def reset(cls):
+        cls._steps.clear()
+
+
+class ReplayFile:
+    """Recorded quotes of a CSV (with a header) or NDJSON file, read through a memory map
+
+    The file is scanned once for the offsets of the symbols' lines, a line is parsed
+    only when its quote is replayed. Every symbol has its own cursor, which wraps around
+    at the end of the recording when loop is set.
+    """
+
+    _NDJSON_SYMBOL = re.compile(rb'"symbol"\s*:\s*"([^"]*)"')
+
+    def __init__(self, path: str, loop: bool = True):
+        self.path = path
+        self.loop = loop
+        self._ndjson = path.endswith(('.ndjson', '.jsonl'))
+        self._columns = None
+        self._offsets: Dict[str, array] = defaultdict(lambda: array('q'))
+        self._cursors: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        with open(path, 'rb') as file:
+            # an empty file cannot be mapped
+            size = os.fstat(file.fileno()).st_size
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self._index()
+
+    def _line(self, offset: int) -> Tuple[bytes, int]:
+        end = self._map.find(b'\n', offset)
+        if end == -1:
+            end = len(self._map)
+        return self._map[offset:end].rstrip(b'\r'), end + 1
+
+    def _index(self):
+        if not self._map:
+            _logger.warning(f'No quotes to replay, {self.path} is empty')
+            return
+        position = 0
+        if not self._ndjson:
+            header, position = self._line(0)
+            self._columns = header.decode().strip().split(',')
+            symbol_column = self._columns.index('symbol')
+        while position < len(self._map):
+            line, next_position = self._line(position)
+            if line.strip():
+                if self._ndjson:
+                    match = self._NDJSON_SYMBOL.search(line)
+                    symbol = match.group(1) if match else None
+                else:
+                    symbol = line.split(b',')[symbol_column]
+                if symbol:
+                    self._offsets[symbol.decode().strip().upper()].append(position)
+            position = next_position
+        _logger.info(f'Indexed {len(self._offsets)} symbols of {self.path}')
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._offsets
+
+    def record(self, symbol: str, advance: bool = True) -> Optional[dict]:
+        offsets = self._offsets.get(symbol)
+        if not offsets:
+            return None
+        with self._lock:
+            cursor = self._cursors[symbol]
+            if cursor >= len(offsets):
+                if not self.loop:
+                    return None
+                cursor = 0
+            if advance:
+                self._cursors[symbol] = cursor + 1
+        line, _ = self._line(offsets[cursor])
+        if self._ndjson:
+            return json.loads(line)
+        return dict(zip(self._columns, line.decode().split(',')))
+
+    def state(self, symbol: str, advance: bool = True) -> Optional[TickerStateDto]:
+        record = self.record(symbol, advance)
+        if record is None:
+            return None
+        return TickerStateDto(
+            currency=str(record.get('currency') or 'USD').strip().upper(),
+            price=float(record.get('price') or 0),
+            volume=float(record.get('volume') or 0),
+            ask=float(record.get('ask') or 0),
+            bid=float(record.get('bid') or 0),
+            ask_size=float(record.get('ask_size') or 0),
+            bid_size=float(record.get('bid_size') or 0)
+        )
+
+
+@lru_cache(maxsize=None)
+def replay_file(path: str) -> ReplayFile:
+    return ReplayFile(path, loop=settings.REPLAY_PROVIDER_LOOP)
+
+
+class ReplayTickerProvider:
+    """Replays the quotes of REPLAY_PROVIDER_FILE, one recorded line per current_state call"""
+
+    remote = False
+
+    def __init__(self, symbol: str):
+        self._symbol = symbol.strip().upper()
+        self._file = replay_file(settings.REPLAY_PROVIDER_FILE)
+
+    def info(self) -> Optional[TickerDto]:
+        if self._symbol not in self._file:
+            return None
+        return TickerDto(
+            symbol=self._symbol,
+            name=f'{self._symbol} Replayed Inc.',
+            short_name=self._symbol,
+            description=f'Quotes of {self._symbol} replayed from {self._file.path}',
+            exchange='XNAS',
+            state=self._file.state(self._symbol, advance=False)
+        )
+
+    def current_state(self) -> Optional[TickerStateDto]:
+        return self._file.state(self._symbol)
+
+    def __repr__(self):
+        return f'providers.{self.__class__.__name__}({self._symbol})'
@@ -0,0 +1,90 @@
+"""Token bucket rate limiter shared by the processes through Redis
+
+The bucket is refilled and taken from by one Lua script, so the check and the update are
+atomic across all the web and celery processes calling the same upstream. The script reads
+the clock of the Redis server, so the skewed clocks of the hosts do not refill the bucket
+early - the script replicates its effects, the default of Redis 5 and newer.
+"""
+import logging
+import time
+from django.conf import settings
+from redis.exceptions import RedisError
+from . import (
+    connections,
+    metrics,
+)
+
+
+_logger = logging.getLogger(__name__)
+
+# Returns the seconds to wait for a token, 0 when one was taken
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local time = redis.call('time')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('hmget', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or burst
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated_at) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('hset', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('pexpire', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RateLimited(Exception):
+    """No token within the wait, the request should be deferred"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f'Rate limit of {name} exceeded, retry after {retry_after:.2f}s')
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """rate tokens per second, up to burst tokens saved up, one token per request"""
+
+    def __init__(self, name: str, rate: float, burst: int):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self._key = f'ratelimit:{name}'
+
+    def take(self) -> float:
+        """Takes a token if there is one, returns the seconds to wait for the next one otherwise"""
+        redis = connections.redis_connection()
+        return float(redis.eval(_TAKE_SCRIPT, 1, self._key, self.rate, self.burst))
+
+    def acquire(self, timeout: float):
+        """Waits up to timeout seconds for a token, raises RateLimited when it would take longer
+
+        Without Redis the request is let through, the upstream throttles it at worst.
+        """
+        deadline = time.monotonic() + timeout
+        delayed = False
+        while True:
+            try:
+                wait = self.take()
+            except RedisError as er:
+                _logger.error(f'Cannot take a token of {self.name}, not limiting: {er}')
+                return
+            if not wait:
+                if delayed:
+                    metrics.PROVIDER_THROTTLED.labels('delayed').inc()
+                return
+            if time.monotonic() + wait > deadline:
+                metrics.PROVIDER_THROTTLED.labels('deferred').inc()
+                raise RateLimited(self.name, wait)
+            delayed = True
+            time.sleep(wait)
+
+
+def provider_bucket(name: str) -> TokenBucket:
+    """Bucket of the requests to the provider class name, shared by its symbols"""
+    return TokenBucket(f'provider:{name}', settings.PROVIDER_RATE, settings.PROVIDER_BURST)
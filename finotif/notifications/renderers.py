@@ -0,0 +1,86 @@
+"""orjson renderer and parser with the output and errors of the stock JSON ones
+
+orjson formats the floats below 1e-4 and from 1e16 up without Python's exponent style and
+renders the non-finite floats as null, so the data with such a float is rendered by the
+stock renderer, as are the integers beyond 64 bits. The data is rendered by orjson first and
+walked only if the output has a null, an exponent or a float below 1e-4. The values orjson
+does not serialize natively (datetimes, lazy strings, decimals, dataclasses) are converted
+by DRF's encoder, as before.
+"""
+import io
+import re
+import orjson
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+# Integers orjson parses as floats
+_BIG_INTEGER = re.compile(rb'\d{19}')
+# Output which may hold a float formatted otherwise than by json.dumps
+_SUSPECT = re.compile(rb'null|\de|0\.0000')
+_LINE_SEPARATOR = '\u2028'.encode()
+_PARAGRAPH_SEPARATOR = '\u2029'.encode()
+_encoder = encoders.JSONEncoder()
+
+
+class _DivergentFloat(Exception):
+    pass
+
+
+def _divergent(value) -> bool:
+    """If the value has a float orjson does not format as json.dumps, walks the containers only"""
+    if isinstance(value, float):
+        return value != 0 and not 1e-4 <= abs(value) < 1e16
+    if isinstance(value, dict):
+        return any(_divergent(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(_divergent(item) for item in value)
+    return False
+
+
+def _default(obj):
+    value = _encoder.default(obj)
+    if _divergent(value):
+        raise _DivergentFloat()
+    return value
+
+
+class ORJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (self.get_indent(accepted_media_type, renderer_context or {}) is not None
+                or not (api_settings.COMPACT_JSON and api_settings.UNICODE_JSON)):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_default, option=_OPTIONS)
+        except orjson.JSONEncodeError:
+            # integers beyond 64 bits, the floats of the converted values or the TypeError of the encoder
+            return super().render(data, accepted_media_type, renderer_context)
+        if _SUSPECT.search(ret) and _divergent(data):
+            return super().render(data, accepted_media_type, renderer_context)
+        # escaped by the stock renderer for the javascript clients
+        if _LINE_SEPARATOR in ret:
+            ret = ret.replace(_LINE_SEPARATOR, b'\\u2028')
+        if _PARAGRAPH_SEPARATOR in ret:
+            ret = ret.replace(_PARAGRAPH_SEPARATOR, b'\\u2029')
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8')
+        body = stream.read() if stream is not None else b''
+        if encoding.lower().replace('-', '') == 'utf8' and not _BIG_INTEGER.search(body):
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                # raised again with the message of the stock parser
+                pass
+        return super().parse(io.BytesIO(body), media_type, parser_context)
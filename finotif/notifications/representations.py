@@ -0,0 +1,108 @@
+"""Cache of the detail representations of the tickers and notifications, shared through Redis
+
+An entry is keyed by the object, the object's version and the base url of the request (the
+representations have absolute urls). The post_save and post_delete signals and the bulk updates
+bump the version of the object, so the old entries are never read again and expire after
+DETAIL_CACHE_TTL. A missed entry is read from the primary, a lagging replica would cache
+the old row under the new version.
+"""
+import json
+import logging
+from typing import (
+    Iterable,
+    Optional,
+)
+from django.conf import settings
+from django.db import transaction
+from redis.exceptions import RedisError
+from rest_framework.response import Response
+from .db_routers import primary_reads
+from . import connections
+
+
+_logger = logging.getLogger(__name__)
+
+
+def version_key(model_name: str, pk) -> str:
+    return f'repr:version:{model_name}:{pk}'
+
+
+def bump_versions(model_name: str, pks: Iterable):
+    pks = list(pks)
+    try:
+        pipeline = connections.redis_connection().pipeline()
+        for pk in pks:
+            key = version_key(model_name, pk)
+            pipeline.incr(key)
+            # outlives the entries of the previous versions
+            pipeline.expire(key, settings.DETAIL_CACHE_TTL * 2)
+        pipeline.execute()
+    except RedisError as er:
+        _logger.error(f'Cannot bump the versions of {model_name} {pks}: {er}')
+
+
+def invalidate(model_name: str, pks: Iterable):
+    """Bumps the versions now and after the commit, a request may cache the old rows before the change is committed"""
+    if not settings.DETAIL_CACHE:
+        return
+    pks = list(pks)
+    bump_versions(model_name, pks)
+    transaction.on_commit(lambda: bump_versions(model_name, pks))
+
+
+class DetailCache:
+    """The cached representation of one object for the base url of the request"""
+
+    def __init__(self, model, pk, request):
+        self.model_name = model._meta.model_name
+        try:
+            self.pk = int(pk)
+        except (TypeError, ValueError):
+            self.pk = None
+        self._base_url = request.build_absolute_uri('/')
+        self._version = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.DETAIL_CACHE and self.pk is not None
+
+    def _key(self) -> str:
+        return f'repr:{self.model_name}:{self.pk}:{self._version}:{self._base_url}'
+
+    def get(self) -> Optional[dict]:
+        """Reads the version first, the entry set later is stored under the version the object was loaded at"""
+        if not self.enabled:
+            return None
+        redis = connections.redis_connection()
+        try:
+            self._version = int(redis.get(version_key(self.model_name, self.pk)) or 0)
+            data = redis.get(self._key())
+        except RedisError as er:
+            _logger.error(f'Cannot read the cached {self.model_name} {self.pk}: {er}')
+            return None
+        return json.loads(data) if data is not None else None
+
+    def set(self, data: dict):
+        if not self.enabled or self._version is None:
+            return
+        try:
+            connections.redis_connection().set(self._key(), json.dumps(data), ex=settings.DETAIL_CACHE_TTL)
+        except RedisError as er:
+            _logger.error(f'Cannot cache the {self.model_name} {self.pk}: {er}')
+
+
+class CachedDetailMixin:
+    """retrieve() served from the DetailCache, the queryset still decides if the user can see the object"""
+
+    def retrieve(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        cache = DetailCache(queryset.model, kwargs[self.lookup_field], request)
+        data = cache.get()
+        if data is not None and queryset.filter(pk=cache.pk).exists():
+            return Response(data)
+        if not cache.enabled:
+            return super().retrieve(request, *args, **kwargs)
+        with primary_reads():
+            response = super().retrieve(request, *args, **kwargs)
+        cache.set(response.data)
+        return response
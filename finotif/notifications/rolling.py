@@ -0,0 +1,174 @@
+import logging
+from collections import (
+    OrderedDict,
+    deque,
+)
+from datetime import (
+    datetime,
+    timedelta,
+)
+from typing import (
+    Dict,
+    Iterable,
+    Set,
+    Tuple,
+)
+from django.conf import settings
+from .models import Tick
+
+
+_logger = logging.getLogger(__name__)
+
+# Missed ticks above this number rebuild the state from the history instead of catching up
+CATCH_UP_LIMIT = 1000
+
+
+class PeriodWindow:
+    """Moving average of the last N values, kept in a ring buffer with a running sum"""
+    __slots__ = ('periods', '_values', '_index', '_count', '_sum', 'mean', 'previous_mean')
+
+    def __init__(self, periods: int):
+        self.periods = periods
+        self._values = [0.0] * periods
+        self._index = 0
+        self._count = 0
+        self._sum = 0.0
+        self.mean = None
+        self.previous_mean = None
+
+    def push(self, value: float, at: datetime):
+        if self._count == self.periods:
+            self._sum += value - self._values[self._index]
+        else:
+            self._count += 1
+            self._sum += value
+        self._values[self._index] = value
+        self._index = (self._index + 1) % self.periods
+        if self._index == 0:
+            # resum once per lap, so the floating point error does not accumulate
+            self._sum = sum(self._values[:self._count])
+        self.previous_mean = self.mean
+        self.mean = self._sum / self.periods if self._count == self.periods else None
+
+
+class TimeWindow:
+    """Percent change of the value against the value from N minutes ago"""
+    __slots__ = ('minutes', '_span', '_values', 'change', 'previous_change')
+
+    def __init__(self, minutes: int):
+        self.minutes = minutes
+        self._span = timedelta(minutes=minutes)
+        self._values = deque()
+        self.change = None
+        self.previous_change = None
+
+    def push(self, value: float, at: datetime):
+        values = self._values
+        values.append((at, value))
+        horizon = at - self._span
+        # the newest value not newer than the horizon is the reference
+        while len(values) > 1 and values[1][0] <= horizon:
+            values.popleft()
+        reference_at, reference = values[0]
+        self.previous_change = self.change
+        if reference_at <= horizon and reference:
+            self.change = (value - reference) / reference * 100
+        else:
+            self.change = None
+
+
+WINDOW_TYPES = {
+    'minutes': TimeWindow,
+    'periods': PeriodWindow,
+}
+
+
+class RollingState:
+    """Last values and rolling windows of a (ticker, property) pair"""
+    __slots__ = ('value', 'previous_value', 'last_tick_id', 'previous_tick_id', 'windows')
+
+    def __init__(self, window_keys: Iterable[Tuple[str, int]]):
+        self.value = None
+        self.previous_value = None
+        self.last_tick_id = None
+        self.previous_tick_id = None
+        self.windows = {key: WINDOW_TYPES[key[0]](key[1]) for key in window_keys}
+
+    def push(self, tick_id: int, value: float, at: datetime) -> bool:
+        """Updates the statistics in O(1), returns False for a tick already pushed"""
+        if self.last_tick_id is not None and tick_id <= self.last_tick_id:
+            return False
+        self.previous_tick_id = self.last_tick_id
+        self.last_tick_id = tick_id
+        self.previous_value = self.value
+        self.value = value
+        for window in self.windows.values():
+            window.push(value, at)
+        return True
+
+
+class RollingStatistics:
+    """Rolling states of the evaluated (ticker, property) pairs, kept for the process lifetime
+
+    The history of a pair is queried only to warm up a new state, afterwards the state
+    catches up only with the ticks evaluated by other processes. A tick older than the state -
+    read by the evaluators out of order or claimed again from a stopped one - warms up the
+    state again from the history before it. Up to ROLLING_MAX_STATES states are kept, the least
+    recently used one is dropped and warmed up again when needed.
+    """
+
+    def __init__(self):
+        self._states: Dict[Tuple[int, int], RollingState] = OrderedDict()
+
+    def __len__(self):
+        return len(self._states)
+
+    def state(self, key: Tuple[int, int], window_keys: Set[Tuple[str, int]], before: Tick) -> RollingState:
+        """Returns the state of the pair up to date with the ticks saved before the tick"""
+        state = self._states.get(key)
+        if (state is not None and window_keys <= state.windows.keys()
+                and (state.last_tick_id or 0) < before.pk):
+            self._states.move_to_end(key)
+            missed = list(self._history(key, before).filter(
+                pk__gt=state.last_tick_id or 0
+            ).order_by('pk')[:CATCH_UP_LIMIT])
+            if len(missed) < CATCH_UP_LIMIT:
+                for row in missed:
+                    state.push(*row)
+                return state
+        state = self._warm_up(key, window_keys | (state.windows.keys() if state else set()), before)
+        self._states[key] = state
+        self._states.move_to_end(key)
+        while len(self._states) > settings.ROLLING_MAX_STATES:
+            self._states.popitem(last=False)
+        return state
+
+    @staticmethod
+    def _history(key: Tuple[int, int], before: Tick):
+        ticker_id, property = key
+        return Tick.objects.filter(
+            ticker_id=ticker_id
+        ).filter(
+            property=property
+        ).filter(
+            pk__lt=before.pk
+        ).values_list('pk', 'value', 'created_at')
+
+    def _warm_up(self, key, window_keys, before: Tick) -> RollingState:
+        state = RollingState(window_keys)
+        history = self._history(key, before).order_by('-pk')
+        periods = max([size for kind, size in window_keys if kind == 'periods'], default=0)
+        minutes = max([size for kind, size in window_keys if kind == 'minutes'], default=0)
+        # the previous value and mean need one more tick than the window
+        rows = set(history[:periods + 1])
+        if minutes:
+            horizon = before.created_at - timedelta(minutes=minutes)
+            rows.update(history.filter(created_at__gte=horizon))
+            rows.update(history.filter(created_at__lt=horizon)[:1])
+        for row in sorted(rows):
+            state.push(*row)
+        _logger.debug(f'Warmed up {key} with {len(rows)} ticks')
+        return state
+
+
+statistics = RollingStatistics()
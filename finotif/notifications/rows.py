@@ -0,0 +1,154 @@
+"""Read-only fast path of the list actions
+
+The page is fetched by values_list() and its rows are turned into the representations of the
+hyperlinked serializers by url templates and choice label tables, without a serializer field
+and a reverse() per value. The notes of the tickers are fetched by one query per page.
+"""
+import logging
+from collections import defaultdict
+from typing import (
+    Callable,
+    Iterable,
+)
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from .models import (
+    Note,
+    NotificationType,
+    TickerProperty,
+    RollingRule,
+)
+
+
+_logger = logging.getLogger(__name__)
+
+# The representations of the DisplayIntChoiceFields
+TYPE_LABELS = dict(NotificationType.choices)
+PROPERTY_LABELS = dict(TickerProperty.choices)
+RULE_LABELS = dict(RollingRule.choices)
+
+_PK_MARKER = '__pk__'
+_datetime = serializers.DateTimeField()
+
+
+def url_template(view_name: str, request, format=None) -> Callable[[int], str]:
+    """The url of the object of the pk, reversed once like the HyperlinkedRelatedField does"""
+    url = reverse(view_name, kwargs={'pk': _PK_MARKER}, request=request, format=format)
+    prefix, _, suffix = url.partition(_PK_MARKER)
+    return lambda pk: f'{prefix}{pk}{suffix}'
+
+
+def _optional(convert, value):
+    return None if value is None else convert(value)
+
+
+class RowSerializer:
+    """The representations of the rows of values_list(*columns), the same as the ones of the serializer"""
+    columns = ()
+
+    def __init__(self, request, format=None):
+        self.request = request
+        self.format = format
+
+    def rows(self, queryset):
+        return queryset.values_list(*self.columns)
+
+    def to_representation(self, rows: Iterable[tuple]) -> list:
+        raise NotImplementedError()
+
+
+class TickerRowSerializer(RowSerializer):
+    """TickerSerializer"""
+    columns = ('id', 'symbol', 'short_name', 'name', 'description')
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        ticker_url = url_template('ticker-detail', self.request, self.format)
+        note_url = url_template('note-detail', self.request, self.format)
+        notes = defaultdict(list)
+        if rows:
+            # in the default order of the notes, as ticker.notes.all()
+            note_rows = Note.objects.filter(ticker_id__in=[row[0] for row in rows]).values_list('ticker_id', 'pk')
+            for ticker_id, pk in note_rows:
+                notes[ticker_id].append(note_url(pk))
+        return [
+            {
+                'id': pk,
+                'url': ticker_url(pk),
+                'symbol': symbol,
+                'short_name': short_name,
+                'name': name,
+                'description': description,
+                'notes': notes.get(pk, []),
+            }
+            for pk, symbol, short_name, name, description in rows
+        ]
+
+
+class StepNotificationRowSerializer(RowSerializer):
+    """StepNotificationSerializer"""
+    columns = ('id', 'title', 'content', 'ticker_id', 'type', 'is_active', 'property', 'change',
+               'created_at', 'modified_at')
+
+    def to_representation(self, rows):
+        url = url_template('stepnotification-detail', self.request, self.format)
+        ticker_url = url_template('ticker-detail', self.request, self.format)
+        return [
+            {
+                'id': pk,
+                'url': url(pk),
+                'title': title,
+                'content': content,
+                'ticker': ticker_url(ticker_id),
+                'type': TYPE_LABELS.get(type, type),
+                'is_active': is_active,
+                'property': PROPERTY_LABELS.get(property, property),
+                'change': float(change),
+                'created_at': _datetime.to_representation(created_at),
+                'modified_at': _datetime.to_representation(modified_at),
+            }
+            for pk, title, content, ticker_id, type, is_active, property, change, created_at, modified_at in rows
+        ]
+
+
+class RollingNotificationRowSerializer(RowSerializer):
+    """RollingNotificationSerializer"""
+    columns = ('id', 'title', 'content', 'ticker_id', 'type', 'is_active', 'property', 'rule', 'threshold',
+               'window', 'created_at', 'modified_at')
+
+    def to_representation(self, rows):
+        url = url_template('rollingnotification-detail', self.request, self.format)
+        ticker_url = url_template('ticker-detail', self.request, self.format)
+        return [
+            {
+                'id': pk,
+                'url': url(pk),
+                'title': title,
+                'content': content,
+                'ticker': ticker_url(ticker_id),
+                'type': TYPE_LABELS.get(type, type),
+                'is_active': is_active,
+                'property': PROPERTY_LABELS.get(property, property),
+                'rule': RULE_LABELS.get(rule, rule),
+                'threshold': _optional(float, threshold),
+                'window': _optional(int, window),
+                'created_at': _datetime.to_representation(created_at),
+                'modified_at': _datetime.to_representation(modified_at),
+            }
+            for (pk, title, content, ticker_id, type, is_active, property, rule, threshold, window,
+                 created_at, modified_at) in rows
+        ]
+
+
+class RowListMixin:
+    """list() of a viewset by its row_serializer_class, the other actions keep the serializer_class"""
+    row_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        row_serializer = self.row_serializer_class(request, self.format_kwarg)
+        queryset = row_serializer.rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(row_serializer.to_representation(page))
+        return Response(row_serializer.to_representation(queryset))
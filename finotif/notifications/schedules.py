@@ -0,0 +1,97 @@
+"""Celery beat schedule of the polling, armed only in the market hours
+
+The beat reads the exchanges at the transitions only - the next opening or closing of any
+exchange - and runs the task every run_every seconds while an exchange of the tracked tickers
+is open. Outside the sessions it sleeps until the next transition, so the database and the
+broker are idle overnight and on weekends. While an exchange is open the tracked tickers are
+read again every MARKET_HOURS_REFRESH seconds, for the tickers tracked in the meantime.
+
+A failed read of the session - the database not migrated yet or the connection closed while
+the beat slept - is logged and read again after SESSION_RETRY, the beat keeps running.
+
+Imported by the settings, so the models are imported by the functions.
+"""
+import logging
+from datetime import (
+    datetime,
+    timedelta,
+    timezone as TimeZone,
+)
+from typing import (
+    Iterable,
+    Optional,
+    Tuple,
+)
+from celery.schedules import (
+    schedstate,
+    schedule,
+)
+from django.conf import settings
+from django.db import (
+    DatabaseError,
+    close_old_connections,
+)
+
+
+_logger = logging.getLogger(__name__)
+
+# Without the exchanges, the beat reads them again a day later
+_NO_TRANSITION = timedelta(days=1)
+# After a failed read of the session
+SESSION_RETRY = timedelta(seconds=30)
+
+
+def next_transition(exchanges: Iterable, now: datetime) -> datetime:
+    """The next opening or closing of any of the exchanges, naive UTC as the exchanges' hours"""
+    transitions = [
+        exchange.next_close(now) if exchange.is_open(now) else exchange.next_open(now)
+        for exchange in exchanges
+    ]
+    return min(transitions, default=now + _NO_TRANSITION)
+
+
+def market_session(now: datetime) -> Tuple[bool, datetime]:
+    """If an exchange of the tracked tickers is open and the time to read the session again"""
+    from .models import (
+        Exchange,
+        Ticker,
+    )
+    now = now.astimezone(TimeZone.utc).replace(tzinfo=None)
+    exchanges = list(Exchange.objects.all())
+    open_ids = {exchange.pk for exchange in exchanges if exchange.is_open(now)}
+    armed = bool(open_ids) and Ticker.tracked().filter(exchange_id__in=open_ids).exists()
+    until = next_transition(exchanges, now)
+    if open_ids:
+        until = min(until, now + timedelta(seconds=settings.MARKET_HOURS_REFRESH))
+    return armed, until.replace(tzinfo=TimeZone.utc)
+
+
+class market_hours(schedule):
+    """Every run_every seconds while market_session() is armed, otherwise not due until the session changes"""
+
+    def __init__(self, run_every=60, relative=False, nowfun=None, app=None):
+        super().__init__(run_every=run_every, relative=relative, nowfun=nowfun, app=app)
+        self._armed = False
+        self._until: Optional[datetime] = None
+
+    def is_due(self, last_run_at):
+        now = self.now()
+        if self._until is None or now >= self._until:
+            # the beat is not a request, the connection idle since the last read may be closed
+            close_old_connections()
+            try:
+                armed, self._until = market_session(now)
+            except DatabaseError as er:
+                _logger.error(f'Cannot read the market session, retrying in {SESSION_RETRY}: {er}')
+                armed, self._until = self._armed, now + SESSION_RETRY
+            if armed != self._armed:
+                _logger.info(f'Polling {"armed" if armed else "disarmed"} until {self._until.isoformat()}')
+            self._armed = armed
+        wait = max((self._until - now).total_seconds(), 0)
+        if not self._armed:
+            return schedstate(is_due=False, next=wait)
+        is_due, next_check = super().is_due(last_run_at)
+        return schedstate(is_due=is_due, next=min(next_check, wait))
+
+    def __repr__(self):
+        return f'<market_hours: every {self.run_every}>'
@@ -6,7 +6,8 @@ from rest_framework.schemas.coreapi import (
 )
 from .models import (
     TickerProperty,
-    NotificationType
+    NotificationType,
+    RollingRule,
 )
 
 _logger = logging.getLogger(__name__)
@@ -39,3 +40,19 @@ class AppSchema(AutoSchema):
         custom_fields.append(property_choices)
         custom_fields.append(type_choices)
         return self._manual_fields + custom_fields
+
+
+class RollingNotificationSchema(AppSchema):
+
+    def get_manual_fields(self, path, method):
+        rule_choices = coreapi.Field(
+            name='rule',
+            required=True,
+            location='form',
+            schema=coreschema.Enum(
+                enum=[label for _, label in RollingRule.choices],
+                title='Rule',
+                description='The condition to observe e.g. LEVEL_CROSS.'
+            )
+        )
+        return super().get_manual_fields(path, method) + [rule_choices]
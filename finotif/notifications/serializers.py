@@ -1,3 +1,6 @@
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import (
     serializers,
 )
@@ -5,9 +8,12 @@ from .models import (
     User,
     Ticker,
     StepNotification,
+    RollingNotification,
     Note,
     NotificationType,
     TickerProperty,
+    RollingRule,
+    validate_greater_than_zero,
 )
 
 
@@ -106,6 +112,45 @@ class SaveStepNotificationSerializer(serializers.ModelSerializer):
         }
 
 
+class RollingNotificationSerializer(serializers.HyperlinkedModelSerializer):
+    property = DisplayIntChoiceField(TickerProperty.choices)
+    type = DisplayIntChoiceField(NotificationType.choices)
+    rule = DisplayIntChoiceField(RollingRule.choices)
+
+    class Meta:
+        model = RollingNotification
+        read_only_fields = ['created_at', 'modified_at']
+        fields = ['id', 'url', 'title', 'content', 'ticker', 'type', 'is_active',
+                  'property', 'rule', 'threshold', 'window', 'created_at', 'modified_at']
+
+
+class SaveRollingNotificationSerializer(serializers.ModelSerializer):
+    property = DisplayIntChoiceField(TickerProperty.choices)
+    type = DisplayIntChoiceField(NotificationType.choices)
+    rule = DisplayIntChoiceField(RollingRule.choices)
+    symbol = serializers.CharField(help_text="The symbol of the ticker")
+    mic = serializers.CharField(help_text='Market Identifier Code (MIC)')
+    user = serializers.HiddenField(default=serializers.CurrentUserDefault())
+    pk = serializers.HiddenField(default=PkDefault())
+
+    class Meta:
+        model = RollingNotification
+        fields = ['pk', 'symbol', 'mic', 'title', 'content', 'is_active',
+                  'type', 'property', 'rule', 'threshold', 'window', 'user']
+        read_only_fields = ['created_at', 'modified_at']
+        extra_kwargs = {
+            'is_active': {'required': True},
+            'type': {'required': True}
+        }
+
+    def validate_window(self, value):
+        if value is not None and value > settings.ROLLING_MAX_WINDOW:
+            raise serializers.ValidationError(
+                f'Ensure this value is less than or equal to {settings.ROLLING_MAX_WINDOW}.'
+            )
+        return value
+
+
 class NoteSerializer(serializers.HyperlinkedModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
 
@@ -113,3 +158,53 @@ class NoteSerializer(serializers.HyperlinkedModelSerializer):
         model = Note
         fields = ['id', 'url', 'title', 'content', 'ticker', 'created_at',
                   'modified_at', 'user']
+
+
+class BacktestSerializer(serializers.Serializer):
+    symbol = serializers.CharField(help_text='The symbol of the ticker')
+    property = DisplayIntChoiceField(TickerProperty.choices)
+    changes = serializers.ListField(
+        child=serializers.FloatField(validators=[validate_greater_than_zero]),
+        min_length=1,
+        max_length=100,
+        help_text='The candidate changes of the step notification'
+    )
+    since = serializers.DateTimeField(
+        required=False,
+        help_text='Including, BACKTEST_MAX_DAYS before until by default'
+    )
+    until = serializers.DateTimeField(required=False, help_text='Excluding, now by default')
+
+    def validate_symbol(self, value):
+        ticker = Ticker.of_user(self.context['request'].user).filter(symbol=value.strip().upper()).first()
+        if ticker is None:
+            raise serializers.ValidationError(f'Ticker {value} is not tracked')
+        return ticker
+
+    def validate(self, data):
+        max_range = timedelta(days=settings.BACKTEST_MAX_DAYS)
+        data['until'] = data.get('until') or timezone.now()
+        data['since'] = data.get('since') or data['until'] - max_range
+        if data['since'] >= data['until']:
+            raise serializers.ValidationError({'since': 'Ensure since is before until.'})
+        if data['until'] - data['since'] > max_range:
+            raise serializers.ValidationError(
+                {'since': f'Ensure the range is at most {settings.BACKTEST_MAX_DAYS} days.'}
+            )
+        return data
+
+
+class ChangeResultSerializer(serializers.Serializer):
+    change = serializers.FloatField()
+    fires = serializers.IntegerField()
+    timestamps = serializers.ListField(child=serializers.DateTimeField())
+    truncated = serializers.BooleanField()
+
+
+class BacktestResultSerializer(serializers.Serializer):
+    symbol = serializers.CharField(source='ticker.symbol')
+    property = DisplayIntChoiceField(TickerProperty.choices)
+    since = serializers.DateTimeField()
+    until = serializers.DateTimeField()
+    ticks = serializers.IntegerField()
+    changes = ChangeResultSerializer(many=True)
@@ -1,7 +1,26 @@
 import logging
-from dataclasses import dataclass
-from yfinance import utils
-from typing import Optional
+import time
+import uuid
+from dataclasses import (
+    asdict,
+    dataclass,
+    replace,
+)
+from typing import (
+    Callable,
+    Dict,
+    Optional,
+)
+import msgpack
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from redis.exceptions import RedisError
+from . import (
+    connections,
+    metrics,
+)
+from .ratelimit import provider_bucket
 
 
 _logger = logging.getLogger(__name__)
@@ -28,7 +47,18 @@ class TickerDto:
     state: TickerStateDto = None
 
 
+class _TimeoutSession:
+    """The requests module as the session of yfinance, the requests time out after PROVIDER_REQUEST_TIMEOUT seconds"""
+    __slots__ = ()
+
+    def get(self, **kwargs):
+        import requests
+        return requests.get(timeout=settings.PROVIDER_REQUEST_TIMEOUT, **kwargs)
+
+
 class YahooTickerProvider:
+    # built per polled ticker
+    __slots__ = ('_base_url', '_scrape_url', '_symbol')
 
     def __init__(self, symbol: str):
         self._base_url = 'https://query2.finance.yahoo.com'
@@ -36,9 +66,17 @@ class YahooTickerProvider:
         self._symbol = symbol.strip().upper()
 
     def _request_data_ticker(self):
+        # yfinance imports pandas, paid by the processes which request the quotes only
+        from yfinance import utils
+        from requests import RequestException
         ticker_url = f'{self._scrape_url}/{self._symbol}'
         _logger.info('Requesting {0}...'.format(ticker_url))
-        data = utils.get_json(ticker_url)
+        try:
+            data = utils.get_json(ticker_url, session=_TimeoutSession())
+        except RequestException as er:
+            # a hanging upstream must not hold the poll cycle past its budget
+            _logger.error(f'Error during requesting {self}: {er}')
+            return None
         if data:
             try:
                 state = TickerStateDto(
@@ -77,3 +115,163 @@ class YahooTickerProvider:
     def __repr__(self):
         return f'services.{self.__class__.__name__}({self._symbol})'
 
+
+# Seconds between the reads of a key requested by another caller
+COALESCE_POLL_INTERVAL = 0.05
+# Marks a cached None, the symbol the upstream did not return
+_MISSING = b''
+# Releases the coalescing lock only if it is still held by the caller
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def cache_key(provider_name: str, kind: str, symbol: str) -> str:
+    return f'provider:{provider_name}:{kind}:{symbol}'
+
+
+class CachedTickerProvider:
+    """Caches the responses of the wrapped provider in Redis, shared by all the processes
+
+    The metadata of info() is kept for PROVIDER_INFO_CACHE_TTL seconds and the quote state
+    for PROVIDER_STATE_CACHE_TTL seconds, a None response for at most PROVIDER_MISSING_CACHE_TTL
+    seconds. Concurrent misses of the same key are coalesced -
+    the caller that takes the key's lock requests the upstream, the others wait up to
+    PROVIDER_COALESCE_TIMEOUT seconds for its response. Without Redis the upstream is
+    requested directly.
+
+    The upstream requests take the tokens of the provider's rate limiter and raise
+    ratelimit.RateLimited when none is available in PROVIDER_RATE_LIMIT_WAIT seconds.
+
+    A provider class with remote = False - the offline providers - is neither cached nor
+    limited, only timed.
+    """
+    __slots__ = ('_provider', '_symbol', '_name', '_remote')
+
+    def __init__(self, symbol: str, provider):
+        self._provider = provider
+        self._symbol = symbol.strip().upper()
+        self._name = provider.__class__.__name__
+        self._remote = getattr(provider, 'remote', True)
+
+    @property
+    def upstream(self):
+        return self._provider
+
+    def info(self) -> Optional[TickerDto]:
+        if not settings.PROVIDER_CACHE or not self._remote:
+            return self._upstream(self._provider.info)
+        fetched = []
+
+        def fetch_info():
+            info = self._upstream(self._provider.info)
+            fetched.append(info)
+            if info is not None:
+                self._store('state', info.state, settings.PROVIDER_STATE_CACHE_TTL)
+            return info
+
+        info = self._cached('info', fetch_info, settings.PROVIDER_INFO_CACHE_TTL)
+        if info is None or fetched:
+            return info
+        return replace(info, state=self.current_state())
+
+    def current_state(self) -> Optional[TickerStateDto]:
+        if not settings.PROVIDER_CACHE or not self._remote:
+            return self._upstream(self._provider.current_state)
+        return self._cached(
+            'state',
+            lambda: self._upstream(self._provider.current_state),
+            settings.PROVIDER_STATE_CACHE_TTL
+        )
+
+    def _upstream(self, request: Callable):
+        if settings.PROVIDER_RATE_LIMIT and self._remote:
+            provider_bucket(self._name).acquire(settings.PROVIDER_RATE_LIMIT_WAIT)
+        with metrics.PROVIDER_REQUEST_SECONDS.labels(self._name).time():
+            return request()
+
+    def _key(self, kind: str) -> str:
+        return cache_key(self._name, kind, self._symbol)
+
+    @staticmethod
+    def dump(kind: str, value) -> bytes:
+        if value is None:
+            return _MISSING
+        data = asdict(value)
+        if kind == 'info':
+            # the state is cached under its own key for a shorter time
+            data['state'] = None
+        return msgpack.packb(data)
+
+    @staticmethod
+    def load(kind: str, data: bytes):
+        if data == _MISSING:
+            return None
+        values = msgpack.unpackb(data)
+        return TickerDto(**values) if kind == 'info' else TickerStateDto(**values)
+
+    def _store(self, kind: str, value, ttl: int):
+        try:
+            connections.redis_connection().set(self._key(kind), self.dump(kind, value), ex=ttl)
+        except RedisError as er:
+            _logger.error(f'Cannot cache the {kind} of {self._symbol}: {er}')
+
+    def _cached(self, kind: str, fetch: Callable, ttl: int):
+        key = self._key(kind)
+        lock_key = f'{key}:lock'
+        token = uuid.uuid4().hex
+        redis = connections.redis_connection()
+        deadline = time.monotonic() + settings.PROVIDER_COALESCE_TIMEOUT
+        try:
+            while True:
+                data = redis.get(key)
+                if data is not None:
+                    return self.load(kind, data)
+                if redis.set(lock_key, token, nx=True, px=int(settings.PROVIDER_COALESCE_TIMEOUT * 1000)):
+                    break
+                if time.monotonic() >= deadline:
+                    _logger.warning(f'Timed out waiting for the {kind} of {self._symbol} requested by another caller')
+                    return fetch()
+                time.sleep(COALESCE_POLL_INTERVAL)
+        except RedisError as er:
+            _logger.error(f'Cannot read the cached {kind} of {self._symbol}: {er}')
+            return fetch()
+        try:
+            value = fetch()
+            self._store(kind, value, ttl if value is not None else min(ttl, settings.PROVIDER_MISSING_CACHE_TTL))
+            return value
+        finally:
+            try:
+                redis.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+            except RedisError as er:
+                _logger.error(f'Cannot release the lock of the {kind} of {self._symbol}: {er}')
+
+    def __repr__(self):
+        return f'services.{self.__class__.__name__}({self._provider!r})'
+
+
+# The imported provider classes by dotted path
+_provider_classes: Dict[str, type] = {}
+
+
+def provider_class(name: str) -> type:
+    """The class of a name of TICKER_PROVIDERS or of a dotted path, imported on the first use"""
+    path = settings.TICKER_PROVIDERS.get(name, name)
+    cls = _provider_classes.get(path)
+    if cls is None:
+        try:
+            cls = _provider_classes[path] = import_string(path)
+        except ImportError as er:
+            raise ImproperlyConfigured(
+                f'Ticker provider {name} is neither one of {", ".join(settings.TICKER_PROVIDERS)} '
+                f'nor an importable class: {er}'
+            )
+    return cls
+
+
+def ticker_provider(symbol: str) -> CachedTickerProvider:
+    """Provider of the symbol's quotes, an instance of the TICKER_PROVIDER class behind the cache"""
+    return CachedTickerProvider(symbol, provider_class(settings.TICKER_PROVIDER)(symbol))
@@ -1,19 +1,67 @@
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import (
+    post_save,
+    post_delete,
+)
 from django.dispatch import receiver
 from .models import (
     Tick,
-    StepNotification,
+    Ticker,
+    User,
+    Note,
+    NOTIFICATION_MODELS,
 )
-from . import tasks
+from .authentication import forget_user
+from .representations import invalidate
+from .evaluation import evaluate_ticks
+from .streams import TickStream
+from . import live
 
 
 @receiver(post_save, sender=Tick)
-def ticker_value_changed(sender, instance, **kwargs):
-    notifications = StepNotification.objects.filter(
-        ticker=instance.ticker
-    ).filter(
-        is_active=True
-    )
-    for notification in notifications:
-        if notification.should_send(instance):
-            tasks.send(notification)
+def ticker_value_changed(sender, instance, created, **kwargs):
+    if not created:
+        return
+    if settings.LIVE_EVENTS:
+        transaction.on_commit(lambda: live.publish_tick(instance))
+    if settings.TICK_EVALUATION_MODE == 'stream':
+        # evaluators must not read the tick before it is committed
+        transaction.on_commit(lambda: TickStream().publish(instance))
+    else:
+        evaluate_ticks([instance])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    if not settings.JWT_USER_CACHE:
+        return
+    forget_user(instance.pk)
+    # a request may cache the old row again before the change is committed
+    transaction.on_commit(lambda: forget_user(instance.pk))
+
+
+@receiver(post_save, sender=Ticker)
+@receiver(post_delete, sender=Ticker)
+def ticker_changed(sender, instance, **kwargs):
+    invalidate(Ticker._meta.model_name, [instance.pk])
+
+
+@receiver(post_save, sender=Note)
+@receiver(post_delete, sender=Note)
+def note_changed(sender, instance, **kwargs):
+    # the ticker's representation lists its notes
+    invalidate(Ticker._meta.model_name, [instance.ticker_id])
+
+
+def notification_changed(sender, instance, **kwargs):
+    invalidate(sender._meta.model_name, [instance.pk])
+    if settings.LIVE_EVENTS:
+        # the user's tickers may have changed
+        transaction.on_commit(lambda: live.publish_subscriptions_changed(instance.user_id))
+
+
+for notification_model in NOTIFICATION_MODELS:
+    post_save.connect(notification_changed, sender=notification_model)
+    post_delete.connect(notification_changed, sender=notification_model)
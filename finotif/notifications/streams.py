@@ -0,0 +1,116 @@
+import logging
+import os
+import socket
+import time
+from typing import List, Tuple
+from django.conf import settings
+from redis.exceptions import ResponseError
+from .models import Tick
+from .evaluation import evaluate_ticks
+from . import (
+    connections,
+    metrics,
+)
+
+
+_logger = logging.getLogger(__name__)
+
+
+class TickStream:
+    """Durable Redis stream of saved ticks, read by the evaluators through a consumer group"""
+
+    def __init__(self, name: str = None, group: str = None):
+        self.name = name or settings.TICK_STREAM_NAME
+        self.group = group or settings.TICK_STREAM_GROUP
+        self._redis = connections.redis_connection()
+
+    def publish(self, tick: Tick):
+        self._redis.xadd(
+            self.name,
+            {'tick': tick.pk},
+            maxlen=settings.TICK_STREAM_MAXLEN,
+            approximate=True
+        )
+
+    def create_group(self):
+        try:
+            self._redis.xgroup_create(self.name, self.group, id='0', mkstream=True)
+        except ResponseError as er:
+            # the group has been created by another evaluator
+            if 'BUSYGROUP' not in str(er):
+                raise
+
+    def read(self, consumer: str, count: int, block: int = None) -> List[Tuple[bytes, int]]:
+        """Returns (message id, tick id) pairs never delivered to the group before"""
+        response = self._redis.xreadgroup(
+            self.group,
+            consumer,
+            {self.name: '>'},
+            count=count,
+            block=block
+        )
+        return [message for _, messages in response for message in self._parse(messages)]
+
+    def claim(self, consumer: str, min_idle_time: int, count: int) -> List[Tuple[bytes, int]]:
+        """Takes over the messages left unacknowledged by evaluators that stopped"""
+        response = self._redis.xautoclaim(
+            self.name,
+            self.group,
+            consumer,
+            min_idle_time=min_idle_time,
+            count=count
+        )
+        return self._parse(response[1])
+
+    def ack(self, *message_ids: bytes):
+        if message_ids:
+            self._redis.xack(self.name, self.group, *message_ids)
+
+    @staticmethod
+    def _parse(messages) -> List[Tuple[bytes, int]]:
+        # deleted entries are returned without fields
+        return [(message_id, int(fields[b'tick']))
+                for message_id, fields in messages if fields]
+
+    def __repr__(self):
+        return f'streams.{self.__class__.__name__}({self.name}, {self.group})'
+
+
+class TickEvaluator:
+    """Consumes the tick stream in batches and evaluates the notifications of the ticks"""
+
+    def __init__(self, stream: TickStream = None, consumer: str = None):
+        self.stream = stream or TickStream()
+        self.consumer = consumer or f'{socket.gethostname()}-{os.getpid()}'
+        self.batch_size = settings.TICK_STREAM_BATCH_SIZE
+
+    def process(self, messages: List[Tuple[bytes, int]]):
+        if not messages:
+            return
+        ticks = Tick.objects.filter(pk__in=[tick_id for _, tick_id in messages])
+        evaluate_ticks(ticks)
+        self.stream.ack(*[message_id for message_id, _ in messages])
+
+    def process_batch(self, block: int = None) -> int:
+        """Evaluates a batch of the stalled and then new messages, returns the batch size"""
+        messages = self.stream.claim(
+            self.consumer,
+            min_idle_time=settings.TICK_STREAM_CLAIM_IDLE_TIME,
+            count=self.batch_size
+        )
+        if not messages:
+            messages = self.stream.read(self.consumer, count=self.batch_size, block=block)
+        self.process(messages)
+        return len(messages)
+
+    def run(self, block: int = 5000):
+        self.stream.create_group()
+        _logger.info(f'{self.consumer} consumes {self.stream}')
+        while True:
+            try:
+                self.process_batch(block=block)
+            except Exception as er:
+                # unacknowledged messages are claimed again after the idle time
+                _logger.exception(er)
+                metrics.FAILURES.labels('evaluation').inc()
+                time.sleep(1)
@@ -1,58 +1,262 @@
+"""Celery tasks
+
+Task signature contract - the arguments are ids and short strings only, never model
+instances or notification contents, so a message stays a few dozen bytes in msgpack:
+
+- send_email(kind: str, ids: List[int]) - emails the users of the notifications
+- send_push(kind: str, ids: List[int]) - pushes the notifications to the users' devices
+- request_yahoo_api() - polls the provider for the quotes of the tracked tickers
+- archive_ticks() - moves the old ticks to the archive files, see finotif.notifications.archive
+
+kind is the model name of the notifications (stepnotification, rollingnotification),
+the tasks load the rows themselves and skip the ids deleted in the meantime.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import (
+    List,
+    Optional,
+    Tuple,
+)
+import numpy as np
+from django.conf import settings
 from django.core import mail
 from celery import shared_task
 from celery.utils.log import get_task_logger
-from .services import YahooTickerProvider
+from redis.exceptions import (
+    LockError,
+    RedisError,
+)
+from .ratelimit import RateLimited
+from .db_routers import replica_reads
+from .ticker_store import TickerStore
 from .models import (
     NotificationType,
-    Ticker,
+    NOTIFICATION_MODELS,
     Tick,
 )
+from . import (
+    archive,
+    connections,
+    live,
+    metrics,
+)
 
 _logger = get_task_logger(__name__)
 
+NOTIFICATION_KINDS = {model._meta.model_name: model for model in NOTIFICATION_MODELS}
+
+_batch = threading.local()
+
+POLL_LOCK_KEY = 'poll:lock'
+POLL_CURSOR_KEY = 'poll:cursor'
+
+# The tracked tickers of the worker process, synced by every poll cycle
+_store = TickerStore()
+
+
+@contextmanager
+def batched():
+    """Enqueues the notifications sent within the block as tasks of up to NOTIFICATION_TASK_BATCH_SIZE ids
+
+    The notifications are enqueued even when the block raises - their anchors are already moved
+    and committed, so a retry would not fire them again. The error of the block is raised then,
+    the errors of enqueuing are logged.
+    """
+    if getattr(_batch, 'entries', None) is not None:
+        yield
+        return
+    _batch.entries = defaultdict(list)
+    try:
+        yield
+    except BaseException:
+        for task, entries in _pending().items():
+            try:
+                _deliver(task, entries)
+            except Exception as er:
+                _logger.error(f'Cannot send {len(entries)} notifications: {er}')
+                metrics.FAILURES.labels('send').inc()
+        raise
+    else:
+        for task, entries in _pending().items():
+            _deliver(task, entries)
+
+
+def _pending() -> dict:
+    pending, _batch.entries = _batch.entries, None
+    return pending
+
+
+def delivery_key(notification, fired_from: int) -> str:
+    return f'delivery:{notification._meta.model_name}:{notification.pk}:{fired_from}'
+
+
+def _claim(entries: List[Tuple[object, Optional[int]]]) -> list:
+    """Keeps the (notification, anchor tick id) entries not delivered yet, in one round trip to Redis
+
+    A key set if absent with a TTL marks a delivery from the anchor - the tick the rule fired
+    from - so the new ticks of the same quote saved by a retried cycle or an overlapping beat,
+    evaluated against the same anchor, do not send the notification twice.
+    """
+    keyed = [entry for entry in entries if entry[1] is not None]
+    if not settings.DELIVERY_DEDUP or not keyed:
+        return entries
+    pipeline = connections.redis_connection().pipeline(transaction=False)
+    for notification, fired_from in keyed:
+        pipeline.set(delivery_key(notification, fired_from), 1, nx=True, ex=settings.DELIVERY_DEDUP_TTL)
+    try:
+        claimed = iter(pipeline.execute())
+    except RedisError as er:
+        # rather twice than never
+        _logger.error(f'Cannot deduplicate {len(keyed)} deliveries: {er}')
+        return entries
+    unique = [entry for entry in entries if entry[1] is None or next(claimed)]
+    metrics.DUPLICATE_DELIVERIES.inc(len(entries) - len(unique))
+    return unique
 
-def send(notification):
+
+def _deliver(task, entries):
+    notifications = defaultdict(list)
+    for notification, _ in _claim(entries):
+        notifications[notification._meta.model_name].append(notification)
+    size = settings.NOTIFICATION_TASK_BATCH_SIZE
+    for kind, kind_notifications in notifications.items():
+        for start in range(0, len(kind_notifications), size):
+            task.delay(kind, [notification.pk for notification in kind_notifications[start:start + size]])
+        for notification in kind_notifications:
+            metrics.NOTIFICATIONS_FIRED.labels(
+                kind,
+                NotificationType(notification.type).name.lower()
+            ).inc()
+            if settings.LIVE_EVENTS:
+                live.publish_notification(notification)
+
+
+def send(notification, fired_from: int = None):
+    """Sends the notification, at most once per anchor when the id of the tick it fired from is given"""
     type = notification.type
     if type == NotificationType.EMAIL:
-        send_email.delay(
-            notification.user.email,
-            notification.title,
-            notification.content
-        )
+        task = send_email
     elif type == NotificationType.PUSH:
-        send_push.delay(notification)
+        task = send_push
     else:
         _logger.warning(f'Cannot send notification - unknown type {type}')
+        metrics.FAILURES.labels('send').inc()
+        return
+    pending = getattr(_batch, 'entries', None)
+    # send_push is a stub yet, the pushes are not batched
+    if pending is None or task is send_push:
+        _deliver(task, [(notification, fired_from)])
+    else:
+        pending[task].append((notification, fired_from))
+
+
+def _notifications(kind: str, ids: List[int]):
+    return NOTIFICATION_KINDS[kind].objects.select_related('user').filter(pk__in=ids).order_by('pk')
 
 
 @shared_task
-def send_email(to: str, subject: str, content: str):
-    result = mail.send_mail(
-        subject=subject,
-        message=content,
-        from_email=None,
-        recipient_list=[to],
-        fail_silently=False
-    )
-    _logger.info(f'Sending email to = {to}, result={result}')
+def send_email(kind: str, ids: List[int]):
+    messages = [
+        mail.EmailMessage(
+            subject=notification.title,
+            body=notification.content,
+            to=[notification.user.email]
+        )
+        for notification in _notifications(kind, ids)
+    ]
+    # one connection to the smtp server for the whole batch
+    result = mail.get_connection(fail_silently=False).send_messages(messages)
+    _logger.info(f'Sending {len(messages)} emails of {kind} {ids}, result={result}')
 
 
 @shared_task
-def send_push(notification):
+def send_push(kind: str, ids: List[int]):
     # TODO:
     _logger.warning(f'No push sent')
 
 
 @shared_task
 def request_yahoo_api():
-    tickers = (Ticker.objects
-               .select_related('exchange')
-               .filter(stepnotification__is_active=True)
-               .distinct())
-    for ticker in tickers:
-        if not ticker.exchange.is_open():
+    """Polls the tracked tickers within POLL_CYCLE_BUDGET seconds, one cycle at a time
+
+    With POLL_CYCLE_LOCK a cycle started while the previous one still holds the Redis lock
+    is skipped, and the tickers not polled before the deadline are polled first by the next
+    cycle - the cursor stored in Redis is the last polled ticker.
+    """
+    if not settings.POLL_CYCLE_LOCK:
+        _cycle(cursor=None)
+        return
+    redis = connections.redis_connection()
+    lock = redis.lock(POLL_LOCK_KEY, timeout=settings.POLL_CYCLE_LOCK_TIMEOUT, blocking=False)
+    if not lock.acquire():
+        _logger.warning('Skipping the poll cycle, the previous one is still running')
+        metrics.POLL_CYCLES.labels('skipped').inc()
+        return
+    try:
+        cursor = redis.get(POLL_CURSOR_KEY)
+        last = _cycle(cursor=int(cursor) if cursor is not None else None)
+        if last is not None:
+            redis.set(POLL_CURSOR_KEY, last)
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            _logger.warning('The poll lock expired before the end of the cycle')
+
+
+@shared_task
+def archive_ticks():
+    if not settings.TICK_ARCHIVE:
+        return
+    try:
+        archived = archive.archive_ticks()
+    except archive.ArchiveLocked as er:
+        _logger.warning(f'Skipping the archival: {er}')
+        return
+    _logger.info(f'Archived {archived} ticks')
+
+
+def _cycle(cursor: Optional[int]) -> Optional[int]:
+    """Returns the pk of the last polled ticker"""
+    with replica_reads():
+        _store.sync()
+    _store.defer_closed()
+    rows = _store.fair_order(cursor)
+    deadline = time.monotonic() + settings.POLL_CYCLE_BUDGET
+    with metrics.POLL_CYCLE_SECONDS.time(), batched():
+        polled = _poll(rows, deadline)
+    deferred = len(rows) - polled
+    if deferred:
+        _logger.warning(f'Poll cycle deferred {deferred} of {len(rows)} tickers')
+        metrics.POLL_CYCLES.labels('overrun').inc()
+        metrics.DEFERRED_TICKERS.inc(deferred)
+    else:
+        metrics.POLL_CYCLES.labels('completed').inc()
+    return int(_store.ids[rows[polled - 1]]) if polled else None
+
+
+def _poll(rows: np.ndarray, deadline: float) -> int:
+    """Returns the number of the store's rows polled before the deadline or the rate limit stopped the cycle"""
+    for index, row in enumerate(rows.tolist()):
+        if index and time.monotonic() >= deadline:
+            return index
+        now = time.time()
+        if not _store.is_due(row, now):
+            continue
+        try:
+            state = _store.provider(row).current_state()
+        except RateLimited as er:
+            _logger.warning(f'{er}, deferring {len(rows) - index} tickers')
+            return index
+        if state is None:
+            metrics.FAILURES.labels('provider').inc()
+            continue
+        if not _store.record(row, state):
+            # the same quote again, its ticks are saved already
             continue
-        symbol = ticker.symbol
-        provider = YahooTickerProvider(symbol)
-        state = provider.current_state()
-        Tick.save_ticks(state, ticker)
+        ticks = Tick.save_ticks(state, int(_store.ids[row]))
+        metrics.TICKS_SAVED.inc(len(ticks or ()))
+    return len(rows)
@@ -1,10 +1,14 @@
 import pytest
+import fakeredis
+import fakeredis.aioredis
+from unittest import mock
 from ..models import (
     User,
     Exchange,
     Ticker,
     Tick,
     StepNotification,
+    RollingNotification,
     Currency,
 )
 
@@ -92,3 +96,44 @@ def step_notification(default_ticker, user):
         )
 
     return _produce
+
+
+@pytest.fixture
+def rolling_notification(default_ticker, user):
+    def _produce(
+            property,
+            type,
+            rule,
+            threshold=None,
+            window=None,
+            ticker=default_ticker,
+            title='Rolling notification',
+            content='Some content'
+    ):
+        return RollingNotification.objects.create(
+            property=property,
+            type=type,
+            rule=rule,
+            threshold=threshold,
+            window=window,
+            user=user.get(),
+            ticker=ticker,
+            title=title,
+            content=content,
+        )
+
+    return _produce
+
+
+@pytest.fixture
+def fake_redis():
+    server = fakeredis.FakeServer()
+    connection = fakeredis.FakeRedis(server=server)
+    with mock.patch(
+            'finotif.notifications.connections.redis_connection',
+            return_value=connection
+    ), mock.patch(
+            'finotif.notifications.connections.async_redis_connection',
+            side_effect=lambda: fakeredis.aioredis.FakeRedis(server=server)
+    ):
+        yield connection
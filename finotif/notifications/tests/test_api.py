@@ -9,8 +9,10 @@ from rest_framework import status
 from rest_framework.test import APIClient
 from ..models import (
     StepNotification,
+    RollingNotification,
     TickerProperty,
     NotificationType,
+    RollingRule,
     User,
     Note
 )
@@ -34,6 +36,7 @@ def client():
         reverse('note-list'),
         reverse('ticker-list'),
         reverse('stepnotification-list'),
+        reverse('rollingnotification-list'),
     ],
 )
 def test_if_not_loggedin_then_unauthorized(client, url):
@@ -47,7 +50,7 @@ def test_healthcheck(client):
 
 
 @pytest.mark.django_db
-@mock.patch('finotif.notifications.models.TickerProvider.info')
+@mock.patch('finotif.notifications.services.YahooTickerProvider.info')
 def test_api_workflow(mock_info, client):
     def user_workflow(username, password, email, info):
         # Mock the call to any external api:
@@ -191,6 +194,71 @@ def test_api_workflow(mock_info, client):
     user_workflow('user2', 'user2Te$tPass', 'user2@email.com', info=TickerDto(**info))
 
 
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.services.YahooTickerProvider.info')
+def test_create_rolling_notification(mock_info, client, user, default_ticker):
+    mock_info.return_value = None
+    client.force_authenticate(user.get())
+    notification_data = {
+        'symbol': default_ticker.symbol,
+        'mic': 'XNAS',
+        'rule': RollingRule.LEVEL_CROSS.name,
+        'property': TickerProperty.PRICE.name,
+        'type': NotificationType.EMAIL.name,
+        'title': 'Price crossed 4 USD',
+        'content': 'Price crossed 4 USD',
+        'is_active': True,
+    }
+
+    # the level is required
+    response = client.post(
+        reverse('rollingnotification-list'), notification_data, format='json'
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    notification_data['threshold'] = 4.0
+    response = client.post(
+        reverse('rollingnotification-list'), notification_data, format='json'
+    )
+    data_got = json.loads(response.content)
+    notification = RollingNotification.objects.get(pk=data_got['id'])
+    assert (
+        response.status_code == status.HTTP_201_CREATED
+        and data_got['rule'] == RollingRule.LEVEL_CROSS.name
+        and data_got['window'] is None
+        and notification.threshold == 4.0
+    )
+
+    response = client.get(reverse('ticker-list'))
+    assert [ticker['symbol'] for ticker in json.loads(response.content)['results']] == [
+        default_ticker.symbol
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('rule', [RollingRule.PERCENT_CHANGE, RollingRule.MOVING_AVERAGE_CROSS])
+def test_rolling_notification_window_is_bounded(client, user, default_ticker, settings, rule):
+    client.force_authenticate(user.get())
+    notification_data = {
+        'symbol': default_ticker.symbol,
+        'mic': 'XNAS',
+        'rule': rule.name,
+        'property': TickerProperty.PRICE.name,
+        'type': NotificationType.EMAIL.name,
+        'title': 'Window',
+        'content': 'Window',
+        'is_active': True,
+        'threshold': 5.0,
+        'window': settings.ROLLING_MAX_WINDOW + 1,
+    }
+
+    response = client.post(reverse('rollingnotification-list'), notification_data, format='json')
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'window' in json.loads(response.content)
+    assert not RollingNotification.objects.exists()
+
+
 def url_join(*args):
     url = reduce(lambda a, b: urllib.parse.urljoin(a, b), args)
     return url if url.endswith('/') else url + '/'
@@ -0,0 +1,163 @@
+import logging
+import pytest
+from datetime import (
+    datetime,
+    timezone as TimeZone,
+)
+import numpy as np
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections
+from ..archive import (
+    ARCHIVE_LOCK_ID,
+    ArchiveLocked,
+    archive_cutoff,
+    archive_ticks,
+    month_path,
+    read_month,
+    tick_history,
+)
+from ..backtest import backtest
+from ..management.commands.archive_ticks import cutoff_datetime
+from ..models import (
+    Tick,
+    TickerProperty,
+    NotificationType,
+)
+
+_logger = logging.getLogger(__name__)
+
+PRICES = (3.5, 4.0, 4.2, 4.5, 6.0, 5.7, 5.5)
+JANUARY = datetime(2022, 1, 10, tzinfo=TimeZone.utc)
+FEBRUARY = datetime(2022, 2, 10, tzinfo=TimeZone.utc)
+CUTOFF = datetime(2022, 3, 1, tzinfo=TimeZone.utc)
+
+
+@pytest.fixture
+def archive_dir(settings, tmp_path):
+    settings.TICK_ARCHIVE_DIR = str(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def history(tick):
+    """Two ticks in January, three in February and the rest after the cutoff"""
+    ticks = [tick(value=value, property=TickerProperty.PRICE) for value in PRICES]
+    ticks.append(tick(value=1000, property=TickerProperty.VOLUME))
+    for index, created_at in enumerate([JANUARY] * 2 + [FEBRUARY] * 3):
+        Tick.objects.filter(pk=ticks[index].pk).update(created_at=created_at.replace(hour=index))
+    Tick.objects.filter(pk=ticks[-1].pk).update(created_at=JANUARY)
+    return list(Tick.objects.order_by('pk'))
+
+
+def rows(ticks):
+    return [(tick.pk, tick.value, tick.created_at) for tick in ticks]
+
+
+def test_cutoff_is_start_of_month():
+    now = datetime(2022, 5, 15, 12, 30, tzinfo=TimeZone.utc)
+
+    assert archive_cutoff(now) == datetime(2022, 2, 1, tzinfo=TimeZone.utc)
+
+
+@pytest.mark.django_db
+def test_ticks_moved_to_files_per_ticker_month(archive_dir, history, default_ticker):
+    # act
+    archived = archive_ticks(CUTOFF)
+
+    # assert
+    assert archived == 6
+    assert list(Tick.objects.values_list('pk', flat=True)) == [tick.pk for tick in history[5:7]]
+    january = read_month(month_path(default_ticker.pk, JANUARY))
+    assert isinstance(january['value'], np.memmap)
+    assert january['id'].tolist() == [history[0].pk, history[1].pk, history[-1].pk]
+    assert january['property'].tolist() == [TickerProperty.PRICE, TickerProperty.PRICE, TickerProperty.VOLUME]
+    assert january['currency'].tolist() == ['USD'] * 3
+    assert len(read_month(month_path(default_ticker.pk, FEBRUARY))['id']) == 3
+
+
+@pytest.fixture
+def other_run():
+    """A connection of another process, holding the archive lock"""
+    other = connections.create_connection('default')
+    with other.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_lock(%s)', [ARCHIVE_LOCK_ID])
+    yield other
+    other.close()
+
+
+@pytest.mark.django_db
+def test_overlapping_runs_are_refused(archive_dir, history, default_ticker, other_run):
+    # act
+    with pytest.raises(ArchiveLocked):
+        archive_ticks(CUTOFF)
+    with pytest.raises(CommandError):
+        call_command('archive_ticks', before=CUTOFF)
+    other_run.close()
+    archived = archive_ticks(CUTOFF)
+
+    # assert
+    assert archived == 6
+    assert month_path(default_ticker.pk, JANUARY).exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('compress', [False, True])
+def test_history_merges_archive_and_database(archive_dir, settings, history, default_ticker, compress):
+    # arrange
+    settings.TICK_ARCHIVE_COMPRESS = compress
+    expected = rows(history[:7])
+
+    # act
+    archive_ticks(CUTOFF)
+    merged = list(tick_history(default_ticker.pk, TickerProperty.PRICE, chunk_size=2))
+    ranged = list(tick_history(default_ticker.pk, TickerProperty.PRICE, since=history[1].created_at,
+                               until=history[3].created_at))
+
+    # assert
+    assert merged == expected
+    assert ranged == expected[1:3]
+
+
+@pytest.mark.django_db
+def test_anchor_ticks_stay_until_released(archive_dir, history, default_ticker, step_notification):
+    # arrange
+    notification = step_notification(change=0.5, property=TickerProperty.PRICE, type=NotificationType.EMAIL)
+    notification.last_tick = history[1]
+    notification.save()
+
+    # act
+    first = archive_ticks(CUTOFF)
+    notification.last_tick = history[6]
+    notification.save()
+    second = archive_ticks(CUTOFF)
+
+    # assert
+    assert (first, second) == (5, 1)
+    notification.refresh_from_db()
+    assert notification.last_tick_id == history[6].pk
+    january = read_month(month_path(default_ticker.pk, JANUARY))
+    assert january['id'].tolist() == [history[0].pk, history[1].pk, history[-1].pk]
+    assert list(tick_history(default_ticker.pk, TickerProperty.PRICE)) == rows(history[:7])
+
+
+@pytest.mark.django_db
+def test_backtest_same_after_archival(archive_dir, history, default_ticker):
+    before = backtest(default_ticker, TickerProperty.PRICE, [0.5, 1.0])
+
+    call_command('archive_ticks', '--before', CUTOFF.isoformat())
+    after = backtest(default_ticker, TickerProperty.PRICE, [0.5, 1.0])
+
+    assert Tick.objects.count() == 2
+    assert after == before
+
+
+@pytest.mark.parametrize('value', ['yesterday', '2022-13-01T00:00:00'])
+def test_archive_command_rejects_invalid_cutoff(value):
+    with pytest.raises(CommandError):
+        call_command('archive_ticks', '--before', value)
+
+
+def test_archive_command_cutoff_without_offset_in_current_time_zone():
+    assert cutoff_datetime('2022-02-01T00:00:00') == datetime(2022, 2, 1, tzinfo=TimeZone.utc)
+    assert cutoff_datetime('2022-02-01T00:00:00+01:00').utcoffset().total_seconds() == 3600
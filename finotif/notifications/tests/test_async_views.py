@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import pytest
+from django.urls import resolve
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from ..models import (
+    TickerProperty,
+    NotificationType,
+)
+from ..services import (
+    CachedTickerProvider,
+    TickerStateDto,
+)
+
+_logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def owner(user, step_notification):
+    notification = step_notification(
+        change=0.5,
+        property=TickerProperty.PRICE,
+        type=NotificationType.EMAIL,
+    )
+    return notification.user
+
+
+def test_quote_endpoint_is_async():
+    assert asyncio.iscoroutinefunction(resolve(reverse('ticker-quote', kwargs={'pk': 1})).func)
+
+
+@pytest.mark.parametrize('name', ['ticker-list', 'stepnotification-list', 'rollingnotification-list'])
+def test_database_bound_endpoints_are_viewsets(name):
+    assert not asyncio.iscoroutinefunction(resolve(reverse(name)).func)
+
+
+@pytest.mark.django_db
+def test_quote_authenticates_as_viewsets(client, owner, user, default_ticker):
+    # arrange
+    stranger = user.get()
+    quote_url = reverse('ticker-quote', kwargs={'pk': default_ticker.pk})
+
+    # act
+    anonymous = client.get(quote_url)
+    client.credentials(HTTP_AUTHORIZATION='Bearer forged')
+    forged = client.get(quote_url)
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(stranger)}')
+    not_found = client.get(quote_url)
+
+    # assert
+    assert anonymous.status_code == forged.status_code == 401
+    assert anonymous.json() == {'detail': 'Authentication credentials were not provided.'}
+    assert forged.json()['code'] == 'token_not_valid'
+    assert not_found.status_code == 404
+
+
+@pytest.mark.django_db
+def test_quote_from_ticks_then_provider_cache(client, owner, default_ticker, tick, fake_redis):
+    # arrange
+    client.force_authenticate(owner)
+    tick(value=3.5, property=TickerProperty.PRICE)
+    tick(value=3.6, property=TickerProperty.PRICE)
+    tick(value=1000, property=TickerProperty.VOLUME)
+    url = reverse('ticker-quote', kwargs={'pk': default_ticker.pk})
+
+    # act
+    saved = client.get(url).json()
+    fake_redis.set(
+        f'provider:YahooTickerProvider:state:{default_ticker.symbol}',
+        CachedTickerProvider.dump('state', TickerStateDto(currency='USD', price=3.7, volume=1200))
+    )
+    cached = client.get(url).json()
+
+    # assert
+    assert saved['source'] == 'ticks'
+    assert (saved['price'], saved['volume'], saved['ask']) == (3.6, 1000, None)
+    assert saved['currency'] == 'USD'
+    assert cached['source'] == 'provider'
+    assert (cached['symbol'], cached['price'], cached['volume']) == ('TELL', 3.7, 1200)
@@ -0,0 +1,78 @@
+import logging
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from ..authentication import user_key
+
+_logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def user_cache(settings, fake_redis):
+    settings.JWT_USER_CACHE = True
+    return fake_redis
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+def user_queries(client, url):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    users_table = 'notifications_user'
+    return response, [query['sql'] for query in queries if f'FROM "{users_table}"' in query['sql']]
+
+
+@pytest.mark.django_db
+def test_cached_user_skips_auth_query(user_cache, client, user):
+    # arrange
+    owner = user.get()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(owner)}')
+
+    # act
+    first, first_queries = user_queries(client, reverse('note-list'))
+    second, second_queries = user_queries(client, reverse('note-list'))
+
+    # assert
+    assert first.status_code == second.status_code == 200
+    assert len(first_queries) == 1
+    assert second_queries == []
+    assert user_cache.ttl(user_key(owner.pk)) > 0
+
+
+@pytest.mark.django_db
+def test_deactivated_user_is_rejected(user_cache, client, user):
+    # arrange
+    owner = user.get()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(owner)}')
+    client.get(reverse('note-list'))
+
+    # act
+    owner.is_active = False
+    owner.save()
+    response = client.get(reverse('note-list'))
+
+    # assert
+    assert response.status_code == 401
+    assert response.json()['code'] == 'user_inactive'
+    assert not user_cache.exists(user_key(owner.pk))
+
+
+@pytest.mark.django_db
+def test_password_change_drops_cached_user(user_cache, client, user):
+    # arrange
+    owner = user.get()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(owner)}')
+    client.get(reverse('note-list'))
+
+    # act
+    owner.set_password('changed!RF')
+    owner.save()
+
+    # assert
+    assert not user_cache.exists(user_key(owner.pk))
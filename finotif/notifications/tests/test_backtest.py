@@ -0,0 +1,130 @@
+import logging
+import pytest
+from datetime import timedelta
+from unittest import mock
+from django.core.management import call_command
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from ..backtest import backtest
+from ..models import (
+    Tick,
+    TickerProperty,
+    NotificationType,
+)
+
+_logger = logging.getLogger(__name__)
+
+PRICES = (3.5, 4.0, 4.2, 4.5, 6.0, 5.7, 5.5)
+
+
+@pytest.fixture
+def history(tick):
+    ticks = [tick(value=value, property=TickerProperty.PRICE) for value in PRICES]
+    ticks.append(tick(value=1000, property=TickerProperty.VOLUME))
+    return ticks
+
+
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.tasks.send')
+def test_backtest_many_changes_in_one_pass(mock_send, settings, history, default_ticker, step_notification):
+    # arrange
+    settings.BACKTEST_CHUNK_SIZE = 2
+    notification = step_notification(change=0.5, property=TickerProperty.PRICE, type=NotificationType.EMAIL)
+
+    # act
+    result = backtest(default_ticker, TickerProperty.PRICE, [0.5, 1.0, 10], timestamps_limit=2)
+
+    # assert (the same fires as the evaluators send for the same ticks)
+    assert result.ticks == len(PRICES)
+    assert [(change.change, change.fires) for change in result.changes] == [(0.5, 4), (1.0, 2), (10, 0)]
+    assert result.changes[0].timestamps == [history[1].created_at, history[3].created_at]
+    assert result.changes[0].truncated and not result.changes[1].truncated
+    notification.refresh_from_db()
+    assert notification.last_tick is None
+    mock_send.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_backtest_range(history, default_ticker):
+    Tick.objects.filter(pk__in=[tick.pk for tick in history[:4]]).update(
+        created_at=history[4].created_at - timedelta(days=1)
+    )
+
+    result = backtest(default_ticker, TickerProperty.PRICE, [0.5], since=history[4].created_at)
+
+    assert result.ticks == 3
+    assert result.changes[0].fires == 1
+
+
+@pytest.mark.django_db
+def test_backtest_api(history, step_notification):
+    # arrange
+    notification = step_notification(change=0.5, property=TickerProperty.PRICE, type=NotificationType.EMAIL)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(notification.user)}')
+
+    # act
+    response = client.post(reverse('backtest-list'), {
+        'symbol': 'tell',
+        'property': 'PRICE',
+        'changes': [0.5, 1.0],
+    }, format='json')
+    invalid = client.post(reverse('backtest-list'), {
+        'symbol': 'NONE',
+        'property': 'PRICE',
+        'changes': [0],
+    }, format='json')
+
+    # assert
+    assert response.status_code == 200
+    body = response.json()
+    assert (body['symbol'], body['property'], body['ticks']) == ('TELL', 'PRICE', len(PRICES))
+    assert [change['fires'] for change in body['changes']] == [4, 2]
+    assert len(body['changes'][0]['timestamps']) == 4
+    assert invalid.status_code == 400
+    assert set(invalid.json()) == {'symbol', 'changes'}
+
+
+@pytest.mark.django_db
+def test_backtest_api_limited_to_user_tickers_and_range(history, step_notification, user, settings):
+    # arrange
+    notification = step_notification(change=0.5, property=TickerProperty.PRICE, type=NotificationType.EMAIL)
+    owner, other = APIClient(), APIClient()
+    owner.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(notification.user)}')
+    other.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user.get())}')
+    request = {'symbol': 'TELL', 'property': 'PRICE', 'changes': [0.5]}
+
+    # act
+    not_owned = other.post(reverse('backtest-list'), request, format='json')
+    too_long = owner.post(reverse('backtest-list'), {
+        **request,
+        'since': (history[0].created_at - timedelta(days=settings.BACKTEST_MAX_DAYS + 1)).isoformat(),
+    }, format='json')
+    reversed_range = owner.post(reverse('backtest-list'), {
+        **request,
+        'since': history[-1].created_at.isoformat(),
+        'until': history[0].created_at.isoformat(),
+    }, format='json')
+    default_range = owner.post(reverse('backtest-list'), request, format='json')
+
+    # assert
+    assert not_owned.status_code == 400
+    assert set(not_owned.json()) == {'symbol'}
+    assert too_long.status_code == 400
+    assert set(too_long.json()) == {'since'}
+    assert reversed_range.status_code == 400
+    assert set(reversed_range.json()) == {'since'}
+    assert default_range.status_code == 200
+    assert default_range.json()['ticks'] == len(PRICES)
+
+
+@pytest.mark.django_db
+def test_backtest_command(history, capsys):
+    call_command('backtest', 'TELL', changes=[0.5, 1.0], timestamps=True)
+
+    output = capsys.readouterr().out
+    assert 'TELL PRICE: 7 ticks' in output
+    assert 'change=0.5 fires=4' in output
+    assert 'change=1 fires=2' in output
+    assert history[1].created_at.isoformat() in output
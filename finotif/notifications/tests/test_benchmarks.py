@@ -0,0 +1,61 @@
+import logging
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.db import transaction
+from ..benchmarks import (
+    seed,
+    run_stages,
+    offline_pipeline,
+)
+from ..models import Ticker
+from .. import tasks
+
+_logger = logging.getLogger(__name__)
+
+
+@pytest.mark.django_db
+def test_benchmark_poll_cycle(benchmark):
+    seed(tickers=20, notifications=500)
+
+    def cycle():
+        with offline_pipeline():
+            tasks.request_yahoo_api()
+
+    benchmark.pedantic(cycle, rounds=3, iterations=1)
+
+    assert len(mail.outbox) > 0
+
+
+def evaluation_stage(tickers, notifications):
+    """The second round of the evaluation stage, the seeded data rolled back"""
+    with transaction.atomic():
+        seed(tickers=tickers, notifications=notifications)
+        run_stages()  # anchors the notifications
+        results = {result.name: result for result in run_stages()}
+        transaction.set_rollback(True)
+    return results['evaluation'], results['send']
+
+
+@pytest.mark.django_db
+def test_evaluation_queries_do_not_grow_with_notifications():
+    # act
+    small, small_sent = evaluation_stage(tickers=10, notifications=500)
+    large, large_sent = evaluation_stage(tickers=10, notifications=5000)
+
+    # assert
+    assert large_sent.items > small_sent.items > 0
+    assert large.items == small.items
+    assert large.queries == small.queries
+    # the rules, the rolling rules, the fired rows and an update per moved anchor tick - a price tick per ticker
+    assert large.queries <= 3 + 10
+
+
+@pytest.mark.django_db
+def test_benchmark_pipeline_command_rolls_back(capsys):
+    call_command('benchmark_pipeline', tickers=2, notifications=10, rounds=1)
+
+    output = capsys.readouterr().out
+    for stage in ('provider', 'save_ticks', 'evaluation', 'send', 'request_yahoo_api'):
+        assert stage in output
+    assert not Ticker.objects.filter(symbol__startswith='BENCH').exists()
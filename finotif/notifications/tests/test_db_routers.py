@@ -0,0 +1,87 @@
+import logging
+import pytest
+from unittest import mock
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from ..db_routers import (
+    ReplicaRouter,
+    replica_reads,
+    sticky_key,
+)
+from ..models import (
+    Ticker,
+    TickerProperty,
+    NotificationType,
+)
+from .. import tasks
+
+_logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def replica(settings, fake_redis):
+    # the default alias stands in for the replica, so the routed queries still run
+    settings.REPLICA_DATABASE = 'default'
+    return fake_redis
+
+
+@pytest.fixture
+def routed():
+    aliases = []
+    db_for_read = ReplicaRouter.db_for_read
+
+    def spy(self, model, **hints):
+        alias = db_for_read(self, model, **hints)
+        aliases.append((model.__name__, alias))
+        return alias
+
+    with mock.patch.object(ReplicaRouter, 'db_for_read', spy):
+        yield aliases
+
+
+def test_only_reads_within_block_go_to_replica(settings):
+    settings.REPLICA_DATABASE = 'replica'
+    router = ReplicaRouter()
+
+    with replica_reads():
+        inside = router.db_for_read(Ticker)
+        write = router.db_for_write(Ticker)
+
+    assert (inside, write) == ('replica', 'default')
+    assert router.db_for_read(Ticker) is None
+    assert not router.allow_migrate('replica', 'notifications')
+
+
+@pytest.mark.django_db
+def test_user_reads_own_writes_from_primary(replica, user, default_ticker, routed):
+    # arrange
+    client = APIClient()
+    author = user.get()
+    client.force_authenticate(author)
+
+    # act
+    client.get(reverse('note-list'))
+    replica_aliases = {alias for _, alias in routed}
+    routed.clear()
+    response = client.post(reverse('note-list'), {
+        'title': 'Note',
+        'content': 'Content',
+        'ticker': reverse('ticker-detail', kwargs={'pk': default_ticker.pk}),
+    }, format='json')
+    client.get(reverse('note-list'))
+
+    # assert
+    assert response.status_code == 201
+    assert replica_aliases == {'default'}
+    assert replica.ttl(sticky_key(author.pk)) > 0
+    assert {alias for _, alias in routed} == {None}
+
+
+@pytest.mark.django_db
+def test_poller_selects_tickers_from_replica(replica, step_notification, routed):
+    step_notification(change=0.5, property=TickerProperty.PRICE, type=NotificationType.EMAIL)
+
+    with mock.patch('finotif.notifications.models.Exchange.is_open', return_value=False):
+        tasks.request_yahoo_api()
+
+    assert ('Ticker', 'default') in routed
@@ -0,0 +1,92 @@
+import logging
+import pytest
+import numpy as np
+from unittest import mock
+from ..evaluation import (
+    StepRules,
+    evaluate_ticks,
+    load_step_rules,
+)
+from ..models import (
+    Tick,
+    StepNotification,
+    TickerProperty,
+    NotificationType
+)
+
+_logger = logging.getLogger(__name__)
+
+
+def test_step_rules_fire_and_move_anchors():
+    # arrange (the last notification has no anchor yet)
+    rules = StepRules(
+        ids=[1, 2, 3],
+        changes=[0.5, 1.0, 0.5],
+        anchors=[3.5, 3.5, np.nan],
+        anchor_ticks=[10, 10, 0]
+    )
+
+    # act
+    fired, fired_from = rules.evaluate(Tick(pk=11, value=4.0))
+
+    # assert
+    assert fired.tolist() == [1]
+    assert fired_from.tolist() == [10]
+    assert rules.anchors.tolist() == [4.0, 3.5, 4.0]
+    assert {tick_id: ids.tolist() for tick_id, ids in rules.moved_anchors().items()} == {11: [1, 3]}
+
+
+@pytest.mark.parametrize('evaluator', ['vectorized', 'model'])
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.tasks.send')
+def test_evaluators_send_the_same_notifications(
+        mock_send,
+        evaluator,
+        settings,
+        step_notification,
+        tick
+):
+    # arrange (in the stream mode the saved ticks are not evaluated by the signal)
+    settings.TICK_EVALUATION_MODE = 'stream'
+    settings.TICK_EVALUATOR = evaluator
+    small_step, big_step, volume_step = (
+        step_notification(change=0.5, property=TickerProperty.PRICE, type=NotificationType.EMAIL),
+        step_notification(change=1.0, property=TickerProperty.PRICE, type=NotificationType.EMAIL),
+        step_notification(change=100, property=TickerProperty.VOLUME, type=NotificationType.EMAIL),
+    )
+    ticks = [tick(value=value, property=TickerProperty.PRICE)
+             for value in (3.5, 4.0, 4.2, 4.5, 6.0, 5.7, 5.5)]
+    ticks.append(tick(value=1000, property=TickerProperty.VOLUME))
+
+    # act
+    evaluate_ticks(ticks)
+
+    # assert
+    sent = [call.args[0].pk for call in mock_send.call_args_list]
+    assert sent == [small_step.pk, small_step.pk, big_step.pk,
+                    small_step.pk, big_step.pk, small_step.pk]
+    fired_from = [call.args[1] for call in mock_send.call_args_list]
+    assert fired_from == [ticks[i].pk for i in (0, 1, 0, 3, 3, 4)]
+    anchors = dict(StepNotification.objects.values_list('pk', 'last_tick__value'))
+    assert anchors == {small_step.pk: 5.5, big_step.pk: 6.0, volume_step.pk: 1000}
+
+
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.tasks.send')
+def test_notification_deleted_after_rules_loaded_is_skipped(mock_send, settings, step_notification, tick):
+    # arrange
+    settings.TICK_EVALUATION_MODE = 'stream'
+    deleted, kept = (
+        step_notification(change=0.5, property=TickerProperty.PRICE, type=NotificationType.EMAIL),
+        step_notification(change=0.5, property=TickerProperty.PRICE, type=NotificationType.EMAIL),
+    )
+    evaluate_ticks([tick(value=3.5, property=TickerProperty.PRICE)])
+    rules = load_step_rules([deleted.ticker_id])
+    deleted.delete()
+
+    # act
+    with mock.patch('finotif.notifications.evaluation.load_step_rules', return_value=rules):
+        evaluate_ticks([tick(value=4.0, property=TickerProperty.PRICE)])
+
+    # assert
+    assert [call.args[0].pk for call in mock_send.call_args_list] == [kept.pk]
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import pytest
+import time
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.urls import reverse
+from redis.exceptions import ConnectionError as RedisConnectionError
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from .. import live
+from ..models import (
+    TickerProperty,
+    NotificationType,
+    StepNotification,
+)
+
+_logger = logging.getLogger(__name__)
+
+
+def run_live_events(query_string, until, publish=None):
+    """Runs the endpoint until a body containing `until` is sent, returns the sent messages"""
+    sent = []
+
+    async def _run():
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+            if until in message.get('body', b''):
+                disconnected.set()
+
+        scope = {'type': 'http', 'path': '/api/live/', 'headers': [],
+                 'query_string': query_string.encode()}
+        endpoint = asyncio.ensure_future(live.live_events(scope, receive, send))
+        while publish and not live.broadcaster._queues and not endpoint.done():
+            await asyncio.sleep(0.01)
+        if publish:
+            # may query the database, in another thread than the endpoint
+            await sync_to_async(publish, thread_sensitive=False)()
+        await asyncio.wait_for(endpoint, timeout=5)
+
+    with mock.patch('finotif.notifications.live.broadcaster', live.Broadcaster()):
+        asyncio.run(_run())
+    return sent
+
+
+@pytest.mark.django_db
+def test_publish_tick_sends_event_frame(fake_redis, tick):
+    price_tick = tick(value=3.5, property=TickerProperty.PRICE)
+    pubsub = fake_redis.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(live.tick_channel(price_tick.ticker_id))
+
+    live.publish_tick(price_tick)
+
+    pubsub.get_message(timeout=1)  # the subscribe message
+    message = pubsub.get_message(timeout=1)
+    assert message['data'].startswith(b'event: tick\ndata: {"id": ')
+    assert message['data'].endswith(b'\n\n')
+
+
+@pytest.mark.django_db
+def test_publish_failure_is_logged(tick, caplog):
+    price_tick = tick(value=3.5, property=TickerProperty.PRICE)
+
+    with mock.patch('finotif.notifications.connections.redis_connection') as redis:
+        redis.return_value.publish.side_effect = RedisConnectionError('Connection refused')
+        live.publish_tick(price_tick)
+
+    assert 'Cannot publish tick' in caplog.text
+
+
+def test_live_events_require_token(fake_redis):
+    sent = run_live_events('ticket=invalid', until=b'detail')
+
+    assert sent[0]['status'] == 401
+
+
+@pytest.mark.django_db
+def test_live_events_ignore_token_in_query(fake_redis, user):
+    token = AccessToken.for_user(user.get())
+
+    sent = run_live_events(f'token={token}', until=b'detail')
+
+    assert sent[0]['status'] == 401
+
+
+@pytest.mark.django_db
+def test_live_ticket_expires(fake_redis, user, settings):
+    # arrange
+    owner = user.get()
+    client = APIClient()
+    client.force_authenticate(owner)
+    response = client.post(reverse('liveticket-list'))
+    settings.LIVE_EVENTS_TICKET_MAX_AGE = -1
+
+    # act
+    sent = run_live_events(f'ticket={response.data["ticket"]}', until=b'detail')
+
+    # assert
+    assert response.status_code == 200
+    assert sent[0]['status'] == 401
+
+
+# the endpoint queries the database from another thread, so the data has to be committed
+@pytest.mark.django_db(transaction=True, serialized_rollback=True)
+def test_live_events_stream_ticks_of_user_tickers(fake_redis, step_notification, tick):
+    # arrange
+    notification = step_notification(
+        change=0.5,
+        property=TickerProperty.PRICE,
+        type=NotificationType.EMAIL,
+    )
+    price_tick = tick(value=3.5, property=TickerProperty.PRICE)
+
+    # act
+    sent = run_live_events(
+        f'ticket={live.ticket(notification.user)}',
+        until=b'event: tick',
+        publish=lambda: live.publish_tick(price_tick)
+    )
+
+    # assert
+    assert sent[0]['status'] == 200
+    assert (b'content-type', b'text/event-stream') in sent[0]['headers']
+    assert sent[-1]['body'].startswith(b'event: tick\ndata: ')
+    assert not live.broadcaster._queues
+
+
+@pytest.mark.django_db(transaction=True, serialized_rollback=True)
+def test_live_events_stream_ticks_of_tickers_added_later(fake_redis, settings, user, tick):
+    # arrange (the user tracks no ticker when connecting)
+    owner = user.get()
+    price_tick = tick(value=3.5, property=TickerProperty.PRICE)
+    settings.LIVE_EVENTS = True
+
+    def track_and_publish():
+        StepNotification.objects.create(
+            user=owner,
+            ticker=price_tick.ticker,
+            property=TickerProperty.PRICE,
+            type=NotificationType.EMAIL,
+            change=0.5,
+        )
+        deadline = time.monotonic() + 5
+        while live.tick_channel(price_tick.ticker_id) not in live.broadcaster._queues:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        live.publish_tick(price_tick)
+
+    # act
+    sent = run_live_events(f'ticket={live.ticket(owner)}', until=b'event: tick', publish=track_and_publish)
+
+    # assert
+    bodies = [message.get('body', b'') for message in sent[1:]]
+    assert bodies[-1].startswith(b'event: tick\ndata: ')
+    assert not any(body.startswith(b'event: subscriptions') for body in bodies)
+    assert not live.broadcaster._queues
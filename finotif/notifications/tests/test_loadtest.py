@@ -0,0 +1,72 @@
+import logging
+import pytest
+from django.core.management import call_command
+from ..loadtest import (
+    MIX,
+    LoadTestFailed,
+    seed,
+    run_load,
+    query_counts,
+    percentile,
+)
+from ..models import (
+    User,
+    Note,
+    StepNotification,
+)
+
+_logger = logging.getLogger(__name__)
+
+
+def test_percentile():
+    values = sorted(float(value) for value in range(1, 101))
+
+    assert [percentile(values, p) for p in (50, 95, 99, 100)] == [50, 95, 99, 100]
+    assert percentile([], 50) == 0
+
+
+@pytest.mark.django_db
+def test_seed_command_replaces_the_seeded_data():
+    call_command('seed_load_test', users=3, tickers=5, notifications=4, notes=2)
+    call_command('seed_load_test', users=2, tickers=5, notifications=4, notes=2)
+
+    assert User.objects.filter(username__startswith='load_user_').count() == 2
+    assert StepNotification.objects.filter(user__username__startswith='load_user_').count() == 8
+    assert Note.objects.filter(user__username__startswith='load_user_').count() == 4
+
+    call_command('seed_load_test', clear=True)
+
+    assert not User.objects.filter(username__startswith='load_user_').exists()
+
+
+@pytest.mark.django_db
+def test_query_counts_do_not_keep_the_created_note():
+    usernames = seed(users=1, tickers=3, notifications=5, notes=3)
+
+    counts = query_counts(usernames[0])
+
+    assert set(counts) == {endpoint.name for endpoint in MIX}
+    assert all(count > 0 for count in counts.values())
+    assert Note.objects.filter(user__username=usernames[0]).count() == 3
+
+
+@pytest.mark.django_db(transaction=True, serialized_rollback=True)
+def test_run_load_against_live_server(live_server):
+    usernames = seed(users=2, tickers=3, notifications=5, notes=3)
+
+    results = run_load(live_server.url, usernames, duration=1, concurrency=2)
+
+    assert sum(result.requests for result in results) > 0
+    assert sum(result.errors for result in results) == 0
+    assert all(result.p50 <= result.p95 <= result.p99 for result in results)
+
+
+@pytest.mark.django_db(transaction=True, serialized_rollback=True)
+def test_run_load_raises_failures_of_virtual_users(live_server):
+    usernames = seed(users=2, tickers=3, notifications=5, notes=3)
+
+    with pytest.raises(LoadTestFailed) as raised:
+        run_load(live_server.url, usernames, duration=0.1, concurrency=2, password='wrong')
+
+    assert len(raised.value.failures) == 2
+    assert all(isinstance(failure, ValueError) for failure in raised.value.failures)
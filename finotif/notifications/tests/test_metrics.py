@@ -0,0 +1,86 @@
+import logging
+import pytest
+from types import SimpleNamespace
+from prometheus_client import REGISTRY
+from ..benchmarks import (
+    seed,
+    offline_pipeline,
+)
+from .. import (
+    metrics,
+    tasks,
+)
+
+_logger = logging.getLogger(__name__)
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint(client, fake_redis):
+    # arrange
+    fake_redis.rpush('celery', 'message', 'message')
+
+    # act
+    response = client.get('/api/metrics')
+
+    # assert
+    assert response.status_code == 200
+    content = response.content.decode()
+    assert 'finotif_poll_cycle_seconds_bucket' in content
+    assert 'finotif_queue_length{queue="celery"} 2.0' in content
+
+
+@pytest.mark.django_db
+def test_poll_cycle_metrics():
+    # arrange
+    seed(tickers=3, notifications=30)
+    cycles = sample('finotif_poll_cycle_seconds_count')
+    requests = sample('finotif_provider_request_seconds_count', provider='SteppingTickerProvider')
+    ticks = sample('finotif_ticks_saved_total')
+    evaluations = sample('finotif_tick_evaluation_seconds_count')
+
+    # act
+    with offline_pipeline():
+        tasks.request_yahoo_api()
+        tasks.request_yahoo_api()
+
+    # assert
+    assert sample('finotif_poll_cycle_seconds_count') == cycles + 2
+    assert sample('finotif_provider_request_seconds_count', provider='SteppingTickerProvider') == requests + 6
+    # price, volume, ask, bid, ask size and bid size of every ticker
+    assert sample('finotif_ticks_saved_total') == ticks + 36
+    assert sample('finotif_tick_evaluation_seconds_count') == evaluations + 36
+    assert sample('finotif_notifications_fired_total', kind='stepnotification', type='email') > 0
+
+
+def test_delivery_latency_from_enqueue_header():
+    # arrange
+    headers = {}
+    metrics.stamp_enqueued_at(headers=headers)
+    task = SimpleNamespace(
+        name='finotif.notifications.tasks.send_email',
+        request=SimpleNamespace(enqueued_at=headers['enqueued_at'] - 2)
+    )
+    total = sample('finotif_delivery_latency_seconds_sum', task='send_email')
+    failures = sample('finotif_failures_total', stage='send_email')
+
+    # act
+    metrics.observe_delivery(sender=task, state='SUCCESS')
+    metrics.observe_delivery(sender=task, state='FAILURE')
+    metrics.count_task_failure(sender=task)
+
+    # assert
+    assert 2 <= sample('finotif_delivery_latency_seconds_sum', task='send_email') - total < 2 + 60
+    assert sample('finotif_failures_total', stage='send_email') == failures + 1
+
+
+def test_multiprocess_registry(monkeypatch, tmp_path, fake_redis):
+    monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', str(tmp_path))
+
+    registry = metrics.registry()
+
+    assert registry is not REGISTRY
+    assert registry.get_sample_value('finotif_queue_length', {'queue': 'celery'}) == 0
@@ -1,3 +1,4 @@
+import copy
 import logging
 import pytest
 from datetime import (
@@ -7,11 +8,21 @@ from datetime import (
     timezone as TimeZone,
 )
 from unittest import mock
+from django.core import mail
+from kombu.serialization import dumps
+from redis.exceptions import RedisError
 from .. import tasks
+from ..evaluation import (
+    evaluate_ticks,
+    load_step_rules,
+)
 from ..services import TickerStateDto
+from ..ratelimit import RateLimited
+from ..ticker_store import TickerStore
 from ..serializers import DisplayIntChoiceField
 from ..models import (
     Tick,
+    Ticker,
     Exchange,
     TickerProperty,
     NotificationType
@@ -162,6 +173,180 @@ def test_tasks_send_notification_send_email(
     mock_send_email.delay.assert_called_once()
 
 
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.tasks.send_email')
+def test_tasks_send_batched_ids_only(mock_send_email, settings, step_notification):
+    # arrange
+    settings.NOTIFICATION_TASK_BATCH_SIZE = 2
+    notifications = [
+        step_notification(change=0.5, property=TickerProperty.PRICE, type=NotificationType.EMAIL)
+        for _ in range(3)
+    ]
+
+    # act
+    with tasks.batched():
+        for notification in notifications:
+            tasks.send(notification)
+        mock_send_email.delay.assert_not_called()
+
+    # assert
+    ids = [notification.pk for notification in notifications]
+    assert [call.args for call in mock_send_email.delay.call_args_list] == [
+        ('stepnotification', ids[:2]),
+        ('stepnotification', ids[2:]),
+    ]
+    payload = dumps(mock_send_email.delay.call_args.args, serializer='msgpack')
+    assert payload[0] == 'application/x-msgpack'
+    assert len(payload[2]) < 32
+
+
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.tasks.send_email')
+@mock.patch('finotif.notifications.evaluation._evaluate_rolling', side_effect=ValueError('rolling'))
+def test_batched_notifications_sent_when_evaluation_raises(
+        mock_evaluate_rolling, mock_send_email, step_notification, tick
+):
+    # arrange
+    notification = step_notification(change=0.5, property=TickerProperty.PRICE, type=NotificationType.EMAIL)
+    with mock.patch('finotif.notifications.signals.evaluate_ticks'):
+        anchor = tick(value=3.5, property=TickerProperty.PRICE)
+        rise = tick(value=4.0, property=TickerProperty.PRICE)
+
+    # act (the step anchors are moved before the rolling rules raise)
+    with pytest.raises(ValueError):
+        evaluate_ticks([anchor, rise])
+
+    # assert
+    notification.refresh_from_db()
+    assert notification.last_tick_id == rise.pk
+    mock_send_email.delay.assert_called_once_with('stepnotification', [notification.pk])
+
+
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.tasks.send_email')
+def test_batched_raises_error_of_block_when_sending_fails(mock_send_email, step_notification):
+    # arrange
+    mock_send_email.delay.side_effect = OSError('broker')
+    notification = step_notification(change=0.5, property=TickerProperty.PRICE, type=NotificationType.EMAIL)
+
+    # act
+    with pytest.raises(ValueError):
+        with tasks.batched():
+            tasks.send(notification)
+            raise ValueError('evaluation')
+
+    # assert
+    mock_send_email.delay.assert_called_once_with('stepnotification', [notification.pk])
+    with pytest.raises(OSError):
+        with tasks.batched():
+            tasks.send(notification)
+
+
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.tasks.send_push')
+def test_push_not_batched(mock_send_push, step_notification):
+    # arrange
+    notifications = [
+        step_notification(change=0.5, property=TickerProperty.PRICE, type=NotificationType.PUSH)
+        for _ in range(2)
+    ]
+
+    # act
+    with tasks.batched():
+        for notification in notifications:
+            tasks.send(notification)
+        sent = mock_send_push.delay.call_count
+
+    # assert
+    assert sent == 2
+
+
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.tasks.send_email')
+def test_tasks_send_once_per_anchor(mock_send_email, settings, fake_redis, step_notification):
+    # arrange
+    settings.DELIVERY_DEDUP = True
+    notification = step_notification(change=0.5, property=TickerProperty.PRICE, type=NotificationType.EMAIL)
+
+    # act (a retried cycle and a parallel evaluator fire the notification from the anchor tick 10 again)
+    tasks.send(notification, fired_from=10)
+    with tasks.batched():
+        tasks.send(notification, fired_from=10)
+        tasks.send(notification, fired_from=11)
+        tasks.send(notification, fired_from=11)
+    tasks.send(notification)
+
+    # assert
+    assert mock_send_email.delay.call_count == 3
+    assert fake_redis.ttl(tasks.delivery_key(notification, 10)) > 0
+
+
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.models.Exchange.is_open', return_value=True)
+@mock.patch('finotif.notifications.ticker_store.ticker_provider')
+@mock.patch('finotif.notifications.tasks.send_email')
+def test_same_quote_polled_twice_is_sent_once(
+        mock_send_email, mock_ticker_provider, mock_is_open, settings, fake_redis, step_notification, tick
+):
+    # arrange (an anchored notification)
+    settings.DELIVERY_DEDUP = True
+    notification = step_notification(change=0.5, property=TickerProperty.PRICE, type=NotificationType.EMAIL)
+    tick(value=3.5, property=TickerProperty.PRICE)
+    settings.TICK_EVALUATION_MODE = 'stream'
+    mock_ticker_provider.return_value.current_state.return_value = TickerStateDto(price=4.0, currency='USD')
+    anchored_rules = load_step_rules([notification.ticker_id])
+
+    # act (two pollers - an overlapping beat on another worker - save new ticks of the same quote,
+    # evaluated by two evaluators before either moved the anchor)
+    tasks.request_yahoo_api()
+    with mock.patch.object(tasks, '_store', TickerStore()):
+        tasks.request_yahoo_api()
+    polled = list(Tick.objects.filter(property=TickerProperty.PRICE, value=4.0).order_by('pk'))
+    with mock.patch('finotif.notifications.evaluation.load_step_rules',
+                    side_effect=lambda ticker_ids: copy.deepcopy(anchored_rules)):
+        for polled_tick in polled:
+            evaluate_ticks([polled_tick])
+
+    # assert
+    assert len(polled) == 2
+    mock_send_email.delay.assert_called_once_with('stepnotification', [notification.pk])
+
+
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.tasks.send_email')
+def test_tasks_send_without_redis(mock_send_email, settings, step_notification):
+    # arrange
+    settings.DELIVERY_DEDUP = True
+    notification = step_notification(change=0.5, property=TickerProperty.PRICE, type=NotificationType.EMAIL)
+
+    # act
+    with mock.patch('finotif.notifications.connections.redis_connection') as mock_redis:
+        mock_redis.return_value.pipeline.return_value.execute.side_effect = RedisError('down')
+        tasks.send(notification, fired_from=10)
+
+    # assert
+    mock_send_email.delay.assert_called_once()
+
+
+@pytest.mark.django_db
+def test_send_email_task_loads_notifications(step_notification):
+    # arrange
+    notifications = [
+        step_notification(change=0.5, property=TickerProperty.PRICE, type=NotificationType.EMAIL)
+        for _ in range(2)
+    ]
+    notifications[1].delete()
+
+    # act
+    tasks.send_email.apply(args=('stepnotification', [notifications[0].pk, 12345]))
+
+    # assert
+    notifications[0].refresh_from_db()
+    assert len(mail.outbox) == 1
+    assert mail.outbox[0].to == [notifications[0].user.email]
+    assert mail.outbox[0].subject == notifications[0].title
+
+
 @pytest.mark.django_db
 @mock.patch('finotif.notifications.models.Exchange.is_open')
 @mock.patch('finotif.notifications.services.YahooTickerProvider.current_state')
@@ -192,6 +377,101 @@ def test_save_requested_ticker_dto_state(mock_current_state, mock_is_open, tick,
     assert Tick.objects.count() == expected_ticks
 
 
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.models.Exchange.is_open', return_value=True)
+@mock.patch('finotif.notifications.services.YahooTickerProvider.current_state')
+def test_repeated_quote_is_not_saved_again(mock_current_state, mock_is_open, step_notification):
+    # arrange
+    mock_current_state.return_value = TickerStateDto(price=3.85, volume=1000, currency='USD')
+    step_notification(type=NotificationType.EMAIL, property=TickerProperty.PRICE, change=0.5)
+
+    # act
+    tasks.request_yahoo_api()
+    tasks.request_yahoo_api()
+    mock_current_state.return_value = TickerStateDto(price=3.85, volume=1200, currency='USD')
+    tasks.request_yahoo_api()
+
+    # assert
+    assert mock_current_state.call_count == 3
+    assert list(Tick.objects.order_by('pk').values_list('value', flat=True)) == [3.85, 1000, 3.85, 1200]
+
+
+@pytest.fixture
+def tracked_tickers(nasdaq, step_notification):
+    tickers = [
+        Ticker.objects.create(symbol=symbol, short_name=symbol, name=symbol, exchange=nasdaq)
+        for symbol in ('AAA', 'BBB', 'CCC')
+    ]
+    for ticker in tickers:
+        step_notification(ticker=ticker, type=NotificationType.EMAIL, property=TickerProperty.PRICE, change=1)
+    return tickers
+
+
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.models.Exchange.is_open', return_value=True)
+@mock.patch('finotif.notifications.ticker_store.ticker_provider')
+def test_overrun_poll_cycle_defers_tickers_to_next_cycle(
+        mock_ticker_provider, mock_is_open, settings, fake_redis, tracked_tickers
+):
+    # arrange
+    # a spent budget polls one ticker per cycle
+    settings.POLL_CYCLE_LOCK = True
+    settings.POLL_CYCLE_BUDGET = 0
+    polled = []
+
+    def provider(symbol):
+        # no quote
+        return mock.Mock(**{'current_state.side_effect': lambda: polled.append(symbol)})
+
+    mock_ticker_provider.side_effect = provider
+
+    # act
+    for _ in range(4):
+        tasks.request_yahoo_api()
+
+    # assert
+    assert polled == ['AAA', 'BBB', 'CCC', 'AAA']
+    # a provider per ticker, kept by the store
+    assert [call.args[0] for call in mock_ticker_provider.call_args_list] == ['AAA', 'BBB', 'CCC']
+    assert int(fake_redis.get(tasks.POLL_CURSOR_KEY)) == tracked_tickers[0].pk
+    assert not fake_redis.exists(tasks.POLL_LOCK_KEY)
+
+
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.models.Exchange.is_open', return_value=True)
+@mock.patch('finotif.notifications.ticker_store.ticker_provider')
+def test_poll_cycle_is_skipped_while_previous_holds_lock(
+        mock_ticker_provider, mock_is_open, settings, fake_redis, tracked_tickers
+):
+    # arrange
+    settings.POLL_CYCLE_LOCK = True
+    fake_redis.set(tasks.POLL_LOCK_KEY, 'previous-cycle', ex=60)
+
+    # act
+    tasks.request_yahoo_api()
+
+    # assert
+    mock_ticker_provider.assert_not_called()
+
+
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.models.Exchange.is_open', return_value=True)
+@mock.patch('finotif.notifications.ticker_store.ticker_provider')
+def test_rate_limited_poll_defers_remaining_tickers(
+        mock_ticker_provider, mock_is_open, settings, fake_redis, tracked_tickers
+):
+    # arrange
+    settings.POLL_CYCLE_LOCK = True
+    mock_ticker_provider.return_value.current_state.side_effect = [None, RateLimited('provider', 1)]
+
+    # act
+    tasks.request_yahoo_api()
+
+    # assert
+    assert mock_ticker_provider.call_count == 2
+    assert int(fake_redis.get(tasks.POLL_CURSOR_KEY)) == tracked_tickers[0].pk
+
+
 @pytest.mark.parametrize(
     ['opens_at', 'closes_at', 'current_time', 'is_open'],
     [
@@ -0,0 +1,97 @@
+import logging
+import pytest
+from django.core.management import call_command
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from ..profiling import (
+    signature,
+    connect_task_profiling,
+    disconnect_task_profiling,
+)
+from .. import tasks
+
+_logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def profiling(settings, tmp_path):
+    settings.PROFILING_ENABLED = True
+    settings.PROFILING_DIR = str(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.mark.django_db
+def test_profiling_disabled(client):
+    response = client.get(reverse('ticker-list'), {'profile': 'stats'}, HTTP_X_PROFILE=signature())
+
+    assert 'X-Profile-Stats' not in response
+
+
+@pytest.mark.django_db
+def test_staff_user_gets_stats(profiling, client, user):
+    # arrange
+    staff = user.get()
+    staff.is_staff = True
+    staff.save()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(staff)}')
+
+    # act
+    response = client.get(reverse('ticker-list'), {'profile': 'stats'})
+
+    # assert
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'text/plain'
+    assert 'function calls' in response.content.decode()
+    assert (profiling / response['X-Profile-Stats']).exists()
+
+
+@pytest.mark.django_db
+def test_profile_is_stored_for_signed_header(profiling, client):
+    response = client.get(reverse('ticker-list'), HTTP_X_PROFILE=signature())
+
+    assert response.status_code == 401
+    assert response['X-Profile-Stats'].startswith('requests/api_ticker')
+    assert list((profiling / 'requests').glob('*/*.prof'))
+
+
+@pytest.mark.django_db
+def test_not_profiled_without_permission(profiling, client, user):
+    # arrange
+    regular = user.get()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(regular)}')
+
+    # act
+    responses = [
+        client.get(reverse('ticker-list'), {'profile': 'stats'}),
+        client.get(reverse('ticker-list'), HTTP_X_PROFILE='profile:forged'),
+    ]
+
+    # assert
+    assert all('X-Profile-Stats' not in response for response in responses)
+    assert not (profiling / 'requests').exists()
+
+
+def test_task_profiles_per_task_name(profiling, settings, capsys):
+    # arrange
+    settings.PROFILING_TASK_SAMPLE_RATE = 1.0
+    connect_task_profiling()
+
+    # act
+    try:
+        tasks.send_push.apply(args=('stepnotification', []))
+        tasks.send_push.apply(args=('stepnotification', []))
+    finally:
+        disconnect_task_profiling()
+    call_command('profiles')
+    call_command('profiles', 'tasks/finotif.notifications.tasks.send_push', limit=5)
+
+    # assert
+    output = capsys.readouterr().out
+    assert 'tasks/finotif.notifications.tasks.send_push (2)' in output
+    assert 'function calls' in output
@@ -0,0 +1,302 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+import pytest
+import requests
+from unittest import mock
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from ..providers import (
+    SyntheticTickerProvider,
+    SteppingTickerProvider,
+    ReplayFile,
+    ReplayTickerProvider,
+    replay_file,
+)
+from redis.exceptions import RedisError
+from ..services import (
+    TickerDto,
+    TickerStateDto,
+    YahooTickerProvider,
+    provider_class,
+    ticker_provider,
+)
+from ..models import (
+    Tick,
+    TickerProperty,
+    NotificationType,
+)
+from .. import tasks
+
+_logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def synthetic(settings):
+    settings.TICKER_PROVIDER = 'synthetic'
+    SyntheticTickerProvider._walks.clear()
+
+
+@pytest.fixture
+def recording(settings, tmp_path):
+    def _produce(name, content):
+        path = tmp_path / name
+        path.write_text(content)
+        settings.TICKER_PROVIDER = 'replay'
+        settings.REPLAY_PROVIDER_FILE = str(path)
+        replay_file.cache_clear()
+        return str(path)
+
+    yield _produce
+    replay_file.cache_clear()
+
+
+def test_synthetic_walk_does_not_depend_on_the_cache(synthetic):
+    provider = ticker_provider('tell').upstream
+    walked = [provider.state_at(day=1, step=step) for step in (10, 1500, 3000)]
+
+    SyntheticTickerProvider._walks.clear()
+    jumped = ticker_provider('TELL').upstream.state_at(day=1, step=3000)
+
+    assert isinstance(provider, SyntheticTickerProvider)
+    assert jumped == walked[-1]
+    assert len({state.price for state in walked}) == 3
+    assert all(state.bid < state.price < state.ask for state in walked)
+    assert ticker_provider('AAPL').upstream.state_at(day=1, step=3000) != jumped
+
+
+def test_stepping_provider_moves_every_call(synthetic):
+    SteppingTickerProvider.reset()
+    provider = SteppingTickerProvider('TELL')
+
+    states = [provider.current_state() for _ in range(3)]
+
+    assert [state.price for state in states] == [provider.state_at(day=0, step=step).price for step in (1, 2, 3)]
+    assert len({state.price for state in states}) == 3
+    assert SteppingTickerProvider('tell').current_state() == provider.state_at(day=0, step=4)
+
+
+def test_offline_provider_polled_faster_than_the_bucket(synthetic, settings, provider_cache):
+    # arrange (the production limits, a token per second)
+    settings.TICKER_PROVIDER = 'finotif.notifications.providers.SteppingTickerProvider'
+    settings.PROVIDER_RATE_LIMIT = True
+    settings.PROVIDER_RATE = 1
+    settings.PROVIDER_BURST = 1
+    settings.PROVIDER_RATE_LIMIT_WAIT = 0
+    SteppingTickerProvider.reset()
+
+    # act
+    prices = [ticker_provider('TELL').current_state().price for _ in range(5)]
+
+    # assert (neither rate limited nor cached)
+    assert len(set(prices)) == 5
+    assert not provider_cache.keys('provider:*')
+    assert not provider_cache.keys('ratelimit:*')
+
+
+def test_synthetic_seed_changes_the_walk(synthetic, settings):
+    first = ticker_provider('TELL').upstream.state_at(day=1, step=100)
+    settings.SYNTHETIC_PROVIDER_SEED = 1
+
+    assert ticker_provider('TELL').upstream.state_at(day=1, step=100).price != first.price
+
+
+@pytest.mark.parametrize('name, content', [
+    ('quotes.csv', 'symbol,price,volume,ask,bid,ask_size,bid_size,currency\n'
+                   'TELL,3.5,1000,3.51,3.49,100,200,usd\n'
+                   'AAPL,150,5000,150.1,149.9,300,400,USD\n'
+                   'TELL,3.6,1100,3.61,3.59,100,200,usd\n'),
+    ('quotes.ndjson', '\n'.join(json.dumps(quote) for quote in [
+        {'symbol': 'TELL', 'price': 3.5, 'volume': 1000, 'ask': 3.51, 'bid': 3.49,
+         'ask_size': 100, 'bid_size': 200, 'currency': 'usd'},
+        {'symbol': 'AAPL', 'price': 150, 'volume': 5000},
+        {'symbol': 'TELL', 'price': 3.6, 'volume': 1100, 'ask': 3.61, 'bid': 3.59,
+         'ask_size': 100, 'bid_size': 200, 'currency': 'usd'},
+    ])),
+])
+def test_replay_per_symbol_with_loop(recording, name, content):
+    recording(name, content)
+    provider = ticker_provider('tell').upstream
+
+    prices = [provider.current_state().price for _ in range(3)]
+
+    assert isinstance(provider, ReplayTickerProvider)
+    assert prices == [3.5, 3.6, 3.5]
+    assert provider.current_state().currency == 'USD'
+    assert ticker_provider('AAPL').info().state.price == 150
+    assert ticker_provider('MSFT').info() is None
+
+
+def test_replay_without_loop(tmp_path):
+    path = tmp_path / 'quotes.csv'
+    path.write_text('price,symbol\n1.5,TELL\n')
+    recording = ReplayFile(str(path), loop=False)
+
+    assert recording.state('TELL').price == 1.5
+    assert recording.state('TELL') is None
+
+
+@pytest.mark.parametrize('name', ['quotes.csv', 'quotes.ndjson'])
+def test_replay_empty_file(recording, name):
+    recording(name, '')
+
+    assert ticker_provider('TELL').info() is None
+    assert ticker_provider('TELL').current_state() is None
+
+
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.models.Exchange.is_open', return_value=True)
+def test_poll_with_replay_provider(mock_is_open, recording, step_notification):
+    recording('quotes.csv', 'symbol,price,volume,currency\nTELL,3.5,1000,USD\n')
+    step_notification(change=0.5, property=TickerProperty.PRICE, type=NotificationType.EMAIL)
+
+    tasks.request_yahoo_api()
+
+    assert sorted(Tick.objects.values_list('value', flat=True)) == [3.5, 1000]
+
+
+@mock.patch('requests.get', side_effect=requests.Timeout('Read timed out'))
+def test_yahoo_request_times_out(get, settings):
+    state = YahooTickerProvider('TELL').current_state()
+
+    assert state is None
+    get.assert_called_once()
+    assert get.call_args.kwargs['timeout'] == settings.PROVIDER_REQUEST_TIMEOUT
+
+
+@pytest.fixture
+def provider_cache(settings, fake_redis):
+    settings.PROVIDER_CACHE = True
+    return fake_redis
+
+
+@pytest.fixture
+def upstream():
+    with mock.patch('finotif.notifications.services.YahooTickerProvider._request_data_ticker') as request:
+        request.return_value = TickerDto(
+            symbol='TELL',
+            name='Tellurian Inc.',
+            short_name='Tellurian',
+            exchange='NASDAQ',
+            state=TickerStateDto(price=3.5, currency='USD')
+        )
+        yield request
+
+
+def test_cache_keeps_metadata_longer_than_state(provider_cache, upstream):
+    # arrange
+    info = ticker_provider('tell').info()
+    upstream.return_value = TickerDto(symbol='TELL', name='Renamed', state=TickerStateDto(price=3.6))
+
+    # act
+    cached_state = ticker_provider('TELL').current_state()
+    provider_cache.delete('provider:YahooTickerProvider:state:TELL')
+    refreshed = ticker_provider('TELL').info()
+
+    # assert
+    assert info.state.price == cached_state.price == 3.5
+    assert refreshed.name == 'Tellurian Inc.'
+    assert refreshed.state.price == 3.6
+    assert upstream.call_count == 2
+    assert provider_cache.ttl('provider:YahooTickerProvider:info:TELL') > provider_cache.ttl(
+        'provider:YahooTickerProvider:state:TELL'
+    )
+
+
+def test_cache_keeps_missing_info_shortly(provider_cache, upstream, settings):
+    # arrange (a transient upstream failure)
+    upstream.return_value = None
+
+    # act
+    missing = ticker_provider('TELL').info()
+    cached_missing = ticker_provider('TELL').info()
+
+    # assert
+    assert missing is None and cached_missing is None
+    upstream.assert_called_once()
+    assert 0 < provider_cache.ttl('provider:YahooTickerProvider:info:TELL') <= settings.PROVIDER_MISSING_CACHE_TTL
+
+
+def test_cache_coalesces_concurrent_misses(provider_cache, upstream):
+    # arrange
+    response = upstream.return_value
+
+    def slow_request():
+        time.sleep(0.2)
+        return response
+
+    upstream.side_effect = slow_request
+    states = []
+    threads = [
+        threading.Thread(target=lambda: states.append(ticker_provider('TELL').current_state()))
+        for _ in range(5)
+    ]
+
+    # act
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # assert
+    upstream.assert_called_once()
+    assert [state.price for state in states] == [3.5] * 5
+    assert not provider_cache.exists('provider:YahooTickerProvider:state:TELL:lock')
+
+
+def test_cache_requests_upstream_when_redis_is_down(provider_cache, upstream):
+    with mock.patch.object(provider_cache, 'get', side_effect=RedisError('down')):
+        state = ticker_provider('TELL').current_state()
+
+    assert state.price == 3.5
+    upstream.assert_called_once()
+
+
+def test_provider_class_by_name_or_path(settings):
+    settings.TICKER_PROVIDERS = {**settings.TICKER_PROVIDERS, 'custom': 'finotif.notifications.providers.SteppingTickerProvider'}
+
+    assert provider_class('yahoo') is YahooTickerProvider
+    assert provider_class('synthetic') is SyntheticTickerProvider
+    assert provider_class('finotif.notifications.providers.ReplayTickerProvider') is ReplayTickerProvider
+    assert provider_class('custom') is SteppingTickerProvider
+    with pytest.raises(ImproperlyConfigured):
+        provider_class('missing')
+
+
+def test_web_process_does_not_import_yfinance():
+    code = 'import sys, django; django.setup(); import config.urls; print(sorted({"yfinance", "pandas"} & set(sys.modules)))'
+
+    output = subprocess.run([sys.executable, '-c', code], env=os.environ.copy(), capture_output=True, text=True,
+                            check=True).stdout
+
+    assert output.strip() == '[]'
+
+
+def test_import_times_command(capsys):
+    call_command('import_times', 'finotif.notifications.tasks', limit=5, top_level=True)
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].endswith('ms in total')
+    assert len(lines) == 7
+    cumulative = [float(line.split()[1]) for line in lines[2:]]
+    assert cumulative == sorted(cumulative, reverse=True)
+
+
+@pytest.mark.parametrize('stderr, message', [
+    ('import time: 1 | 1 | os\nModuleNotFoundError: No module named \'missing\'\n',
+     "The import exited with code 1: ModuleNotFoundError: No module named 'missing'"),
+    ('', 'The import exited with code -9'),
+])
+@mock.patch('finotif.notifications.management.commands.import_times.subprocess.run')
+def test_import_times_command_fails(run, stderr, message):
+    run.return_value = subprocess.CompletedProcess([], -9 if not stderr else 1, '', stderr)
+
+    with pytest.raises(CommandError) as error:
+        call_command('import_times')
+
+    assert str(error.value) == message
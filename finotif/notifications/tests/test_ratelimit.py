@@ -0,0 +1,80 @@
+import logging
+import pytest
+from unittest import mock
+from redis.exceptions import RedisError
+from ..ratelimit import (
+    RateLimited,
+    TokenBucket,
+)
+from ..services import ticker_provider
+
+_logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def clock():
+    # the clock of the fake Redis server, read by the script
+    with mock.patch('fakeredis.commands_mixins.server_mixin.time.time', return_value=1000.0) as now:
+        yield now
+
+
+def test_bucket_allows_burst_then_refills_at_rate(fake_redis, clock):
+    # arrange
+    bucket = TokenBucket('test', rate=2, burst=3)
+
+    # act
+    burst = [bucket.take() for _ in range(4)]
+    clock.return_value += 0.5
+    refilled = [bucket.take(), bucket.take()]
+
+    # assert
+    assert burst[:3] == [0, 0, 0]
+    assert burst[3] == pytest.approx(0.5)
+    assert refilled[0] == 0
+    assert refilled[1] == pytest.approx(0.5)
+
+
+def test_bucket_is_shared_by_instances(fake_redis, clock):
+    first = TokenBucket('test', rate=1, burst=1)
+    second = TokenBucket('test', rate=1, burst=1)
+
+    assert first.take() == 0
+    assert second.take() == pytest.approx(1)
+
+
+def test_acquire_defers_instead_of_waiting_past_timeout(fake_redis, clock):
+    # arrange
+    bucket = TokenBucket('test', rate=0.1, burst=1)
+    bucket.acquire(timeout=0)
+
+    # act
+    with pytest.raises(RateLimited) as raised:
+        bucket.acquire(timeout=1)
+
+    # assert
+    assert raised.value.retry_after == pytest.approx(10)
+
+
+def test_acquire_lets_request_through_without_redis(fake_redis):
+    bucket = TokenBucket('test', rate=1, burst=1)
+
+    with mock.patch.object(fake_redis, 'eval', side_effect=RedisError('down')):
+        bucket.acquire(timeout=0)
+
+
+@mock.patch('finotif.notifications.services.YahooTickerProvider._request_data_ticker', return_value=None)
+def test_provider_requests_take_tokens(mock_request, settings, fake_redis, clock):
+    # arrange
+    settings.PROVIDER_RATE_LIMIT = True
+    settings.PROVIDER_RATE = 1
+    settings.PROVIDER_BURST = 2
+    settings.PROVIDER_RATE_LIMIT_WAIT = 0
+
+    # act
+    for _ in range(2):
+        ticker_provider('TELL').current_state()
+    with pytest.raises(RateLimited):
+        ticker_provider('AAPL').current_state()
+
+    # assert
+    assert mock_request.call_count == 2
@@ -0,0 +1,140 @@
+import io
+import logging
+from datetime import (
+    datetime as DateTime,
+    timezone as TimeZone,
+)
+from decimal import Decimal
+from unittest import mock
+import numpy as np
+import pytest
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from ..models import (
+    Ticker,
+    TickerProperty,
+    NotificationType,
+)
+from .. import renderers
+from ..renderers import (
+    ORJSONRenderer,
+    ORJSONParser,
+)
+from ..serializers import (
+    TickerSerializer,
+    StepNotificationSerializer,
+)
+
+_logger = logging.getLogger(__name__)
+
+DESCRIPTION = 'Tellurian Inc. – a natural gas company – ' * 200 + 'line separator  ünïcödé "quoted" \\ \x1f'
+
+
+@pytest.fixture
+def context():
+    return {'request': APIRequestFactory().get('/api/ticker/')}
+
+
+@pytest.fixture
+def tickers(nasdaq):
+    return Ticker.objects.bulk_create([
+        Ticker(symbol=f'T{i:03}', short_name=f'T{i:03}', name=f'Ticker {i}', description=DESCRIPTION, exchange=nasdaq)
+        for i in range(100)
+    ])
+
+
+@pytest.mark.django_db
+def test_same_output_as_stock_renderer(context, step_notification):
+    # arrange
+    notification = step_notification(change=0.25, property=TickerProperty.ASK_SIZE, type=NotificationType.PUSH)
+    data = {
+        'notification': StepNotificationSerializer(notification, context=context).data,
+        'floats': [0.1, 3.5, 0.30000000000000004, 1200000.0, 123456789012.5, -0.0, 1e-05, 2.5e+20],
+        'datetime': DateTime(2022, 1, 3, 14, 30, 15, 123456, tzinfo=TimeZone.utc),
+        'decimal': Decimal('1.10'),
+        'lazy': gettext_lazy('PRICE'),
+        'numpy': [np.float64(1.5), np.int64(3), np.arange(3)],
+        'keys': {1: 'int key', None: 'none key'},
+        'text': DESCRIPTION,
+    }
+
+    # act
+    fast = ORJSONRenderer().render(data)
+    stock = JSONRenderer().render(data)
+
+    # assert
+    assert fast == stock
+
+
+def test_falls_back_for_values_orjson_rejects():
+    data = {'big': 2 ** 70, 'nested': [{'small': 1e-07}], 'decimal': Decimal('1E-7')}
+
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+def test_non_finite_float_raises_as_stock_renderer():
+    with pytest.raises(ValueError):
+        ORJSONRenderer().render({'change': float('nan')})
+
+
+def test_indented_output_as_stock_renderer():
+    data = {'a': [1, {'b': 2.5}]}
+    media_type = 'application/json; indent=4'
+
+    assert ORJSONRenderer().render(data, media_type) == JSONRenderer().render(data, media_type)
+
+
+@pytest.mark.parametrize('body', [
+    b'{"title": "N\\u00f6te", "change": 0.5, "is_active": true, "window": null}',
+    b'[1, 2.5, 1e-07, 12345678901234567890123]',
+    '{"content": "ünïcödé – text"}'.encode(),
+])
+def test_same_data_as_stock_parser(body):
+    assert ORJSONParser().parse(io.BytesIO(body)) == JSONParser().parse(io.BytesIO(body))
+
+
+@pytest.mark.parametrize('body', [b'{"title": ', b'{"change": NaN}', b''])
+def test_same_errors_as_stock_parser(body):
+    with pytest.raises(ParseError) as fast:
+        ORJSONParser().parse(io.BytesIO(body))
+    with pytest.raises(ParseError) as stock:
+        JSONParser().parse(io.BytesIO(body))
+
+    assert str(fast.value) == str(stock.value)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('renderer_class', [JSONRenderer, ORJSONRenderer])
+def test_benchmark_renderer(benchmark, renderer_class, context, tickers):
+    data = TickerSerializer(tickers, many=True, context=context).data
+    renderer = renderer_class()
+    benchmark.group = 'renderer: 100 tickers with long descriptions'
+
+    rendered = benchmark(renderer.render, data)
+
+    assert rendered == JSONRenderer().render(data)
+
+
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.renderers._divergent', wraps=renderers._divergent)
+def test_fast_path_does_not_walk_the_data(divergent, context, tickers):
+    # arrange
+    data = TickerSerializer(tickers, many=True, context=context).data
+
+    # act
+    rendered = ORJSONRenderer().render(data)
+
+    # assert
+    assert rendered == JSONRenderer().render(data)
+    divergent.assert_not_called()
+
+
+@mock.patch('finotif.notifications.renderers._divergent', wraps=renderers._divergent)
+def test_walks_the_data_only_for_suspect_output(divergent):
+    data = {'window': None, 'floats': [0.5, 1e-05]}
+
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+    divergent.assert_called()
@@ -0,0 +1,135 @@
+import logging
+import pytest
+from unittest import mock
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from ..db_routers import ReplicaRouter
+from ..models import (
+    Note,
+    TickerProperty,
+    NotificationType,
+)
+from ..representations import version_key
+
+_logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def detail_cache(settings, fake_redis):
+    settings.DETAIL_CACHE = True
+    return fake_redis
+
+
+@pytest.fixture
+def notification(step_notification):
+    return step_notification(change=0.5, property=TickerProperty.PRICE, type=NotificationType.EMAIL)
+
+
+def get(client, url):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert response.status_code == 200
+    return response.json(), len(queries)
+
+
+@pytest.mark.django_db
+def test_ticker_detail_is_cached_until_note_is_added(detail_cache, notification, default_ticker):
+    # arrange
+    client = APIClient()
+    client.force_authenticate(notification.user)
+    url = reverse('ticker-detail', kwargs={'pk': default_ticker.pk})
+
+    # act
+    first, first_queries = get(client, url)
+    cached, cached_queries = get(client, url)
+    Note.objects.create(title='Note', content='Content', ticker=default_ticker, user=notification.user)
+    refreshed, _ = get(client, url)
+
+    # assert
+    assert cached == first
+    assert cached_queries < first_queries
+    assert first['notes'] == []
+    assert len(refreshed['notes']) == 1
+    assert detail_cache.exists(version_key('ticker', default_ticker.pk))
+
+
+@pytest.mark.django_db
+def test_notification_detail_is_invalidated_on_save(detail_cache, notification):
+    # arrange
+    client = APIClient()
+    client.force_authenticate(notification.user)
+    url = reverse('stepnotification-detail', kwargs={'pk': notification.pk})
+    get(client, url)
+
+    # act
+    notification.title = 'Renamed'
+    notification.save()
+    renamed, _ = get(client, url)
+
+    # assert
+    assert renamed['title'] == 'Renamed'
+
+
+@pytest.mark.django_db
+def test_cached_detail_is_not_served_to_other_users(detail_cache, notification, user):
+    # arrange
+    client = APIClient()
+    client.force_authenticate(notification.user)
+    url = reverse('stepnotification-detail', kwargs={'pk': notification.pk})
+    get(client, url)
+
+    # act
+    client.force_authenticate(user.get())
+    response = client.get(url)
+
+    # assert
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.tasks.send')
+def test_notification_detail_is_invalidated_by_moved_anchor(mock_send, detail_cache, notification, tick):
+    # arrange
+    client = APIClient()
+    client.force_authenticate(notification.user)
+    url = reverse('stepnotification-detail', kwargs={'pk': notification.pk})
+    tick(value=3.5, property=TickerProperty.PRICE)
+    cached, _ = get(client, url)
+
+    # act (the vectorized evaluator moves the anchor by a bulk update)
+    tick(value=4.0, property=TickerProperty.PRICE)
+    refreshed, _ = get(client, url)
+
+    # assert
+    notification.refresh_from_db()
+    assert refreshed['modified_at'] != cached['modified_at']
+    assert refreshed['modified_at'] == notification.modified_at.isoformat().replace('+00:00', 'Z')
+
+
+@pytest.mark.django_db
+def test_missed_detail_is_read_from_primary(detail_cache, settings, notification):
+    # arrange (the default alias stands in for the replica)
+    settings.REPLICA_DATABASE = 'default'
+    client = APIClient()
+    client.force_authenticate(notification.user)
+    url = reverse('stepnotification-detail', kwargs={'pk': notification.pk})
+    aliases = []
+    db_for_read = ReplicaRouter.db_for_read
+
+    def spy(self, model, **hints):
+        alias = db_for_read(self, model, **hints)
+        aliases.append((model.__name__, alias))
+        return alias
+
+    # act
+    with mock.patch.object(ReplicaRouter, 'db_for_read', spy):
+        get(client, url)
+        missed = list(aliases)
+        aliases.clear()
+        get(client, url)
+
+    # assert (the cache is filled from the primary, the hit checks the access on the replica)
+    assert ('StepNotification', None) in missed
+    assert aliases == [('StepNotification', 'default')]
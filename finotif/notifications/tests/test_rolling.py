@@ -0,0 +1,178 @@
+import logging
+import pytest
+from datetime import (
+    datetime as DateTime,
+    timedelta as TimeDelta,
+    timezone as TimeZone,
+)
+from unittest import mock
+from ..rolling import (
+    PeriodWindow,
+    TimeWindow,
+    RollingStatistics,
+)
+from django.core.exceptions import ValidationError
+from ..models import (
+    Ticker,
+    RollingNotification,
+    TickerProperty,
+    NotificationType,
+    RollingRule,
+)
+
+_logger = logging.getLogger(__name__)
+
+SOME_TIME = DateTime(year=2021, month=11, day=1, hour=15, minute=30, tzinfo=TimeZone.utc)
+
+
+def test_period_window_moving_average():
+    window = PeriodWindow(periods=3)
+    values = [1.0, 2.0, 3.0, 4.0, 8.0, 0.5, 0.1]
+    means = []
+    for value in values:
+        window.push(value, SOME_TIME)
+        means.append(window.mean)
+
+    expected = [None, None] + [sum(values[i - 2:i + 1]) / 3 for i in range(2, len(values))]
+    assert means == pytest.approx(expected)
+    assert window.previous_mean == pytest.approx(expected[-2])
+
+
+def test_time_window_percent_change_needs_full_window():
+    window = TimeWindow(minutes=10)
+
+    window.push(100, SOME_TIME)
+    window.push(104, SOME_TIME + TimeDelta(minutes=5))
+    assert window.change is None
+
+    window.push(110, SOME_TIME + TimeDelta(minutes=10))
+    assert window.change == pytest.approx(10)
+
+    # the reference moves to the value from 10 minutes ago
+    window.push(114.4, SOME_TIME + TimeDelta(minutes=15))
+    assert window.change == pytest.approx(10)
+    assert window.previous_change == pytest.approx(10)
+
+
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.tasks.send')
+def test_level_cross_sends_once_per_cross(mock_send, rolling_notification, tick):
+    # arrange
+    rolling_notification(
+        property=TickerProperty.PRICE,
+        type=NotificationType.EMAIL,
+        rule=RollingRule.LEVEL_CROSS,
+        threshold=4.0
+    )
+
+    # act (crosses up, stays above, crosses down)
+    for value in (3.5, 3.9, 4.1, 4.5, 4.2, 3.8, 3.7):
+        tick(value=value, property=TickerProperty.PRICE)
+
+    # assert
+    assert mock_send.call_count == 2
+
+
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.tasks.send')
+def test_moving_average_cross(mock_send, rolling_notification, tick):
+    # arrange
+    rolling_notification(
+        property=TickerProperty.PRICE,
+        type=NotificationType.EMAIL,
+        rule=RollingRule.MOVING_AVERAGE_CROSS,
+        window=3
+    )
+
+    # act (falls below the average, then jumps above it)
+    for value in (5.0, 6.0, 7.0, 4.0, 3.5, 3.0, 6.0):
+        tick(value=value, property=TickerProperty.PRICE)
+
+    # assert
+    assert mock_send.call_count == 2
+
+
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.tasks.send')
+def test_rolling_state_warms_up_and_catches_up_from_history(
+        mock_send,
+        settings,
+        rolling_notification,
+        tick
+):
+    # arrange (ticks saved before the state existed or by another process)
+    settings.TICK_EVALUATION_MODE = 'stream'
+    history = [tick(value=value, property=TickerProperty.PRICE) for value in (1, 2, 3, 4)]
+    statistics = RollingStatistics()
+    key = (history[0].ticker_id, TickerProperty.PRICE)
+
+    # act
+    state = statistics.state(key, {('periods', 2)}, before=history[2])
+    warmed_up_mean = state.windows[('periods', 2)].mean
+    state = statistics.state(key, {('periods', 2)}, before=history[3])
+
+    # assert
+    assert warmed_up_mean == pytest.approx(1.5)
+    assert state.windows[('periods', 2)].mean == pytest.approx(2.5)
+    assert state.last_tick_id == history[2].pk
+
+
+@pytest.mark.django_db
+def test_tracked_tickers_include_rolling_notifications(rolling_notification, default_ticker):
+    rolling_notification(
+        property=TickerProperty.PRICE,
+        type=NotificationType.EMAIL,
+        rule=RollingRule.LEVEL_CROSS,
+        threshold=4.0
+    )
+
+    assert list(Ticker.tracked()) == [default_ticker]
+
+
+def test_validate_rule_bounds_window(settings):
+    RollingNotification.validate_rule(RollingRule.PERCENT_CHANGE, 5.0, settings.ROLLING_MAX_WINDOW)
+
+    with pytest.raises(ValidationError):
+        RollingNotification.validate_rule(RollingRule.PERCENT_CHANGE, 5.0, 2_000_000_000)
+    with pytest.raises(ValidationError):
+        RollingNotification.validate_rule(RollingRule.MOVING_AVERAGE_CROSS, None, settings.ROLLING_MAX_WINDOW + 1)
+
+
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.tasks.send')
+def test_window_saved_before_the_bound_is_skipped(mock_send, settings, rolling_notification, tick):
+    # arrange
+    rolling_notification(
+        property=TickerProperty.PRICE,
+        type=NotificationType.EMAIL,
+        rule=RollingRule.PERCENT_CHANGE,
+        threshold=1.0,
+        window=2_000_000_000
+    )
+
+    # act
+    for value in (3.5, 4.5):
+        tick(value=value, property=TickerProperty.PRICE)
+
+    # assert
+    mock_send.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_rolling_statistics_drop_least_recently_used_state(settings, tick):
+    # arrange
+    settings.ROLLING_MAX_STATES = 2
+    before = tick(value=1.0, property=TickerProperty.PRICE)
+    statistics = RollingStatistics()
+    keys = [(before.ticker_id, property) for property in (TickerProperty.PRICE, TickerProperty.ASK, TickerProperty.BID)]
+
+    # act (the first state is used again, so the second one is dropped)
+    first = statistics.state(keys[0], {('periods', 2)}, before=before)
+    second = statistics.state(keys[1], {('periods', 2)}, before=before)
+    assert statistics.state(keys[0], {('periods', 2)}, before=before) is first
+    statistics.state(keys[2], {('periods', 2)}, before=before)
+
+    # assert
+    assert len(statistics) == 2
+    assert statistics.state(keys[0], {('periods', 2)}, before=before) is first
+    assert statistics.state(keys[1], {('periods', 2)}, before=before) is not second
@@ -0,0 +1,126 @@
+import logging
+import pytest
+from rest_framework.request import Request
+from rest_framework.test import (
+    APIClient,
+    APIRequestFactory,
+)
+from ..models import (
+    Note,
+    Ticker,
+    StepNotification,
+    RollingNotification,
+    TickerProperty,
+    NotificationType,
+    RollingRule,
+)
+from ..rows import (
+    TickerRowSerializer,
+    StepNotificationRowSerializer,
+    RollingNotificationRowSerializer,
+)
+from ..serializers import (
+    TickerSerializer,
+    StepNotificationSerializer,
+    RollingNotificationSerializer,
+)
+
+_logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def request_():
+    return Request(APIRequestFactory().get('/api/ticker/'))
+
+
+@pytest.fixture
+def notifications(step_notification, rolling_notification, default_ticker, nasdaq):
+    other = Ticker.objects.create(symbol='OTHR', short_name='Other', name='Other Inc.', description='Other',
+                                  exchange=nasdaq)
+    step = [
+        step_notification(change=0.5, property=TickerProperty.PRICE, type=NotificationType.EMAIL),
+        step_notification(change=3, property=TickerProperty.ASK_SIZE, type=NotificationType.PUSH, ticker=other),
+    ]
+    rolling = [
+        rolling_notification(property=TickerProperty.PRICE, type=NotificationType.EMAIL,
+                             rule=RollingRule.PERCENT_CHANGE, threshold=2.5, window=15),
+        rolling_notification(property=TickerProperty.BID, type=NotificationType.PUSH,
+                             rule=RollingRule.MOVING_AVERAGE_CROSS, window=20, ticker=other),
+    ]
+    user = step[0].user
+    for ticker in (default_ticker, default_ticker, other):
+        Note.objects.create(title='Note', content='Content', ticker=ticker, user=user)
+    return user
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('model, row_serializer_class, serializer_class', [
+    (Ticker, TickerRowSerializer, TickerSerializer),
+    (StepNotification, StepNotificationRowSerializer, StepNotificationSerializer),
+    (RollingNotification, RollingNotificationRowSerializer, RollingNotificationSerializer),
+])
+def test_same_representation_as_serializer(notifications, request_, model, row_serializer_class,
+                                           serializer_class):
+    # arrange
+    queryset = model.objects.all()
+    row_serializer = row_serializer_class(request_)
+
+    # act
+    fast = row_serializer.to_representation(row_serializer.rows(queryset))
+    stock = serializer_class(queryset, many=True, context={'request': request_}).data
+
+    # assert
+    assert len(fast) == 2
+    assert fast == stock
+
+
+@pytest.mark.django_db
+def test_format_suffix_in_urls(notifications, request_):
+    # arrange
+    queryset = Ticker.objects.all()
+
+    # act
+    row_serializer = TickerRowSerializer(request_, 'json')
+    fast = row_serializer.to_representation(row_serializer.rows(queryset))
+    stock = TickerSerializer(queryset, many=True, context={'request': request_, 'format': 'json'}).data
+
+    # assert
+    assert fast[0]['url'].endswith('.json')
+    assert fast == stock
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url', ['/api/rollingNotification/', '/api/rollingNotification.json'])
+def test_list_endpoint_as_serializer(notifications, url):
+    # arrange
+    client = APIClient()
+    client.force_authenticate(notifications)
+
+    # act
+    response = client.get(url)
+
+    # assert
+    assert response.status_code == 200
+    request_ = response.wsgi_request
+    stock = RollingNotificationSerializer(
+        RollingNotification.objects.filter(user=notifications), many=True,
+        context={'request': request_, 'format': 'json' if url.endswith('.json') else None}
+    ).data
+    assert response.json()['results'] == stock
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('fast', [False, True])
+def test_benchmark_notification_page(benchmark, fast, step_notification, request_):
+    for i in range(100):
+        step_notification(change=i + 1, property=TickerProperty.PRICE, type=NotificationType.EMAIL)
+    queryset = StepNotification.objects.all()
+    benchmark.group = 'list serialization: 100 step notifications'
+
+    if fast:
+        row_serializer = StepNotificationRowSerializer(request_)
+        data = benchmark(lambda: row_serializer.to_representation(row_serializer.rows(queryset)))
+    else:
+        data = benchmark(lambda: StepNotificationSerializer(queryset, many=True, context={'request': request_}).data)
+
+    assert len(data) == 100
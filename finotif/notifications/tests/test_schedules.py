@@ -0,0 +1,132 @@
+import logging
+import pickle
+import pytest
+from datetime import (
+    datetime as DateTime,
+    time as Time,
+    timedelta as TimeDelta,
+    timezone as TimeZone,
+)
+from unittest import mock
+from django.db import (
+    DatabaseError,
+    connection,
+)
+from django.test.utils import CaptureQueriesContext
+from ..models import (
+    Exchange,
+    Ticker,
+    TickerProperty,
+    NotificationType,
+)
+from ..schedules import (
+    SESSION_RETRY,
+    market_hours,
+    market_session,
+    next_transition,
+)
+
+_logger = logging.getLogger(__name__)
+
+# NASDAQ 14:30 - 21:00, WSE 08:00 - 16:00 in the UTC
+FRIDAY_EVENING = DateTime(2021, 11, 5, 22, 0, tzinfo=TimeZone.utc)
+MONDAY_WSE_OPENING = DateTime(2021, 11, 8, 8, 0, tzinfo=TimeZone.utc)
+MONDAY_AFTERNOON = DateTime(2021, 11, 8, 15, 0, tzinfo=TimeZone.utc)
+
+
+@pytest.fixture(autouse=True)
+def close_old_connections():
+    # would close the connection of the test's transaction, as the test client disconnects it from the requests
+    with mock.patch('finotif.notifications.schedules.close_old_connections') as close:
+        yield close
+
+
+@pytest.fixture
+def wse():
+    return Exchange.objects.create(name='WSE', description='Warsaw', mic='XWAR',
+                                   opens_at=Time(8, 0), closes_at=Time(16, 0))
+
+
+@pytest.fixture
+def nasdaq_tracked(nasdaq, step_notification):
+    ticker = Ticker.objects.create(symbol='AAA', short_name='AAA', name='AAA', exchange=nasdaq)
+    step_notification(ticker=ticker, type=NotificationType.EMAIL, property=TickerProperty.PRICE, change=1)
+    return ticker
+
+
+def test_next_transition_of_any_exchange():
+    nasdaq = Exchange(opens_at=Time(14, 30), closes_at=Time(21, 0))
+    wse = Exchange(opens_at=Time(8, 0), closes_at=Time(16, 0))
+    now = DateTime(2021, 11, 8, 15, 0)
+
+    assert next_transition([nasdaq, wse], now) == DateTime(2021, 11, 8, 16, 0, 1)
+    assert next_transition([nasdaq], now) == DateTime(2021, 11, 8, 21, 0, 1)
+    assert next_transition([nasdaq, wse], DateTime(2021, 11, 6, 12, 0)) == DateTime(2021, 11, 8, 8, 0)
+    assert next_transition([], now) == now + TimeDelta(days=1)
+
+
+@pytest.mark.django_db
+def test_session_armed_only_by_exchanges_of_tracked_tickers(wse, nasdaq_tracked, settings):
+    # act
+    weekend = market_session(FRIDAY_EVENING)
+    wse_only = market_session(MONDAY_WSE_OPENING)
+    both = market_session(MONDAY_AFTERNOON)
+
+    # assert
+    assert weekend == (False, MONDAY_WSE_OPENING)
+    assert wse_only == (False, MONDAY_WSE_OPENING + TimeDelta(seconds=settings.MARKET_HOURS_REFRESH))
+    assert both == (True, MONDAY_AFTERNOON + TimeDelta(seconds=settings.MARKET_HOURS_REFRESH))
+
+
+@pytest.mark.django_db
+def test_schedule_sleeps_until_next_session_without_queries(wse, nasdaq_tracked):
+    # arrange
+    now = [FRIDAY_EVENING]
+    schedule = market_hours(run_every=60, nowfun=lambda: now[0])
+    last_run_at = FRIDAY_EVENING - TimeDelta(hours=1)
+
+    # act
+    first = schedule.is_due(last_run_at)
+    saturday = now[0] = FRIDAY_EVENING + TimeDelta(hours=12)
+    with CaptureQueriesContext(connection) as queries:
+        second = schedule.is_due(last_run_at)
+    now[0] = MONDAY_AFTERNOON
+    armed = schedule.is_due(last_run_at)
+
+    # assert
+    assert first == (False, (MONDAY_WSE_OPENING - FRIDAY_EVENING).total_seconds())
+    assert second == (False, (MONDAY_WSE_OPENING - saturday).total_seconds())
+    assert len(queries) == 0
+    assert armed == (True, 60)
+
+
+@pytest.mark.django_db
+def test_schedule_retries_failed_session_read(wse, nasdaq_tracked, close_old_connections):
+    # arrange
+    now = [MONDAY_AFTERNOON]
+    schedule = market_hours(run_every=60, nowfun=lambda: now[0])
+    last_run_at = MONDAY_AFTERNOON - TimeDelta(hours=1)
+
+    # act (the connection was closed while the beat slept)
+    with mock.patch('finotif.notifications.models.Exchange.objects') as exchanges:
+        exchanges.all.side_effect = DatabaseError('server closed the connection unexpectedly')
+        failed = schedule.is_due(last_run_at)
+        retried_early = schedule.is_due(last_run_at)
+    now[0] = MONDAY_AFTERNOON + SESSION_RETRY
+    armed = schedule.is_due(last_run_at)
+
+    # assert
+    assert failed == (False, SESSION_RETRY.total_seconds())
+    assert retried_early == failed
+    assert exchanges.all.call_count == 1
+    assert armed == (True, 60)
+    assert close_old_connections.call_count == 2
+
+
+def test_schedule_pickles():
+    schedule = market_hours(run_every=30)
+
+    restored = pickle.loads(pickle.dumps(schedule))
+
+    assert restored.run_every == TimeDelta(seconds=30)
+    assert isinstance(restored, market_hours)
@@ -0,0 +1,141 @@
+import logging
+import pytest
+from unittest import mock
+from ..streams import (
+    TickStream,
+    TickEvaluator,
+)
+from ..models import (
+    TickerProperty,
+    NotificationType,
+    RollingRule,
+)
+
+_logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def stream_mode(settings, fake_redis):
+    settings.TICK_EVALUATION_MODE = 'stream'
+    stream = TickStream()
+    stream.create_group()
+    return stream
+
+
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.tasks.send')
+def test_stream_mode_publishes_tick_on_commit(
+        mock_send,
+        stream_mode,
+        fake_redis,
+        django_capture_on_commit_callbacks,
+        step_notification,
+        tick
+):
+    # arrange
+    step_notification(
+        change=0.5,
+        property=TickerProperty.PRICE,
+        type=NotificationType.EMAIL,
+    )
+
+    # act
+    with django_capture_on_commit_callbacks(execute=True):
+        price_tick = tick(value=3.5, property=TickerProperty.PRICE)
+
+    # assert (the tick is published, but not evaluated yet)
+    messages = stream_mode.read('test', count=10)
+    assert [tick_id for _, tick_id in messages] == [price_tick.pk]
+    mock_send.assert_not_called()
+
+
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.tasks.send')
+def test_evaluator_processes_batch_in_order_and_acks(
+        mock_send,
+        stream_mode,
+        fake_redis,
+        django_capture_on_commit_callbacks,
+        step_notification,
+        tick
+):
+    # arrange
+    step_notification(
+        change=0.5,
+        property=TickerProperty.PRICE,
+        type=NotificationType.EMAIL,
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        for value in (3.5, 4.0, 4.2, 4.5):
+            tick(value=value, property=TickerProperty.PRICE)
+
+    # act
+    processed = TickEvaluator(stream_mode, consumer='test').process_batch()
+
+    # assert (the anchor moved to 4.0 before 4.5 was evaluated)
+    assert processed == 4
+    assert mock_send.call_count == 2
+    assert fake_redis.xpending(stream_mode.name, stream_mode.group)['pending'] == 0
+
+
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.tasks.send')
+def test_evaluator_claims_ticks_of_stopped_evaluator(
+        mock_send,
+        stream_mode,
+        settings,
+        django_capture_on_commit_callbacks,
+        step_notification,
+        tick
+):
+    # arrange
+    settings.TICK_STREAM_CLAIM_IDLE_TIME = 0
+    step_notification(
+        change=0.5,
+        property=TickerProperty.PRICE,
+        type=NotificationType.EMAIL,
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        tick(value=3.5, property=TickerProperty.PRICE)
+        tick(value=4.0, property=TickerProperty.PRICE)
+    # delivered to an evaluator that never acknowledged them
+    stream_mode.read('stopped', count=10)
+
+    # act
+    processed = TickEvaluator(stream_mode, consumer='test').process_batch()
+
+    # assert
+    assert processed == 2
+    mock_send.assert_called_once()
+
+
+@pytest.mark.django_db
+@mock.patch('finotif.notifications.tasks.send')
+def test_interleaved_evaluators_evaluate_older_rolling_tick(
+        mock_send,
+        stream_mode,
+        django_capture_on_commit_callbacks,
+        rolling_notification,
+        tick
+):
+    # arrange
+    rolling_notification(
+        property=TickerProperty.PRICE,
+        type=NotificationType.EMAIL,
+        rule=RollingRule.LEVEL_CROSS,
+        threshold=4.0
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        for value in (3.5, 4.5, 4.6):
+            tick(value=value, property=TickerProperty.PRICE)
+    one = TickEvaluator(stream_mode, consumer='one')
+    two = TickEvaluator(stream_mode, consumer='two')
+    crossing = stream_mode.read('one', count=2)
+    above = stream_mode.read('two', count=1)
+
+    # act (the later tick is evaluated first)
+    two.process(above)
+    one.process(crossing)
+
+    # assert
+    mock_send.assert_called_once()
@@ -0,0 +1,128 @@
+import logging
+import pytest
+from datetime import (
+    datetime as DateTime,
+    time as Time,
+    timezone as TimeZone,
+)
+import numpy as np
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from ..models import (
+    Exchange,
+    Ticker,
+    TickerProperty,
+    NotificationType,
+)
+from ..services import TickerStateDto
+from ..ticker_store import TickerStore
+
+_logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def tracked(nasdaq, step_notification):
+    def _produce(*symbols):
+        tickers = []
+        for symbol in symbols:
+            ticker = Ticker.objects.create(symbol=symbol, short_name=symbol, name=symbol, exchange=nasdaq)
+            step_notification(ticker=ticker, type=NotificationType.EMAIL, property=TickerProperty.PRICE, change=1)
+            tickers.append(ticker)
+        return tickers
+
+    return _produce
+
+
+@pytest.mark.django_db
+def test_sync_loads_only_new_tickers(tracked):
+    # arrange
+    store = TickerStore()
+    first = tracked('BBB', 'AAA')
+    store.sync()
+    store.next_due[0] = 5.0
+    provider = store.provider(0)
+    recorded = store.record(0, TickerStateDto(currency='USD', price=3.5, volume=100))
+    repeated = store.record(0, TickerStateDto(currency='USD', price=3.5, volume=100))
+
+    # act
+    second = tracked('CCC')
+    first[1].stepnotification_set.all().delete()
+    with CaptureQueriesContext(connection) as queries:
+        store.sync()
+
+    # assert
+    assert store.ids.tolist() == [first[0].pk, second[0].pk]
+    assert store.symbols.tolist() == ['BBB', 'CCC']
+    assert store.exchange_ids.tolist() == [first[0].exchange_id] * 2
+    # the tracked pks, the new row and the exchanges
+    assert len(queries) == 3
+    assert store.next_due.tolist() == [5.0, 0.0]
+    assert recorded and not repeated
+    assert store.values[0, TickerProperty.PRICE] == 3.5
+    assert store.values[0, TickerProperty.VOLUME] == 100
+    assert np.isnan(store.values[1]).all()
+    assert store.provider(0) is provider and store.providers[1] is None
+
+
+@pytest.mark.django_db
+def test_sync_keeps_columns_when_tracking_unchanged(tracked):
+    # arrange
+    store = TickerStore()
+    tracked('AAA', 'BBB')
+    store.sync()
+    columns = [store.ids, store.symbols, store.exchange_ids, store.providers, store.values, store.next_due]
+
+    # act
+    with CaptureQueriesContext(connection) as queries:
+        store.sync()
+
+    # assert
+    # the tracked pks and the exchanges
+    assert len(queries) == 2
+    assert all(after is before for after, before in zip(
+        [store.ids, store.symbols, store.exchange_ids, store.providers, store.values, store.next_due], columns
+    ))
+
+
+@pytest.mark.django_db
+def test_tickers_of_closed_exchange_due_at_opening(tracked, nasdaq):
+    # arrange
+    store = TickerStore()
+    tracked('AAA')
+    store.sync()
+    friday_evening = DateTime(2021, 11, 5, 22, 0)
+    monday_opening = DateTime.combine(DateTime(2021, 11, 8), nasdaq.opens_at).replace(tzinfo=TimeZone.utc)
+
+    monday_afternoon = DateTime(2021, 11, 8, 15, 0)
+
+    # act
+    store.defer_closed(monday_afternoon)
+    open_due = store.next_due[0]
+    store.defer_closed(friday_evening)
+
+    # assert
+    assert open_due == 0
+    assert store.next_due[0] == monday_opening.timestamp()
+    assert not store.is_due(0, monday_opening.timestamp() - 1)
+    assert store.is_due(0, monday_opening.timestamp())
+
+
+@pytest.mark.parametrize(['now', 'next_open'], [
+    (DateTime(2021, 11, 1, 8, 0), DateTime(2021, 11, 1, 14, 30)),
+    (DateTime(2021, 11, 1, 21, 0), DateTime(2021, 11, 2, 14, 30)),
+    (DateTime(2021, 11, 5, 21, 0), DateTime(2021, 11, 8, 14, 30)),
+    (DateTime(2021, 11, 6, 10, 0), DateTime(2021, 11, 8, 14, 30)),
+])
+def test_exchange_next_open(now, next_open):
+    exchange = Exchange(opens_at=Time(14, 30), closes_at=Time(21, 0))
+
+    assert exchange.next_open(now) == next_open
+
+
+def test_fair_order_starts_after_cursor():
+    store = TickerStore()
+    store.ids = np.array([1, 2, 5, 7])
+
+    assert store.ids[store.fair_order(2)].tolist() == [5, 7, 1, 2]
+    assert store.ids[store.fair_order(7)].tolist() == [1, 2, 5, 7]
+    assert store.ids[store.fair_order(None)].tolist() == [1, 2, 5, 7]
@@ -0,0 +1,123 @@
+"""Compact state of the tracked tickers, kept by a poller process across the poll cycles
+
+The store holds a column per attribute, a row per ticker in the order of the pks: the symbol,
+the exchange, the ticker's provider, the last polled values and the time the ticker is due.
+A cycle syncs it incrementally - only the pks of the tracked tickers are read, the rows of the
+newly tracked ones are loaded and the untracked ones dropped, the columns are left as they are
+when neither changed - so no model instances are built per ticker and cycle. The provider of
+a row is built by its first poll and kept. The tickers of a closed exchange are due at its next
+opening.
+
+A quote equal to the last polled one in every property - a cached or a repeated response of the
+upstream - is not a new quote, record() tells the poller not to save its ticks again.
+"""
+import logging
+from datetime import (
+    datetime,
+    timezone as TimeZone,
+)
+from typing import (
+    Dict,
+    Optional,
+)
+import numpy as np
+from .models import (
+    Exchange,
+    Ticker,
+    TickerProperty,
+)
+from .services import (
+    CachedTickerProvider,
+    TickerStateDto,
+    ticker_provider,
+)
+
+
+_logger = logging.getLogger(__name__)
+
+# The columns of the values, the fields of TickerStateDto
+PROPERTY_FIELDS = [name.lower() for name in TickerProperty.names]
+LOAD_BATCH_SIZE = 1000
+_COLUMNS = ('ids', 'symbols', 'exchange_ids', 'providers', 'values', 'next_due')
+
+
+def _timestamp(value: datetime) -> float:
+    """The naive UTC datetimes of the exchanges as seconds since the epoch"""
+    return value.replace(tzinfo=TimeZone.utc).timestamp()
+
+
+class TickerStore:
+    __slots__ = _COLUMNS + ('exchanges',)
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.symbols = np.empty(0, dtype=object)
+        self.exchange_ids = np.empty(0, dtype=np.int64)
+        # None until the first poll of the row
+        self.providers = np.empty(0, dtype=object)
+        # nan until polled
+        self.values = np.empty((0, len(PROPERTY_FIELDS)), dtype=np.float64)
+        # seconds since the epoch
+        self.next_due = np.empty(0, dtype=np.float64)
+        self.exchanges: Dict[int, Exchange] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def sync(self):
+        """Adds the newly tracked tickers and drops the ones not tracked anymore"""
+        tracked = np.fromiter(Ticker.tracked().order_by().values_list('pk', flat=True), dtype=np.int64)
+        kept = np.isin(self.ids, tracked)
+        new = np.setdiff1d(tracked, self.ids).tolist()
+        # a few rows, read again for the changed hours
+        self.exchanges = Exchange.objects.in_bulk()
+        if not new and kept.all():
+            return
+        rows = []
+        for start in range(0, len(new), LOAD_BATCH_SIZE):
+            rows.extend(Ticker.objects
+                        .filter(pk__in=new[start:start + LOAD_BATCH_SIZE])
+                        .values_list('pk', 'symbol', 'exchange_id'))
+        ids, symbols, exchange_ids = zip(*rows) if rows else ((), (), ())
+        self.ids = np.concatenate([self.ids[kept], np.array(ids, dtype=np.int64)])
+        self.symbols = np.concatenate([self.symbols[kept], np.array(symbols, dtype=object)])
+        self.exchange_ids = np.concatenate([self.exchange_ids[kept], np.array(exchange_ids, dtype=np.int64)])
+        self.providers = np.concatenate([self.providers[kept], np.full(len(rows), None, dtype=object)])
+        self.values = np.concatenate([self.values[kept], np.full((len(rows), len(PROPERTY_FIELDS)), np.nan)])
+        self.next_due = np.concatenate([self.next_due[kept], np.zeros(len(rows))])
+        order = np.argsort(self.ids, kind='stable')
+        for column in _COLUMNS:
+            setattr(self, column, getattr(self, column)[order])
+        _logger.info(f'Tracking {len(self)} tickers, {len(rows)} new, {len(kept) - kept.sum()} dropped')
+
+    def defer_closed(self, now: datetime = None):
+        """The tickers of the closed exchanges are due at the next opening"""
+        now = now or datetime.utcnow()
+        for pk, exchange in self.exchanges.items():
+            if not exchange.is_open(now):
+                self.next_due[self.exchange_ids == pk] = _timestamp(exchange.next_open(now))
+
+    def is_due(self, row: int, now: float) -> bool:
+        return self.next_due[row] <= now
+
+    def provider(self, row: int) -> CachedTickerProvider:
+        provider = self.providers[row]
+        if provider is None:
+            provider = self.providers[row] = ticker_provider(self.symbols[row])
+        return provider
+
+    def record(self, row: int, state: TickerStateDto) -> bool:
+        """Keeps the polled values, False when they are the last polled ones"""
+        values = [getattr(state, field) for field in PROPERTY_FIELDS]
+        values = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+        if np.array_equal(values, self.values[row], equal_nan=True):
+            return False
+        self.values[row] = values
+        return True
+
+    def fair_order(self, cursor: Optional[int]) -> np.ndarray:
+        """The rows ordered by pk, starting after the cursor and wrapping around"""
+        rows = np.arange(len(self))
+        if cursor is None:
+            return rows
+        return np.roll(rows, -int(np.searchsorted(self.ids, cursor, side='right')))
@@ -1,13 +1,26 @@
+from django.urls import re_path
 from rest_framework import routers
 from .views import (
     UserViewSet,
     StepNotificationViewSet,
+    RollingNotificationViewSet,
     TickerViewSet,
     NoteViewSet,
+    BacktestViewSet,
+    LiveTicketViewSet,
 )
+from .async_views import TickerQuoteView
 
 router = routers.DefaultRouter()
 router.register(r'user', UserViewSet, basename='user')
 router.register(r'ticker', TickerViewSet, basename='ticker')
 router.register(r'stepNotification', StepNotificationViewSet, basename='stepnotification')
+router.register(r'rollingNotification', RollingNotificationViewSet, basename='rollingnotification')
 router.register(r'note', NoteViewSet, basename='note')
+router.register(r'backtest', BacktestViewSet, basename='backtest')
+router.register(r'liveTicket', LiveTicketViewSet, basename='liveticket')
+
+# The quote read by a coroutine under ASGI
+async_urlpatterns = [
+    re_path(r'^ticker/(?P<pk>[^/.]+)/quote/$', TickerQuoteView.as_view(), name='ticker-quote'),
+]
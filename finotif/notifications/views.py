@@ -1,28 +1,51 @@
 import logging
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import ValidationError as RestValidationError
+from rest_framework.exceptions import (
+    Throttled,
+    ValidationError as RestValidationError,
+)
 from .models import (
     User,
     Ticker,
     StepNotification,
+    RollingNotification,
     Note
 )
+from .ratelimit import RateLimited
 from .serializers import (
     UserSerializer,
     TickerSerializer,
     StepNotificationSerializer,
     SaveStepNotificationSerializer,
+    RollingNotificationSerializer,
+    SaveRollingNotificationSerializer,
     NoteSerializer,
+    BacktestSerializer,
+    BacktestResultSerializer,
+)
+from .backtest import backtest
+from .db_routers import ReplicaReadsMixin
+from .representations import CachedDetailMixin
+from .rows import (
+    RowListMixin,
+    TickerRowSerializer,
+    StepNotificationRowSerializer,
+    RollingNotificationRowSerializer,
+)
+from .schemas import (
+    AppSchema,
+    RollingNotificationSchema,
 )
-from .schemas import AppSchema
+from . import live
 
 _logger = logging.getLogger(__name__)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ReplicaReadsMixin, viewsets.ModelViewSet):
     """
     read:
     Show user info.
@@ -46,7 +69,7 @@ class UserViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
 
-class TickerViewSet(viewsets.ReadOnlyModelViewSet):
+class TickerViewSet(ReplicaReadsMixin, CachedDetailMixin, RowListMixin, viewsets.ReadOnlyModelViewSet):
     """
     list:
     view all tickers associated with the notifications created by the current user.
@@ -56,35 +79,17 @@ class TickerViewSet(viewsets.ReadOnlyModelViewSet):
     """
     permission_classes = [IsAuthenticated]
     serializer_class = TickerSerializer
+    row_serializer_class = TickerRowSerializer
 
     def get_queryset(self):
-        return Ticker.objects.filter(stepnotification__user_id=self.request.user)
-
-
-class StepNotificationViewSet(viewsets.ModelViewSet):
-    """
-    list:
-    View notifications created by the current user.
-
-    read:
-    Show a notification.
+        return Ticker.of_user(self.request.user)
 
-    create:
-    Create a new notification.
-
-    update:
-    Update a notification.
 
-    delete:
-    Delete a notification.
-    """
-    schema = AppSchema()
+class NotificationViewSet(ReplicaReadsMixin, CachedDetailMixin, RowListMixin, viewsets.ModelViewSet):
+    model = None
     permission_classes = [IsAuthenticated]
-    default_serializer = StepNotificationSerializer
-    serializers = {
-        'create': SaveStepNotificationSerializer,
-        'update': SaveStepNotificationSerializer,
-    }
+    default_serializer = None
+    serializers = {}
     # disable patch
     http_method_names = ['get', 'post', 'head', 'put']
     status_codes = {
@@ -93,7 +98,7 @@ class StepNotificationViewSet(viewsets.ModelViewSet):
     }
 
     def get_queryset(self):
-        return StepNotification.objects.all().filter(user=self.request.user)
+        return self.model.objects.all().filter(user=self.request.user)
 
     def get_serializer_class(self):
         return self.serializers.get(self.action, self.default_serializer)
@@ -108,8 +113,8 @@ class StepNotificationViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
         try:
-            notification = StepNotification.save_notification(serializer)
-            serializer = StepNotificationSerializer(
+            notification = self.model.save_notification(serializer)
+            serializer = self.default_serializer(
                 notification, context={'request': request}
             )
             headers = self.get_success_headers(serializer.data)
@@ -120,6 +125,8 @@ class StepNotificationViewSet(viewsets.ModelViewSet):
             )
         except ValidationError as ex:
             raise RestValidationError(ex.message)
+        except RateLimited as ex:
+            raise Throttled(wait=ex.retry_after)
 
     def create(self, request, *args, **kwargs):
         return self.save(request, *args, **kwargs)
@@ -128,7 +135,63 @@ class StepNotificationViewSet(viewsets.ModelViewSet):
         return self.save(request, kwargs['pk'])
 
 
-class NoteViewSet(viewsets.ModelViewSet):
+class StepNotificationViewSet(NotificationViewSet):
+    """
+    list:
+    View notifications created by the current user.
+
+    read:
+    Show a notification.
+
+    create:
+    Create a new notification.
+
+    update:
+    Update a notification.
+
+    delete:
+    Delete a notification.
+    """
+    schema = AppSchema()
+    model = StepNotification
+    default_serializer = StepNotificationSerializer
+    row_serializer_class = StepNotificationRowSerializer
+    serializers = {
+        'create': SaveStepNotificationSerializer,
+        'update': SaveStepNotificationSerializer,
+    }
+
+
+class RollingNotificationViewSet(NotificationViewSet):
+    """
+    list:
+    View rolling notifications created by the current user.
+
+    read:
+    Show a rolling notification.
+
+    create:
+    Create a new rolling notification. PERCENT_CHANGE requires the threshold (percent)
+    and the window (minutes), LEVEL_CROSS requires the threshold (level),
+    MOVING_AVERAGE_CROSS requires the window (periods).
+
+    update:
+    Update a rolling notification.
+
+    delete:
+    Delete a rolling notification.
+    """
+    schema = RollingNotificationSchema()
+    model = RollingNotification
+    default_serializer = RollingNotificationSerializer
+    row_serializer_class = RollingNotificationRowSerializer
+    serializers = {
+        'create': SaveRollingNotificationSerializer,
+        'update': SaveRollingNotificationSerializer,
+    }
+
+
+class NoteViewSet(ReplicaReadsMixin, viewsets.ModelViewSet):
     """
     list:
     View notes created by the current user.
@@ -150,3 +213,40 @@ class NoteViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         return Note.objects.all().filter(user=self.request.user)
+
+
+class BacktestViewSet(viewsets.GenericViewSet):
+    """
+    create:
+    Count how many times step notifications with the candidate changes would have been
+    sent over the stored ticks of the ticker, nothing is saved or sent.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = BacktestSerializer
+
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        result = backtest(
+            ticker=data['symbol'],
+            property=data['property'],
+            changes=data['changes'],
+            since=data.get('since'),
+            until=data.get('until')
+        )
+        return Response(BacktestResultSerializer(result).data)
+
+
+class LiveTicketViewSet(viewsets.ViewSet):
+    """
+    create:
+    Issue a ticket of the /api/live/ endpoint, valid for LIVE_EVENTS_TICKET_MAX_AGE seconds.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def create(self, request):
+        return Response({
+            'ticket': live.ticket(request.user),
+            'expires_in': settings.LIVE_EVENTS_TICKET_MAX_AGE,
+        })
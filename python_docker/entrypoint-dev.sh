@@ -9,7 +9,13 @@ printf $Green"*******************************\n"
 printf $Green"*******************************\n"
 
 
-if [ "$1" = 'runserver' ]; then
+if [ "$1" = 'clean-metrics' ]; then
+  # samples of the previous run, once before the services start - a restarted app
+  # must not remove the files of the running workers
+  if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"/*
+  fi
+elif [ "$1" = 'runserver' ]; then
   python manage.py collectstatic --no-input
   python manage.py makemigrations notifications --no-input
   python manage.py migrate --no-input
@@ -23,6 +29,10 @@ elif [ "$1" = 'celery-beat' ]; then
   celery -A config.celery beat --loglevel=DEBUG
 elif [ "$1" = 'celery-worker' ]; then
   celery -A config.celery worker --loglevel=DEBUG
+elif [ "$1" = 'tick-evaluator' ]; then
+  python manage.py evaluate_ticks
+elif [ "$1" = 'live' ]; then
+  uvicorn --host 0.0.0.0 --port $LIVE_PORT --reload config.asgi:application
 else
   exec "$@"
 fi
@@ -9,7 +9,13 @@ printf $Red"*******************************\n"
 printf $Red"*******************************\n"
 
 
-if [ "$1" = 'runserver' ]; then
+if [ "$1" = 'clean-metrics' ]; then
+  # samples of the previous run, once before the services start - a restarted app
+  # must not remove the files of the running workers
+  if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"/*
+  fi
+elif [ "$1" = 'runserver' ]; then
   # In real production run this manually
   # --no-input (answer "yes" to everything)
   python manage.py collectstatic --no-input
@@ -17,11 +23,21 @@ if [ "$1" = 'runserver' ]; then
   python manage.py migrate --no-input
 
 
-  gunicorn --bind 0.0.0.0:$APP_PORT \
-    --capture-output                \
-    --access-logfile '-'            \
-    --error-logfile '-'             \
-    config.wsgi:application
+  if [ "$APP_SERVER" = 'wsgi' ]; then
+    gunicorn --bind 0.0.0.0:$APP_PORT \
+      --capture-output                \
+      --access-logfile '-'            \
+      --error-logfile '-'             \
+      config.wsgi:application
+  else
+    # the async views share the event loop of a uvicorn worker
+    gunicorn --bind 0.0.0.0:$APP_PORT             \
+      --worker-class uvicorn.workers.UvicornWorker \
+      --capture-output                             \
+      --access-logfile '-'                         \
+      --error-logfile '-'                          \
+      config.asgi:application
+  fi
 elif [ "$1" = 'test' ]; then
     python manage.py collectstatic --no-input
     python manage.py migrate --no-input
@@ -32,6 +48,10 @@ elif [ "$1" = 'celery-beat' ]; then
   celery -A config.celery beat --loglevel=INFO
 elif [ "$1" = 'celery-worker' ]; then
   celery -A config.celery worker --loglevel=INFO
+elif [ "$1" = 'tick-evaluator' ]; then
+  python manage.py evaluate_ticks
+elif [ "$1" = 'live' ]; then
+  uvicorn --host 0.0.0.0 --port $LIVE_PORT config.asgi:application
 else
   exec "$@"
 fi